@@ -0,0 +1,64 @@
+import streamlit as st
+
+import metrics
+import pdf_cache
+import rate_limit
+import review_jobs
+
+
+def _stage_rows(stages):
+    return [
+        {"Tahap": stage, "Jumlah": s["count"], "Error": s.get("errors", ""),
+         "p50 (ms)": round(s["p50_ms"], 1), "p95 (ms)": round(s["p95_ms"], 1),
+         "p99 (ms)": round(s["p99_ms"], 1), "Maks (ms)": round(s["max_ms"], 1)}
+        for stage, s in sorted(stages.items())
+    ]
+
+
+def render_performance_panel():
+    """Halaman admin: latensi per tahap (p50/p95/p99), counter, dan ekspor snapshot"""
+    st.header("⏱️ Performa")
+    if not metrics.ENABLED:
+        st.warning("Metrics dimatikan (METRICS_ENABLED=0).")
+        return
+
+    snap = metrics.snapshot()
+    # Panggilan keluar dicatat sebagai tahap "http.<endpoint>" dan ditampilkan terpisah
+    http_stages = {stage: s for stage, s in snap["stages"].items() if stage.startswith("http.")}
+    stages = {stage: s for stage, s in snap["stages"].items() if stage not in http_stages}
+    if stages:
+        st.dataframe(_stage_rows(stages), width="stretch")
+    else:
+        st.info("Belum ada tahap yang terukur di proses ini.")
+
+    # Ekstraksi, indeks dan panggilan Streamline berjalan di proses worker review
+    st.subheader("Worker review")
+    worker_stages = review_jobs.stage_stats()
+    if worker_stages:
+        st.caption("Dari job review terakhir yang selesai atau gagal")
+        st.dataframe(_stage_rows(worker_stages), width="stretch")
+    else:
+        st.info("Belum ada job review yang selesai.")
+
+    st.subheader("Counter")
+    cache = pdf_cache.stats()
+    counters = {**snap["counters"], "pdf_cache.hits": cache["hits"], "pdf_cache.misses": cache["misses"]}
+    st.json(counters)
+
+    st.subheader("Latensi HTTP per endpoint")
+    if http_stages:
+        st.dataframe(_stage_rows(http_stages), width="stretch")
+    else:
+        st.info("Belum ada panggilan HTTP di proses ini.")
+
+    st.subheader("Rate limit per provider")
+    st.json(rate_limit.stats())
+
+    col_json, col_prom = st.columns(2)
+    col_json.download_button("Unduh JSON", data=metrics.to_json(snap), file_name="metrics.json",
+                             mime="application/json")
+    col_prom.download_button("Unduh Prometheus", data=metrics.to_prometheus(snap), file_name="metrics.prom",
+                             mime="text/plain")
+    if metrics.EXPORT_FILE:
+        st.caption(f"Snapshot juga ditulis setiap {metrics.EXPORT_INTERVAL_SECONDS} detik ke "
+                   f"{metrics.export_path()} (satu file per proses, termasuk setiap worker review)")
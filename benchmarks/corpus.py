@@ -0,0 +1,141 @@
+"""Generator korpus sintetis: PDF kontrak dan sheet kontrak, tanpa dependensi tambahan."""
+import csv
+import os
+import random
+import zlib
+from datetime import date, datetime, timedelta
+
+FILLER = (
+    "Para pihak sepakat bahwa seluruh kewajiban dalam perjanjian ini dilaksanakan dengan itikad baik. "
+    "Pihak Kedua wajib menyerahkan laporan bulanan selambat-lambatnya pada hari kerja kelima. "
+    "Keterlambatan pembayaran dikenakan denda sebesar satu permil per hari dari nilai tagihan. "
+    "Perjanjian dapat diakhiri oleh salah satu pihak dengan pemberitahuan tertulis tiga puluh hari sebelumnya. "
+)
+LINES_PER_PAGE = 40
+CHARS_PER_LINE = 90
+
+# Posisi halaman yang memuat tanggal expiry
+DATE_POSITIONS = ("first", "middle", "last", "none")
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text_stream(lines):
+    ops = ["BT", "/F1 10 Tf", "12 TL", "50 760 Td"]
+    for line in lines:
+        ops.append(f"({_escape(line)}) Tj T*")
+    ops.append("ET")
+    return "\n".join(ops).encode("latin-1", "replace")
+
+
+def _scan_stream():
+    # Halaman "hasil scan": hanya gambar, tanpa lapisan teks
+    return b"q 512 0 0 700 50 50 cm /Im1 Do Q"
+
+
+def build_pdf(pages, seed=0):
+    """PDF dari daftar halaman: str = teks, None = halaman kosong, "scan" = gambar tanpa teks"""
+    rng = random.Random(seed)
+    objects = [None, None]  # 1: Catalog, 2: Pages
+    font_id = 3
+    image_id = 4
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    noise = bytes(rng.randrange(160, 256) for _ in range(64 * 64))
+    image = zlib.compress(noise)
+    objects.append(
+        b"<< /Type /XObject /Subtype /Image /Width 64 /Height 64 /ColorSpace /DeviceGray "
+        b"/BitsPerComponent 8 /Filter /FlateDecode /Length %d >>\nstream\n" % len(image) + image + b"\nendstream"
+    )
+    page_ids = []
+    for page in pages:
+        if page is None:
+            content = b""
+        elif page == "scan":
+            content = _scan_stream()
+        else:
+            lines = [page[i:i + CHARS_PER_LINE] for i in range(0, len(page), CHARS_PER_LINE)]
+            content = _text_stream(lines[:LINES_PER_PAGE])
+        content = zlib.compress(content)
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(content) + content + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+             f"/Resources << /Font << /F1 {font_id} 0 R >> /XObject << /Im1 {image_id} 0 R >> >> "
+             f"/Contents {content_id} 0 R >>").encode()
+        )
+        page_ids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = " ".join(f"{i} 0 R" for i in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def contract_pages(page_count, date_position="first", blank_ratio=0.0, scanned_ratio=0.0, seed=0,
+                   expiry=None):
+    """Isi halaman kontrak sintetis dengan tanggal expiry di posisi tertentu"""
+    rng = random.Random(seed)
+    expiry = expiry or date(2025, 1, 1) + timedelta(days=rng.randrange(0, 1500))
+    date_page = {
+        "first": 0,
+        "middle": page_count // 2,
+        "last": page_count - 1,
+        "none": None,
+    }[date_position]
+    pages = []
+    for i in range(page_count):
+        if i != date_page and i > 0 and rng.random() < blank_ratio:
+            pages.append(None)
+            continue
+        if i != date_page and i > 0 and rng.random() < scanned_ratio:
+            pages.append("scan")
+            continue
+        text = f"Pasal {i + 1} " + FILLER * 8
+        if i == date_page:
+            text = f"Pasal {i + 1} Perjanjian ini berlaku sampai {expiry.isoformat()}. " + FILLER * 7
+        pages.append(text)
+    return pages
+
+
+def write_contract_pdf(path, page_count, date_position="first", blank_ratio=0.0, scanned_ratio=0.0, seed=0):
+    pages = contract_pages(page_count, date_position, blank_ratio, scanned_ratio, seed)
+    with open(path, "wb") as f:
+        f.write(build_pdf(pages, seed=seed))
+    return path
+
+
+def contract_rows(n, seed=0, today=None):
+    """Baris kontrak sintetis; expiry tersebar dari 1 tahun lalu sampai 4 tahun ke depan"""
+    rng = random.Random(seed)
+    today = today or date.today()
+    uploaded = datetime.now().isoformat()
+    for i in range(n):
+        expiry = today + timedelta(days=rng.randrange(-365, 4 * 365))
+        yield {
+            "ContractID": f"CTR-{i:07d}",
+            "FileName": f"kontrak_{i:07d}.pdf",
+            "ExpiryDate": expiry.isoformat(),
+            "UploadedAt": uploaded,
+        }
+
+
+def write_sheet(path, n, seed=0):
+    """contracts.csv sintetis berisi n baris"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["ContractID", "FileName", "ExpiryDate", "UploadedAt"])
+        writer.writeheader()
+        writer.writerows(contract_rows(n, seed))
+    return path
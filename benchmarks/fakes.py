@@ -0,0 +1,396 @@
+"""Server tiruan untuk semua layanan luar: Streamline, Telegram Bot API, SMTP (dengan AUTH),
+Langflow, dan OpenAI (chat completions, termasuk streaming).
+
+Setiap layanan punya latensi, rasio error (5xx / 451 untuk SMTP), dan rasio throttle
+(429 + Retry-After) yang bisa diatur. Server berjalan di proses sendiri supaya tidak ikut
+memakan CPU proses aplikasi yang sedang diukur.
+
+Contoh (server tiruan untuk mencoba aplikasi secara manual):
+    python -m benchmarks.fakes --latency 0.2,openai=0.5 --error-rate 0.05
+"""
+import abc
+import argparse
+import base64
+import json
+import multiprocessing
+import random
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SERVICES = ("streamline", "telegram", "smtp", "langflow", "openai")
+DEFAULT_LATENCY = {"streamline": 1.0, "telegram": 0.05, "smtp": 0.1, "langflow": 2.0, "openai": 0.5}
+SMTP_USER = "loadtest@example.com"
+SMTP_PASS = "loadtest"
+TELEGRAM_BOT_TOKEN = "123:loadtest"
+OPENAI_API_KEY = "sk-loadtest"
+LANGFLOW_TOKEN = "loadtest"
+# Jawaban OpenAI tiruan: jumlah kata dan jeda antar potongan stream
+REPLY_WORDS = 120
+STREAM_CHUNKS = 20
+STREAM_CHUNK_SECONDS = 0.01
+RETRY_AFTER_SECONDS = 1
+
+
+class Service:
+    """Konfigurasi dan statistik satu layanan tiruan"""
+
+    def __init__(self, name, latency=0.0, error_rate=0.0, throttle_rate=0.0):
+        self.name = name
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stats = {"requests": 0, "errors": 0, "throttled": 0}
+
+    def outcome(self):
+        """Tunggu sesuai latensi (±50%), lalu tentukan hasil: "ok", "error", atau "throttle" """
+        time.sleep(self.latency * random.uniform(0.5, 1.5))
+        roll = random.random()
+        if roll < self.throttle_rate:
+            result = "throttle"
+        elif roll < self.throttle_rate + self.error_rate:
+            result = "error"
+        else:
+            result = "ok"
+        with self._lock:
+            self.stats["requests"] += 1
+            if result == "error":
+                self.stats["errors"] += 1
+            elif result == "throttle":
+                self.stats["throttled"] += 1
+        return result
+
+
+def _reply_text(words=REPLY_WORDS):
+    return " ".join(random.choice(("kontrak", "klausul", "denda", "pihak", "risiko", "pasal", "nilai"))
+                    for _ in range(words))
+
+
+# === HTTP ===
+class _Handler(BaseHTTPRequestHandler, abc.ABC):
+    protocol_version = "HTTP/1.1"  # keep-alive seperti layanan aslinya
+    service = None  # diisi per server
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = self._body()
+        result = self.service.outcome()
+        if result == "throttle":
+            self.throttled()
+        elif result == "error":
+            self._send_json(503 if random.random() < 0.5 else 500, {"error": {"message": "fake upstream error"}})
+        else:
+            self.ok(body)
+
+    def throttled(self):
+        self._send_json(429, {"error": {"message": "rate limited"}}, {"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+    @abc.abstractmethod
+    def ok(self, body):
+        """Balasan sukses layanan ini untuk body request"""
+
+
+class _StreamlineHandler(_Handler):
+    def ok(self, body):
+        self._send_json(200, {"status": "ok", "review": _reply_text(40), "risk": random.choice(["low", "medium"])})
+
+
+class _TelegramHandler(_Handler):
+    def throttled(self):
+        # Telegram mengirim jeda di body (parameters.retry_after)
+        self._send_json(429, {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                              "parameters": {"retry_after": RETRY_AFTER_SECONDS}})
+
+    def ok(self, body):
+        if not self.path.startswith(f"/bot{TELEGRAM_BOT_TOKEN}/"):
+            self._send_json(401, {"ok": False, "error_code": 401, "description": "Unauthorized"})
+            return
+        message = json.loads(body or b"{}")
+        self._send_json(200, {"ok": True, "result": {"message_id": random.randrange(1 << 30),
+                                                     "chat": {"id": message.get("chat_id")},
+                                                     "text": message.get("text", "")}})
+
+
+class _LangflowHandler(_Handler):
+    def ok(self, body):
+        if self.headers.get("Authorization") != f"Bearer {LANGFLOW_TOKEN}":
+            self._send_json(401, {"detail": "Unauthorized"})
+            return
+        text = _reply_text()
+        self._send_json(200, {"outputs": [{"outputs": [{"results": {"message": {"text": text}}}]}]})
+
+
+class _OpenAIHandler(_Handler):
+    def ok(self, body):
+        request = json.loads(body or b"{}")
+        model = request.get("model", "gpt-3.5-turbo")
+        words = min(REPLY_WORDS, request.get("max_tokens") or REPLY_WORDS)
+        text = _reply_text(words)
+        created = int(time.time())
+        if not request.get("stream"):
+            self._send_json(200, {
+                "id": "chatcmpl-loadtest", "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(body) // 4, "completion_tokens": words,
+                          "total_tokens": len(body) // 4 + words},
+            })
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        parts = text.split(" ")
+        size = max(1, len(parts) // STREAM_CHUNKS)
+        for i in range(0, len(parts), size):
+            delta = {"content": " ".join(parts[i:i + size]) + " "}
+            chunk = {"id": "chatcmpl-loadtest", "object": "chat.completion.chunk", "created": created,
+                     "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(STREAM_CHUNK_SECONDS)
+        done = {"id": "chatcmpl-loadtest", "object": "chat.completion.chunk", "created": created, "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        self.wfile.write(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode())
+
+
+HANDLERS = {
+    "streamline": _StreamlineHandler,
+    "telegram": _TelegramHandler,
+    "langflow": _LangflowHandler,
+    "openai": _OpenAIHandler,
+}
+
+
+# === SMTP ===
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """SMTP minimal: EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA, RSET, NOOP, QUIT (tanpa STARTTLS)"""
+
+    service = None
+
+    def _reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def _readline(self):
+        return self.rfile.readline().decode("utf-8", "replace").rstrip("\r\n")
+
+    def _auth(self, args):
+        mechanism, _, initial = args.partition(" ")
+        mechanism = mechanism.upper()
+        if mechanism == "PLAIN":
+            if not initial:
+                self._reply("334 ")
+                initial = self._readline()
+            _, user, password = base64.b64decode(initial).decode().split("\0")
+        elif mechanism == "LOGIN":
+            if not initial:
+                self._reply("334 " + base64.b64encode(b"Username:").decode())
+                initial = self._readline()
+            user = base64.b64decode(initial).decode()
+            self._reply("334 " + base64.b64encode(b"Password:").decode())
+            password = base64.b64decode(self._readline()).decode()
+        else:
+            self._reply("504 Unrecognized authentication type")
+            return False
+        if (user, password) != (SMTP_USER, SMTP_PASS):
+            self._reply("535 Authentication credentials invalid")
+            return False
+        self._reply("235 Authentication successful")
+        return True
+
+    def handle(self):
+        self._reply("220 loadtest ESMTP")
+        authenticated = False
+        while line := self._readline():
+            command, _, args = line.partition(" ")
+            command = command.upper()
+            if command in ("EHLO", "HELO"):
+                self.wfile.write(b"250-loadtest\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME\r\n")
+            elif command == "AUTH":
+                authenticated = self._auth(args)
+            elif command == "MAIL":
+                self._reply("250 OK" if authenticated else "530 Authentication required")
+            elif command == "RCPT":
+                self._reply("250 OK")
+            elif command == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                while self._readline() != ".":
+                    pass
+                result = self.service.outcome()
+                if result == "ok":
+                    self._reply("250 OK: queued")
+                else:
+                    self._reply("451 Temporary failure, try again later")
+            elif command in ("RSET", "NOOP"):
+                self._reply("250 OK")
+            elif command == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class _QuietErrors:
+    """Klien yang memutus koneksi (timeout, retry) adalah hal biasa saat uji beban"""
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _ThreadingTCPServer(_QuietErrors, socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _ThreadingHTTPServer(_QuietErrors, ThreadingHTTPServer):
+    daemon_threads = True
+
+
+# === Menjalankan semua layanan ===
+def start_servers(config, host="127.0.0.1"):
+    """Jalankan semua layanan di thread proses ini; kembalikan ({nama: Service}, {nama: port}, [server])"""
+    services = {name: Service(name, **config.get(name, {})) for name in SERVICES}
+    ports = {}
+    servers = []
+    for name in SERVICES:
+        if name == "smtp":
+            handler = type("SMTPHandler", (_SMTPHandler,), {"service": services[name]})
+            server = _ThreadingTCPServer((host, 0), handler)
+        else:
+            handler = type(f"{name.title()}Handler", (HANDLERS[name],), {"service": services[name]})
+            server = _ThreadingHTTPServer((host, 0), handler)
+        threading.Thread(target=server.serve_forever, name=f"fake-{name}", daemon=True).start()
+        ports[name] = server.server_address[1]
+        servers.append(server)
+    return services, ports, servers
+
+
+def environment(ports, host="127.0.0.1"):
+    """Variabel lingkungan yang mengarahkan aplikasi ke layanan tiruan"""
+    return {
+        "STREAMLINE_URL": f"http://{host}:{ports['streamline']}/v1/contracts/review",
+        "STREAMLINE_API_KEY": "loadtest",
+        "TELEGRAM_API_URL": f"http://{host}:{ports['telegram']}",
+        "TELEGRAM_BOT_TOKEN": TELEGRAM_BOT_TOKEN,
+        "TELEGRAM_CHAT_ID": "1000",
+        "SMTP_SERVER": host,
+        "SMTP_PORT": str(ports["smtp"]),
+        "SMTP_STARTTLS": "0",
+        "SMTP_USER": SMTP_USER,
+        "SMTP_PASS": SMTP_PASS,
+        "EMAIL_TO": "legal@example.com",
+        "OPENAI_BASE_URL": f"http://{host}:{ports['openai']}/v1",
+        "OPENAI_API_KEY": OPENAI_API_KEY,
+        # riset.py mengambil URL dan token Langflow dari sidebar; dua nilai ini dipakai pengisinya
+        "LANGFLOW_URL": f"http://{host}:{ports['langflow']}/api/v1/run/loadtest",
+        "LANGFLOW_TOKEN": LANGFLOW_TOKEN,
+    }
+
+
+def _serve(config, conn):
+    services, ports, _ = start_servers(config)
+    conn.send(ports)
+    while True:
+        command = conn.recv()
+        if command == "stats":
+            conn.send({name: dict(s.stats) for name, s in services.items()})
+        elif command == "reset":
+            for s in services.values():
+                s.reset()
+            conn.send(True)
+        elif command == "stop":
+            return
+
+
+class FakeServices:
+    """Semua layanan tiruan di satu proses anak, dikendalikan lewat pipe"""
+
+    def __init__(self, config):
+        ctx = multiprocessing.get_context("spawn")
+        self._conn, child = ctx.Pipe()
+        self._process = ctx.Process(target=_serve, args=(config, child), name="fake-services", daemon=True)
+        self._process.start()
+        self.ports = self._conn.recv()
+
+    def environment(self):
+        return environment(self.ports)
+
+    def stats(self):
+        self._conn.send("stats")
+        return self._conn.recv()
+
+    def reset(self):
+        self._conn.send("reset")
+        self._conn.recv()
+
+    def stop(self):
+        self._conn.send("stop")
+        self._process.join(5)
+
+
+def parse_setting(text, default=None):
+    """ "0.2,openai=0.5" -> {layanan: nilai}; nilai tanpa nama berlaku untuk semua layanan"""
+    values = dict(default or {})
+    for part in filter(None, (p.strip() for p in (text or "").split(","))):
+        name, _, value = part.rpartition("=")
+        if name:
+            if name not in SERVICES:
+                raise ValueError(f"Layanan tidak dikenal: {name} (pilihan: {', '.join(SERVICES)})")
+            values[name] = float(value)
+        else:
+            values = {service: float(value) for service in SERVICES}
+    return values
+
+
+def build_config(latency=None, error_rate=None, throttle_rate=None):
+    latencies = parse_setting(latency, DEFAULT_LATENCY)
+    errors = parse_setting(error_rate)
+    throttles = parse_setting(throttle_rate)
+    return {
+        name: {"latency": latencies.get(name, 0.0), "error_rate": errors.get(name, 0.0),
+               "throttle_rate": throttles.get(name, 0.0)}
+        for name in SERVICES
+    }
+
+
+def add_arguments(parser):
+    parser.add_argument("--latency", help='Latensi rata-rata (detik), mis. "0.2" atau "0.2,openai=1.5"')
+    parser.add_argument("--error-rate", help='Rasio error 5xx/451, mis. "0.05" atau "telegram=0.1"')
+    parser.add_argument("--throttle-rate", help="Rasio respons 429 dengan Retry-After")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Server tiruan untuk layanan luar")
+    add_arguments(parser)
+    args = parser.parse_args()
+    _, ports, _ = start_servers(build_config(args.latency, args.error_rate, args.throttle_rate))
+    for name, value in environment(ports).items():
+        print(f"export {name}={value}")
+    print("# Ctrl-C untuk berhenti", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
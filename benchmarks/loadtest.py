@@ -0,0 +1,544 @@
+"""Uji beban offline: aplikasi Streamlit dijalankan headless (AppTest) terhadap layanan tiruan.
+
+Setiap pengguna virtual membuka satu sesi aplikasi dan mengulang satu alur selama --duration:
+- review:   review.py, upload PDF lalu "Simpan & Review", kemudian menunggu job review selesai
+- analysis: kontrakme.py, upload PDF lalu "Analisis Kontrak" (OpenAI, map-reduce)
+- research: riset.py, topik baru lalu "Mulai Riset" (Langflow)
+- chat:     streamlit_app.py, satu pertanyaan (retrieval kontrak + OpenAI streaming)
+
+Semua sesi berjalan di satu proses, seperti satu server Streamlit; worker review berjalan di
+proses anaknya dan layanan tiruan (benchmarks/fakes.py) di proses lain. Untuk setiap tingkat
+konkurensi dilaporkan throughput, latensi p50/p95/p99 per alur, dan memori (RSS) proses
+aplikasi serta setiap worker review.
+
+Contoh:
+    python -m benchmarks.loadtest --concurrency 1,4,16 --duration 30
+    python -m benchmarks.loadtest --flows chat,research --latency 0.3 --error-rate openai=0.05
+    python -m benchmarks.loadtest --output sesudah.json --baseline sebelum.json
+"""
+import abc
+import argparse
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from benchmarks import corpus, fakes
+from benchmarks.run import REGRESSION_RATIO, REPO_DIR, _git_revision
+
+FLOWS = ("review", "analysis", "research", "chat")
+# Versi Streamlit yang bagian internal AppTest-nya ditambal oleh share_streamlit_runtime()
+STREAMLIT_TESTED_VERSION = "1.66"
+# Batas waktu satu interaksi AppTest dan satu job review
+APP_TIMEOUT = 300
+JOB_TIMEOUT = 300
+JOB_POLL_SECONDS = 0.2
+MEMORY_SAMPLE_SECONDS = 0.5
+QUESTIONS = [
+    "Kapan kontrak berakhir dan apa dendanya jika terlambat?",
+    "Siapa para pihak dalam perjanjian ini?",
+    "Apa kewajiban pihak kedua soal laporan bulanan?",
+    "Bagaimana perjanjian dapat diakhiri?",
+]
+
+
+def _widget(widgets, label):
+    return next(w for w in widgets if w.label == label)
+
+
+def _failed(at):
+    return bool(at.exception) or bool(at.error)
+
+
+def _contract_pdf(pages, tag, seed):
+    """PDF kontrak dengan nomor unik supaya setiap upload benar-benar file baru (tidak kena dedup)"""
+    content = corpus.contract_pages(pages, "first", seed=seed)
+    content[0] = f"Nomor kontrak {tag}. " + content[0]
+    return corpus.build_pdf(content, seed=seed)
+
+
+def share_streamlit_runtime():
+    """Buat AppTest aman dipakai banyak thread sekaligus, seperti sesi-sesi dalam satu server.
+
+    Setiap AppTest.run() memasang Runtime tiruannya sendiri ke Runtime._instance (lalu
+    mengosongkannya lagi) dan menambal config.get_option; dua sesi yang berjalan bersamaan
+    saling menimpa. Di sini satu Runtime tiruan dipakai bersama oleh semua sesi dan
+    penambalan config dilakukan sekali untuk seluruh proses. ScriptCache juga dipakai
+    bersama: AppTest membuat yang baru per run sehingga skrip di-parse ulang setiap kali,
+    dan ast.parse paralel di Python 3.11 bisa gagal ("recursion depth mismatch").
+    """
+    from unittest.mock import MagicMock
+
+    import streamlit
+
+    # Bagian dalam Streamlit ini bukan API publik; versi lain bisa berbeda
+    unsupported = (f"benchmarks/loadtest.py memakai bagian internal AppTest Streamlit {STREAMLIT_TESTED_VERSION}.x; "
+                   f"Streamlit {streamlit.__version__} yang terpasang tidak cocok")
+    try:
+        from streamlit import config
+        from streamlit.components.v2.component_manager import BidiComponentManager
+        from streamlit.runtime import Runtime
+        from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+        from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+        from streamlit.runtime.media_file_manager import MediaFileManager
+        from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+        from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+        from streamlit.testing.v1 import app_test, local_script_runner, util
+    except ImportError as e:
+        raise RuntimeError(f"{unsupported} ({e})") from e
+    required = {
+        app_test: ("Runtime", "ScriptCache", "patch_config_options"),
+        local_script_runner: ("ScriptCache",),
+        util: ("build_mock_config_get_option",),
+        Runtime: ("_instance",),
+    }
+    missing = [f"{owner.__name__}.{attr}" for owner, attrs in required.items() for attr in attrs
+               if not hasattr(owner, attr)]
+    if missing:
+        raise RuntimeError(f"{unsupported} (tidak ada: {', '.join(missing)})")
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    components = BidiComponentManager()
+    components.discover_and_register_components(start_file_watching=False)
+    runtime.bidi_component_registry = components
+    Runtime._instance = runtime
+
+    class _PerSessionRuntime(Runtime):
+        """Tempat AppTest menulis Runtime per run tanpa menyentuh Runtime._instance bersama"""
+
+    app_test.Runtime = _PerSessionRuntime
+    script_cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: script_cache
+    config.get_option = util.build_mock_config_get_option({"global.appTest": True})
+    app_test.patch_config_options = lambda overrides: contextlib.nullcontext()
+
+
+# === Alur ===
+class Flow(abc.ABC):
+    name = None
+    script = None
+
+    def __init__(self, env, args, run_id):
+        self.env = env
+        self.args = args
+        self.run_id = run_id
+
+    def open(self, user):
+        at = Flow._app(self.script)
+        self.prepare(at)
+        return at
+
+    @staticmethod
+    def _app(script):
+        from streamlit.testing.v1 import AppTest
+
+        return AppTest.from_file(os.path.join(REPO_DIR, script), default_timeout=APP_TIMEOUT).run()
+
+    def prepare(self, at):
+        pass
+
+    @abc.abstractmethod
+    def step(self, at, user, n):
+        """Satu interaksi pengguna; kembalikan (berhasil, [(nama_metrik, detik, berhasil)] tambahan)"""
+
+
+class ReviewFlow(Flow):
+    name = "review"
+    script = "review.py"
+
+    def step(self, at, user, n):
+        import review_jobs
+
+        tag = f"LT-{self.run_id}-{user}-{n}"
+        at.text_input[0].set_value(tag)
+        at.file_uploader[0].upload(f"{tag}.pdf", _contract_pdf(self.args.review_pages, tag, n), "application/pdf")
+        at.run()
+        start = time.perf_counter()
+        _widget(at.button, "Simpan & Review").click().run()
+        jobs = at.session_state["review_jobs"] if "review_jobs" in at.session_state else []
+        if _failed(at) or not jobs:
+            return False, []
+        # Pengguna menunggu sampai status job di halaman berubah jadi selesai/gagal
+        job_id = jobs[-1]
+        deadline = time.monotonic() + JOB_TIMEOUT
+        while time.monotonic() < deadline:
+            job = review_jobs.get_jobs([job_id])[0]
+            if job["status"] in ("done", "failed"):
+                ok = job["status"] == "done"
+                return ok, [("review.job", time.perf_counter() - start, ok)]
+            time.sleep(JOB_POLL_SECONDS)
+        return False, [("review.job", time.perf_counter() - start, False)]
+
+
+class AnalysisFlow(Flow):
+    name = "analysis"
+    script = "kontrakme.py"
+
+    def prepare(self, at):
+        at.sidebar.text_input[0].set_value(self.env["OPENAI_API_KEY"]).run()
+
+    def step(self, at, user, n):
+        tag = f"LT-{self.run_id}-{user}-{n}"
+        at.file_uploader[0].upload(f"{tag}.pdf", _contract_pdf(self.args.analysis_pages, tag, n), "application/pdf")
+        at.run()
+        _widget(at.button, "Analisis Kontrak").click().run()
+        return not _failed(at), []
+
+
+class ResearchFlow(Flow):
+    name = "research"
+    script = "riset.py"
+
+    def prepare(self, at):
+        _widget(at.sidebar.text_input, "URL API Langflow").set_value(self.env["LANGFLOW_URL"])
+        _widget(at.sidebar.text_input, "Token Aplikasi Langflow (Bearer Token)").set_value(self.env["LANGFLOW_TOKEN"])
+        _widget(at.sidebar.text_input, "Kunci API OpenAI").set_value(self.env["OPENAI_API_KEY"])
+        at.run()
+
+    def step(self, at, user, n):
+        _widget(at.text_input, "Masukkan Topik Riset").set_value(f"Topik uji beban {self.run_id} {user} {n}")
+        _widget(at.button, "Mulai Riset").click().run()
+        return not _failed(at), []
+
+
+class ChatFlow(Flow):
+    name = "chat"
+    script = "streamlit_app.py"
+
+    def prepare(self, at):
+        at.text_input[0].set_value(self.env["OPENAI_API_KEY"]).run()
+
+    def step(self, at, user, n):
+        at.chat_input[0].set_value(QUESTIONS[(user + n) % len(QUESTIONS)]).run()
+        return not _failed(at), []
+
+
+FLOW_CLASSES = {cls.name: cls for cls in (ReviewFlow, AnalysisFlow, ResearchFlow, ChatFlow)}
+
+
+# === Memori ===
+def _rss_mb(pid="self"):
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+class MemorySampler:
+    """RSS puncak proses aplikasi dan setiap worker review, diambil berkala di background"""
+
+    def __init__(self):
+        self.start = None
+        self.peak = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="memory-sampler", daemon=True)
+
+    def sample(self):
+        current = {"app": _rss_mb()}
+        for child in multiprocessing.active_children():
+            if child.name.startswith("review-worker"):
+                current[child.name] = _rss_mb(child.pid)
+        for name, value in current.items():
+            if value is not None:
+                self.peak[name] = max(self.peak.get(name, 0), value)
+        return current
+
+    def _run(self):
+        while not self._stop.wait(MEMORY_SAMPLE_SECONDS):
+            self.sample()
+
+    def __enter__(self):
+        self.start = self.sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+
+# === Menjalankan beban ===
+def summarize(samples, elapsed):
+    stats = {}
+    for name, values in sorted(samples.items()):
+        ordered = sorted(seconds for seconds, _ in values)
+        errors = sum(not ok for _, ok in values)
+        n = len(ordered)
+        stats[name] = {
+            "requests": n,
+            "errors": errors,
+            "error_rate": errors / n,
+            "throughput_per_s": n / elapsed,
+            "p50_ms": ordered[int(0.50 * (n - 1))] * 1000,
+            "p95_ms": ordered[int(0.95 * (n - 1))] * 1000,
+            "p99_ms": ordered[int(0.99 * (n - 1))] * 1000,
+            "max_ms": ordered[-1] * 1000,
+        }
+    return stats
+
+
+def run_level(flows, concurrency, duration):
+    """Jalankan `concurrency` pengguna virtual (alur dibagi bergiliran) selama `duration` detik"""
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    window = {}
+
+    def start_clock():
+        # Dijalankan barrier sebelum ada thread yang dilepas
+        window["start"] = time.monotonic()
+        window["stop"] = window["start"] + duration
+
+    ready = threading.Barrier(concurrency + 1, action=start_clock)
+
+    def add(name, seconds, ok):
+        with lock:
+            samples[name].append((seconds, ok))
+
+    def user(index):
+        flow = flows[index % len(flows)]
+        try:
+            at = flow.open(index)
+        except Exception as e:
+            print(f"Sesi {flow.name} #{index} gagal dibuka: {e}")
+            at = None
+        ready.wait()
+        n = 0
+        while at is not None and time.monotonic() < window["stop"]:
+            start = time.perf_counter()
+            try:
+                ok, extra = flow.step(at, index, n)
+            except Exception as e:
+                print(f"{flow.name} #{index}: {type(e).__name__}: {e}")
+                ok, extra = False, []
+                # Halaman yang rusak dimuat ulang, seperti pengguna menekan refresh
+                try:
+                    at = flow.open(index)
+                except Exception as e:
+                    print(f"Sesi {flow.name} #{index} gagal dibuka ulang: {e}")
+                    at = None
+            add(flow.name, time.perf_counter() - start, ok)
+            for sample in extra:
+                add(*sample)
+            n += 1
+
+    threads = [threading.Thread(target=user, args=(i,), name=f"user-{i}") for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    # Waktu membuka sesi (import, boot) tidak ikut diukur
+    ready.wait()
+    with MemorySampler() as memory:
+        for t in threads:
+            t.join()
+    elapsed = time.monotonic() - window["start"]
+    peak = dict(memory.peak)
+    if memory.start.get("app") is not None:
+        peak["app_growth_per_user"] = (peak["app"] - memory.start["app"]) / concurrency
+    return summarize(samples, elapsed), peak, elapsed
+
+
+def warm_up(flows):
+    """Satu interaksi per alur sebelum pengukuran: import modul, boot() (worker review & notifikasi), cache"""
+    for flow in flows:
+        try:
+            flow.step(flow.open(-1), -1, 0)
+        except Exception as e:
+            print(f"Pemanasan {flow.name} gagal: {type(e).__name__}: {e}")
+
+
+def drain(timeout):
+    """Tunggu job review dan notifikasi yang tersisa; kembalikan jumlah per status"""
+    import contract_store
+
+    conn = contract_store.get_connection()
+    deadline = time.monotonic() + timeout
+    while True:
+        jobs = dict(conn.execute("SELECT status, COUNT(*) FROM review_jobs GROUP BY status").fetchall())
+        outbox = dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        pending = jobs.get("queued", 0) + jobs.get("running", 0) + outbox.get("queued", 0) + outbox.get("sending", 0)
+        if not pending or time.monotonic() > deadline:
+            return {"review_jobs": jobs, "outbox": outbox}
+        time.sleep(1)
+
+
+def seed_contracts(count, run_id):
+    """Kontrak yang sudah terindeks supaya chat punya bahan retrieval"""
+    import clause_index
+    import contract_store
+    import upload_store
+
+    conn = contract_store.get_connection()
+    for i in range(count):
+        tag = f"SEED-{run_id}-{i}"
+        digest, _, _ = upload_store.store(io.BytesIO(_contract_pdf(3, tag, i)), conn=conn)
+        row = {"ContractID": tag, "FileName": f"{tag}.pdf", "ExpiryDate": "2027-01-01",
+               "UploadedAt": datetime.now().isoformat(), "BlobDigest": digest}
+        contract_store.add_contract(row, conn)
+        clause_index.index_blob(digest, conn)
+
+
+def meets_slo(level, slo_p95_ms, max_error_rate):
+    # review.job sudah termasuk dalam waktu alur review (pengguna menunggu job selesai)
+    flows = [s for name, s in level["flows"].items() if name in FLOWS]
+    return bool(flows) and all(s["p95_ms"] <= slo_p95_ms and s["error_rate"] <= max_error_rate for s in flows)
+
+
+def print_level(level):
+    print(f"\n== {level['concurrency']} pengguna, {level['elapsed_s']:.1f} detik ==")
+    print(f"{'alur':<12} {'req':>6} {'error':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, s in level["flows"].items():
+        print(f"{name:<12} {s['requests']:>6} {s['errors']:>6} {s['throughput_per_s']:>8.2f} "
+              f"{s['p50_ms']:>9.0f} {s['p95_ms']:>9.0f} {s['p99_ms']:>9.0f}")
+    memory = ", ".join(f"{name} {mb:.0f} MB" for name, mb in level["memory_mb"].items())
+    print(f"memori puncak: {memory}")
+    print(f"layanan tiruan: {json.dumps(level['services'])}")
+
+
+def compare(levels, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(lvl["concurrency"], name): s for lvl in baseline["levels"] for name, s in lvl["flows"].items()}
+    print(f"\nPerbandingan dengan {baseline_path} (rasio p95 dan throughput, p95 >1 berarti lebih lambat):")
+    regressions = 0
+    for level in levels:
+        for name, s in level["flows"].items():
+            prev = old.get((level["concurrency"], name))
+            if not prev or not prev["p95_ms"] or not prev["throughput_per_s"]:
+                continue
+            ratio = s["p95_ms"] / prev["p95_ms"]
+            flag = "  <-- REGRESI" if ratio > REGRESSION_RATIO else ""
+            regressions += bool(flag)
+            print(f"{level['concurrency']:>4} {name:<12} p95 {ratio:>5.2f}x  "
+                  f"throughput {s['throughput_per_s'] / prev['throughput_per_s']:>5.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Uji beban offline Sistem Monitoring Kontrak")
+    parser.add_argument("--flows", default=",".join(FLOWS), help="Alur yang dijalankan (dibagi bergiliran)")
+    parser.add_argument("--concurrency", default="1,4,16", help="Tingkat konkurensi (pengguna), dijalankan berurutan")
+    parser.add_argument("--duration", type=float, default=30, help="Lama setiap tingkat (detik)")
+    parser.add_argument("--review-workers", type=int, default=2, help="Jumlah proses worker review")
+    parser.add_argument("--review-pages", type=int, default=5)
+    parser.add_argument("--analysis-pages", type=int, default=20)
+    parser.add_argument("--seed-contracts", type=int, default=100, help="Kontrak terindeks untuk retrieval chat")
+    parser.add_argument("--no-rate-limits", action="store_true", help="Matikan rate_limit (ukur kapasitas mentah)")
+    parser.add_argument("--slo-p95-ms", type=float, default=3000, help="Batas p95 untuk menghitung kapasitas")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--drain-seconds", type=float, default=60, help="Tunggu job/notifikasi sisa per tingkat")
+    fakes.add_arguments(parser)
+    parser.add_argument("--output", default="loadtest_results.json")
+    parser.add_argument("--baseline", help="Hasil uji beban sebelumnya untuk dibandingkan")
+    parser.add_argument("--workdir", help="Folder kerja (default: folder sementara yang dihapus setelahnya)")
+    args = parser.parse_args(argv)
+
+    flow_names = [f.strip() for f in args.flows.split(",") if f.strip()]
+    unknown = set(flow_names) - set(FLOWS)
+    if unknown:
+        parser.error(f"Alur tidak dikenal: {', '.join(sorted(unknown))}")
+    levels_to_run = [int(c) for c in args.concurrency.split(",")]
+    config = fakes.build_config(args.latency, args.error_rate, args.throttle_rate)
+
+    output = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    workdir = args.workdir or tempfile.mkdtemp(prefix="kontrak-loadtest-")
+    os.makedirs(workdir, exist_ok=True)
+
+    services = fakes.FakeServices(config)
+    env = services.environment()
+    # Konfigurasi modul aplikasi dibaca saat import, jadi environment diisi sebelum modul mana pun dimuat
+    os.environ.update(env)
+    os.environ["REVIEW_WORKERS"] = str(args.review_workers)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    # AppTest di banyak thread mencatat peringatan "missing ScriptRunContext" di setiap sesi
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    try:
+        share_streamlit_runtime()
+    except RuntimeError as e:
+        services.stop()
+        parser.exit(2, f"{e}\n")
+
+    import rate_limit
+
+    if args.no_rate_limits:
+        for provider in rate_limit.DEFAULT_LIMITS:
+            rate_limit.configure(provider, 1e9, 1e9, 1_000_000)
+
+    run_id = datetime.now().strftime("%H%M%S")
+    flows = [FLOW_CLASSES[name](env, args, run_id) for name in flow_names]
+    levels = []
+    try:
+        if "chat" in flow_names and args.seed_contracts:
+            seed_contracts(args.seed_contracts, run_id)
+        warm_up(flows)
+        drain(args.drain_seconds)
+        for concurrency in levels_to_run:
+            services.reset()
+            # Nomor kontrak/topik unik per tingkat, supaya upload tidak dianggap duplikat tingkat sebelumnya
+            for flow in flows:
+                flow.run_id = f"{run_id}-{concurrency}"
+            summary, memory, elapsed = run_level(flows, concurrency, args.duration)
+            level = {
+                "concurrency": concurrency,
+                "elapsed_s": elapsed,
+                "flows": summary,
+                "memory_mb": memory,
+                "backlog": drain(args.drain_seconds),
+                "services": services.stats(),
+            }
+            level["meets_slo"] = meets_slo(level, args.slo_p95_ms, args.max_error_rate)
+            levels.append(level)
+            print_level(level)
+    finally:
+        services.stop()
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    passing = [lvl["concurrency"] for lvl in levels if lvl["meets_slo"]]
+    capacity = max(passing) if passing else 0
+    print(f"\nKapasitas (p95 <= {args.slo_p95_ms:.0f} ms, error <= {args.max_error_rate:.0%}): "
+          f"{capacity} pengguna bersamaan")
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            "flows": flow_names, "duration_s": args.duration, "review_workers": args.review_workers,
+            "rate_limits": not args.no_rate_limits, "services": config,
+            "slo_p95_ms": args.slo_p95_ms, "max_error_rate": args.max_error_rate,
+        },
+        "capacity": capacity,
+        "levels": levels,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Hasil disimpan ke {output}")
+    if baseline:
+        return 1 if compare(levels, baseline) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""Benchmark offline untuk ekstraksi PDF, penyimpanan kontrak, scan expiry, dan format pesan.
+
+Contoh:
+    python -m benchmarks.run --output bench_results.json
+    python -m benchmarks.run --sizes 1000,100000 --baseline bench_results_lama.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks import corpus
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+DEFAULT_PAGES = [1, 20, 200]
+# Lebih lambat dari ini dibanding baseline ditandai sebagai regresi
+REGRESSION_RATIO = 1.2
+
+
+def measure(fn, repeat, setup=None):
+    """Durasi (detik) setiap pengulangan; setup() tidak ikut diukur"""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def record(results, name, params, samples, items=1):
+    ordered = sorted(samples)
+    mean = sum(ordered) / len(ordered)
+    entry = {
+        "name": name,
+        "params": params,
+        "repeat": len(ordered),
+        "mean_ms": mean * 1000,
+        "p50_ms": ordered[len(ordered) // 2] * 1000,
+        "p95_ms": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))] * 1000,
+        "min_ms": ordered[0] * 1000,
+    }
+    if items > 1:
+        entry["items_per_sec"] = items / mean if mean else None
+    results.append(entry)
+    print(f"{name:<28} {json.dumps(params):<60} {entry['mean_ms']:>10.2f} ms")
+
+
+# === PDF ===
+def bench_pdf(results, workdir, page_counts, repeat):
+    import pdf_cache
+    from pdf_extract import extract_expiry_from_pdf, extract_text_from_pdf
+
+    def clear_cache():
+        shutil.rmtree(pdf_cache.CACHE_DIR, ignore_errors=True)
+
+    variants = [(pages, position, 0.0, 0.0) for pages in page_counts for position in corpus.DATE_POSITIONS]
+    variants += [(max(page_counts), "last", 0.2, 0.2)]
+    for pages, position, blank, scanned in variants:
+        path = os.path.join(workdir, f"kontrak_{pages}_{position}_{blank}_{scanned}.pdf")
+        corpus.write_contract_pdf(path, pages, position, blank, scanned)
+        params = {"pages": pages, "date": position, "blank": blank, "scanned": scanned}
+
+        def expiry():
+            extract_expiry_from_pdf(path)
+
+        def text():
+            with open(path, "rb") as f:
+                extract_text_from_pdf(f)
+
+        record(results, "extract_expiry_from_pdf", {**params, "cache": "cold"},
+               measure(expiry, repeat, setup=clear_cache))
+        record(results, "extract_expiry_from_pdf", {**params, "cache": "warm"}, measure(expiry, repeat))
+        if position == "first":
+            record(results, "extract_text_from_pdf", {**params, "cache": "cold"},
+                   measure(text, repeat, setup=clear_cache))
+            record(results, "extract_text_from_pdf", {**params, "cache": "warm"}, measure(text, repeat))
+
+
+# === Penyimpanan & scan expiry ===
+def bench_store(results, workdir, sizes, repeat):
+    import contract_store
+
+    for size in sizes:
+        # Tabel besar cukup diukur beberapa kali saja
+        n = repeat if size <= 100_000 else max(1, min(repeat, 3))
+        sheet = corpus.write_sheet(os.path.join(workdir, f"sheet_{size}.csv"), size)
+        db_file = os.path.join(workdir, f"contracts_{size}.db")
+        conn = contract_store.get_connection(db_file)
+        params = {"rows": size}
+
+        start = time.perf_counter()
+        contract_store.import_csv(sheet, conn=conn)
+        record(results, "import_csv", params, [time.perf_counter() - start], items=size)
+
+        new_rows = list(corpus.contract_rows(100, seed=size))
+        samples = measure(lambda: [contract_store.add_contract(row, conn=conn) for row in new_rows], n)
+        record(results, "save_sheet (1 baris)", params, [s / len(new_rows) for s in samples])
+
+        record(results, "load_sheet", params, measure(lambda: contract_store.load_contracts(conn=conn), n))
+        record(results, "expiring_contracts", {**params, "horizon": 90},
+               measure(lambda: contract_store.expiring_contracts(90, conn=conn), n))
+        record(results, "expiry_calendar", {**params, "horizon": 90},
+               measure(lambda: contract_store.expiry_calendar(90, conn=conn), n))
+
+
+# === Field kontrak ===
+def bench_fields(results, page_counts, repeat):
+    from contract_fields import FIELDS, extract_fields
+
+    # Tanggal expiry di halaman terakhir: semua halaman di-scan, jadi biayanya sebanding antar jumlah field
+    for page_count in page_counts:
+        pages = corpus.contract_pages(page_count, "last", seed=page_count)
+        for n in range(1, len(FIELDS) + 1):
+            fields = FIELDS[:n]
+            record(results, "extract_fields", {"pages": page_count, "fields": n},
+                   measure(lambda: extract_fields(enumerate(pages), fields), repeat), items=page_count)
+
+
+# === Startup & rerun Streamlit ===
+COLD_START_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+sys.path.insert(0, {repo!r})
+from streamlit.testing.v1 import AppTest
+AppTest.from_file({script!r}, default_timeout=120).run()
+print(time.perf_counter() - start)
+"""
+RERUN_MENUS = ["Tambah Kontrak", "Daftar Kontrak", "Cek Kontrak Expired", "Cari Klausul"]
+
+
+def bench_startup(results, workdir, rows, repeat):
+    import contract_store
+    from streamlit.testing.v1 import AppTest
+
+    conn = contract_store.get_connection()
+    if contract_store.count_contracts(conn=conn) < rows:
+        contract_store.add_contracts(corpus.contract_rows(rows), conn=conn)
+    script = os.path.join(REPO_DIR, "review.py")
+    params = {"script": "review.py", "rows": rows}
+
+    # Cold start: interpreter baru sampai halaman pertama selesai dirender
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", COLD_START_SCRIPT.format(repo=REPO_DIR, script=script)],
+                       cwd=workdir, check=True, capture_output=True)
+        samples.append(time.perf_counter() - start)
+    record(results, "streamlit cold start", params, samples)
+
+    # Rerun: satu interaksi (ganti menu) pada proses yang sudah berjalan
+    at = AppTest.from_file(script, default_timeout=120).run()
+    for menu in RERUN_MENUS:
+        samples = []
+        for _ in range(repeat):
+            at.sidebar.selectbox[0].select(RERUN_MENUS[0] if menu != RERUN_MENUS[0] else RERUN_MENUS[1]).run()
+            start = time.perf_counter()
+            at.sidebar.selectbox[0].select(menu).run()
+            samples.append(time.perf_counter() - start)
+        record(results, "streamlit rerun", {**params, "menu": menu}, samples)
+
+
+# === Format pesan ===
+def bench_format(results, repeat):
+    from notifications import format_review_message
+
+    reviews = [
+        {"status": "ok", "review": "Kontrak wajar, perhatikan klausul denda. " * 5},
+        {"status": "error", "message": "timeout"},
+        "respon bukan JSON",
+    ]
+    count = 10_000
+
+    def run():
+        for i in range(count):
+            format_review_message(f"kontrak_{i}.pdf", reviews[i % len(reviews)])
+
+    record(results, "format_review_message", {"messages": count}, measure(run, repeat), items=count)
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["name"], json.dumps(r["params"], sort_keys=True)): r for r in baseline["results"]}
+    print(f"\nPerbandingan dengan {baseline_path} (rasio waktu rata-rata, >1 berarti lebih lambat):")
+    regressions = 0
+    for r in results:
+        prev = old.get((r["name"], json.dumps(r["params"], sort_keys=True)))
+        if not prev or not prev["mean_ms"]:
+            continue
+        ratio = r["mean_ms"] / prev["mean_ms"]
+        flag = "  <-- REGRESI" if ratio > REGRESSION_RATIO else ""
+        regressions += bool(flag)
+        print(f"{r['name']:<28} {json.dumps(r['params']):<60} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark offline Sistem Monitoring Kontrak")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)), help="Jumlah baris sheet")
+    parser.add_argument("--pages", default=",".join(map(str, DEFAULT_PAGES)), help="Jumlah halaman PDF")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--startup-rows", type=int, default=10_000, help="Jumlah kontrak untuk benchmark startup")
+    parser.add_argument("--only", choices=["pdf", "fields", "store", "startup", "format"], action="append",
+                        help="Jalankan kelompok tertentu saja (boleh diulang)")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="Hasil benchmark sebelumnya untuk dibandingkan")
+    parser.add_argument("--workdir", help="Folder kerja (default: folder sementara yang dihapus setelahnya)")
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    workdir = args.workdir or tempfile.mkdtemp(prefix="kontrak-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    # Semua file (database, cache, uploads) dibuat di folder kerja, bukan di repo
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+
+    groups = args.only or ["pdf", "fields", "store", "startup", "format"]
+    results = []
+    try:
+        if "pdf" in groups:
+            bench_pdf(results, workdir, [int(p) for p in args.pages.split(",")], args.repeat)
+        if "fields" in groups:
+            bench_fields(results, [int(p) for p in args.pages.split(",")], args.repeat)
+        if "store" in groups:
+            bench_store(results, workdir, [int(s) for s in args.sizes.split(",")], args.repeat)
+        if "startup" in groups:
+            bench_startup(results, workdir, args.startup_rows, args.repeat)
+        if "format" in groups:
+            bench_format(results, args.repeat)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nHasil disimpan ke {output}")
+    if baseline:
+        return 1 if compare(results, baseline) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""Impor massal arsip kontrak PDF (folder atau ZIP) tanpa Streamlit.
+
+Contoh:
+    python bulk_import.py arsip_klien.zip --manifest manifest.csv --workers 8
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import clause_index
+import contract_store
+import upload_store
+from pdf_extract import extract_expiry_from_pdf
+
+logger = logging.getLogger(__name__)
+
+# === Konfigurasi ===
+BATCH_SIZE = 200
+# Awal pesan error untuk file yang isinya sudah tersimpan; file seperti ini tidak perlu dicoba lagi
+DUPLICATE_PREFIX = "Duplikat dari"
+
+
+def list_sources(source):
+    """Daftar (path_arsip, nama_member) semua PDF di folder atau file ZIP"""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            return [(source, info.filename) for info in zf.infolist()
+                    if not info.is_dir() and info.filename.lower().endswith(".pdf")]
+    tasks = []
+    for root, _, files in os.walk(source):
+        for name in sorted(files):
+            if name.lower().endswith(".pdf"):
+                tasks.append((None, os.path.join(root, name)))
+    return sorted(tasks, key=lambda t: t[1])
+
+
+def load_manifest(manifest_path):
+    """Baca manifest CSV berkolom FileName,ContractID"""
+    with open(manifest_path, newline="", encoding="utf-8") as f:
+        return {row["FileName"]: row["ContractID"] for row in csv.DictReader(f)}
+
+
+def contract_id_for(file_name, manifest):
+    if manifest is not None:
+        return manifest.get(file_name)
+    return os.path.splitext(file_name)[0]
+
+
+def process_file(task):
+    """Dijalankan di worker: simpan PDF ke blob store lalu ekstrak tanggal expiry"""
+    archive, member = task
+    file_name = os.path.basename(member)
+    digest = None
+    try:
+        if archive:
+            with zipfile.ZipFile(archive) as zf, zf.open(member) as src:
+                digest, _, _ = upload_store.store(src)
+        else:
+            digest, _, _ = upload_store.store(member)
+        duplicate = contract_store.find_by_blob(digest)
+        if duplicate:
+            return member, file_name, digest, None, f"{DUPLICATE_PREFIX} kontrak {duplicate['ContractID']}"
+        expiry = extract_expiry_from_pdf(upload_store.blob_path(digest))
+        if not expiry:
+            return member, file_name, digest, None, "Tanggal expired tidak ditemukan di PDF"
+        try:
+            clause_index.index_blob(digest)
+        except Exception:
+            # Kontrak tetap diimpor; dokumen ini akan dicoba lagi oleh clause_index.reindex()
+            logger.exception("Gagal mengindeks %s", member)
+        return member, file_name, digest, expiry, None
+    except Exception as e:
+        return member, file_name, digest, None, str(e)
+
+
+def load_progress(progress_path):
+    if not os.path.exists(progress_path):
+        return set()
+    with open(progress_path, encoding="utf-8") as f:
+        return {json.loads(line) for line in f if line.strip()}
+
+
+def run_import(source, manifest_path=None, workers=None, batch_size=BATCH_SIZE,
+               report_path="bulk_import_errors.csv", progress_path=None):
+    progress_path = progress_path or f"{os.path.basename(os.path.normpath(source))}.progress"
+    manifest = load_manifest(manifest_path) if manifest_path else None
+    done = load_progress(progress_path)
+    tasks = [t for t in list_sources(source) if t[1] not in done]
+    logger.info("%d PDF akan diproses (%d sudah selesai sebelumnya)", len(tasks), len(done))
+
+    imported = failed = 0
+    batch_rows = []
+    batch_keys = []  # hanya file yang selesai (diimpor atau duplikat); file gagal dicoba lagi saat diulang
+    batch_count = 0
+    seen = {}  # digest -> nama file pertama di impor ini (duplikat yang belum masuk database)
+    started = time.monotonic()
+    new_report = not os.path.exists(report_path)
+
+    with open(report_path, "a", newline="", encoding="utf-8") as report_file, \
+            open(progress_path, "a", encoding="utf-8") as progress_file:
+        report = csv.writer(report_file)
+        if new_report:
+            report.writerow(["Source", "FileName", "Error"])
+
+        def flush():
+            # Kontrak dan progres ditulis per batch: kalau proses berhenti, batch berikutnya diulang
+            nonlocal batch_count
+            contract_store.add_contracts(batch_rows)
+            for key in batch_keys:
+                progress_file.write(json.dumps(key) + "\n")
+            progress_file.flush()
+            report_file.flush()
+            batch_rows.clear()
+            batch_keys.clear()
+            batch_count = 0
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for member, file_name, digest, expiry, error in pool.map(process_file, tasks, chunksize=4):
+                contract_id = contract_id_for(file_name, manifest)
+                if error is None and not contract_id:
+                    error = "ContractID tidak ada di manifest"
+                if error is None and digest in seen:
+                    error = f"{DUPLICATE_PREFIX} file {seen[digest]}"
+                if error is None:
+                    seen[digest] = file_name
+                    batch_rows.append({"ContractID": contract_id, "FileName": file_name, "ExpiryDate": expiry,
+                                       "UploadedAt": datetime.now().isoformat(), "BlobDigest": digest})
+                    imported += 1
+                else:
+                    report.writerow([member, file_name, error])
+                    failed += 1
+                if error is None or error.startswith(DUPLICATE_PREFIX):
+                    batch_keys.append(member)
+                batch_count += 1
+                if batch_count >= batch_size:
+                    flush()
+                    elapsed = time.monotonic() - started
+                    rate = (imported + failed) / elapsed * 60 if elapsed else 0
+                    logger.info("[%d/%d] %d diimpor, %d gagal (%.0f PDF/menit)",
+                                imported + failed, len(tasks), imported, failed, rate)
+            if batch_count:
+                flush()
+
+    # Dokumen diindeks di worker sebelum kontraknya disimpan; yang kontraknya gagal disimpan dibuang
+    clause_index.prune()
+    logger.info("Selesai: %d diimpor, %d gagal. Laporan error: %s", imported, failed, report_path)
+    return imported, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Impor massal kontrak PDF dari folder atau ZIP")
+    parser.add_argument("source", help="Folder atau file ZIP berisi PDF kontrak")
+    parser.add_argument("--manifest", help="CSV berkolom FileName,ContractID (default: ContractID = nama file)")
+    parser.add_argument("--workers", type=int, default=None, help="Jumlah proses (default: jumlah CPU)")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--report", default="bulk_import_errors.csv", help="File CSV laporan error per file")
+    parser.add_argument("--progress", help="File progres untuk melanjutkan impor yang terhenti")
+    args = parser.parse_args()
+    # Progres impor dilaporkan lewat logging; di CLI ditampilkan apa adanya
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if not os.path.exists(args.source):
+        sys.exit(f"Sumber tidak ditemukan: {args.source}")
+    run_import(args.source, args.manifest, args.workers, args.batch_size, args.report, args.progress)
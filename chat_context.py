@@ -0,0 +1,86 @@
+import metrics
+import rate_limit
+from tokens import CHARS_PER_TOKEN, estimate_tokens
+
+# Token budget for the history sent with each turn (the model's reply is extra).
+CONTEXT_TOKENS = 3000
+# Room reserved for the rolling summary of older turns.
+SUMMARY_TOKENS = 400
+# When the window overflows it is trimmed to this fraction of its budget, so the
+# summary is refreshed every few turns instead of on every turn.
+LOW_WATERMARK = 0.6
+# Rough per-message overhead of the chat format (role, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = (
+    "Update the running summary of a conversation between a user and an assistant. "
+    "Keep facts, decisions, names and open questions; drop small talk. "
+    "Answer with the updated summary only, in at most {limit} words.\n\n"
+    "Current summary:\n{summary}\n\nNew messages:\n{messages}"
+)
+
+
+def message_tokens(message):
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def new_state():
+    # "start" is the index of the first message still sent verbatim;
+    # everything before it is folded into "summary".
+    return {"summary": "", "start": 0}
+
+
+def build_context(messages, state, summarize, budget=CONTEXT_TOKENS):
+    """Return the messages to send for this turn, updating the rolling summary in `state`.
+
+    `summarize(summary, messages)` is only called with the turns that just left the
+    window, so older turns are never summarized twice.
+    """
+    window_budget = budget - SUMMARY_TOKENS
+    start = state["start"]
+    costs = [message_tokens(m) for m in messages[start:]]
+    total = sum(costs)
+    if total > window_budget:
+        target = window_budget * LOW_WATERMARK
+        # Always keep the latest message, even if it alone is over budget.
+        while total > target and start < len(messages) - 1:
+            total -= costs[start - state["start"]]
+            start += 1
+        # Nothing left the window when the newest message alone is over budget.
+        if start > state["start"]:
+            with metrics.timer("chat.summarize"):
+                state["summary"] = summarize(state["summary"], messages[state["start"]:start])
+            state["start"] = start
+
+    context = []
+    if state["summary"]:
+        context.append({"role": "system", "content": f"Summary of the earlier conversation: {state['summary']}"})
+    context.extend({"role": m["role"], "content": m["content"]} for m in messages[state["start"]:])
+    if context and message_tokens(context[-1]) > window_budget:
+        # A single oversized message is cut to the window instead of being sent whole.
+        max_chars = (window_budget - MESSAGE_OVERHEAD_TOKENS) * CHARS_PER_TOKEN
+        context[-1]["content"] = context[-1]["content"][:max_chars]
+        metrics.incr("chat.truncated")
+    metrics.incr("chat.turns")
+    metrics.incr("chat.prompt_tokens", sum(message_tokens(m) for m in context))
+    return context
+
+
+def openai_summarizer(client, model):
+    """Build a `summarize` callback that asks the chat model to fold turns into the summary."""
+    limit = SUMMARY_TOKENS * 3 // 4
+
+    def summarize(summary, messages):
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        with rate_limit.slot("openai", rate_limit.INTERACTIVE):
+            response = client.chat.completions.create(
+                model=model,
+                messages=[{
+                    "role": "user",
+                    "content": SUMMARY_PROMPT.format(limit=limit, summary=summary or "(none)", messages=transcript),
+                }],
+                max_tokens=SUMMARY_TOKENS,
+            )
+        return response.choices[0].message.content
+
+    return summarize
@@ -0,0 +1,246 @@
+"""Pencarian klausul: indeks teks lengkap (SQLite FTS5) per halaman kontrak.
+
+Dokumen diindeks per blob (isi file), jadi file yang sama tidak pernah diindeks dua
+kali dan reindex() hanya memproses blob yang belum terindeks. Selain per halaman, teks
+juga diindeks per potongan kecil (CHUNK_TOKENS) untuk retrieval chatbot (contract_retrieval.py).
+
+Contoh:
+    python clause_index.py reindex
+    python clause_index.py search '"force majeure" denda*'
+"""
+import html
+import logging
+import re
+import time
+
+import contract_store
+import metrics
+import upload_store
+from pdf_extract import extract_pages_from_pdf
+from tokens import split_text
+
+logger = logging.getLogger(__name__)
+
+# === Konfigurasi ===
+# Naikkan INDEX_VERSION jika isi indeks berubah (misalnya cara teks diekstrak) supaya reindex() memproses ulang
+INDEX_VERSION = "2"
+# Ukuran potongan untuk retrieval: cukup kecil supaya beberapa potongan muat di satu prompt
+CHUNK_TOKENS = 200
+SNIPPET_TOKENS = 24
+# BM25 dihitung per halaman yang cocok; untuk kata yang sangat umum peringkat hanya dihitung
+# atas halaman terbaru sebanyak ini supaya query tetap < 100 ms
+RANK_CANDIDATES = 5000
+# Penanda highlight di snippet; diganti jadi HTML oleh pemanggil (lihat highlight_html)
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+WORD_PATTERN = re.compile(r"\w+")
+QUERY_PATTERN = re.compile(r'"([^"]*)"?|(\S+)')
+
+
+def to_fts_query(text):
+    """Ubah input pengguna jadi query FTS5 yang aman.
+
+    "kata kata" = frasa, kata* = awalan, selain itu semua kata harus ada (AND).
+    Tanda baca lain diabaikan sehingga input bebas tidak bisa membuat query error.
+    """
+    parts = []
+    for phrase, term in QUERY_PATTERN.findall(text):
+        words = WORD_PATTERN.findall(phrase or term)
+        if not words:
+            continue
+        part = f'"{" ".join(words)}"'
+        if term.endswith("*"):
+            part += "*"
+        parts.append(part)
+    return " ".join(parts)
+
+
+def is_indexed(digest, conn=None):
+    conn = conn or contract_store.get_connection()
+    row = conn.execute("SELECT version FROM fts_docs WHERE digest = ?", (digest,)).fetchone()
+    return row is not None and row["version"] == INDEX_VERSION
+
+
+def remove(digest, conn):
+    """Hapus semua halaman satu dokumen dari indeks (dipanggil di dalam transaksi)"""
+    ids = [(r["id"],) for r in conn.execute("SELECT id FROM fts_pages WHERE digest = ?", (digest,))]
+    conn.executemany("DELETE FROM pages_fts WHERE rowid = ?", ids)
+    conn.execute("DELETE FROM fts_pages WHERE digest = ?", (digest,))
+    ids = [(r["id"],) for r in conn.execute("SELECT id FROM fts_chunks WHERE digest = ?", (digest,))]
+    conn.executemany("DELETE FROM chunks_fts WHERE rowid = ?", ids)
+    conn.execute("DELETE FROM fts_chunks WHERE digest = ?", (digest,))
+    conn.execute("DELETE FROM fts_docs WHERE digest = ?", (digest,))
+
+
+def index_document(digest, pages, conn=None):
+    """Ganti isi indeks untuk satu dokumen dengan teks per halaman `pages`"""
+    conn = conn or contract_store.get_connection()
+    with contract_store.transaction(conn):
+        remove(digest, conn)
+        for page, text in enumerate(pages, start=1):
+            if not text.strip():
+                continue
+            cur = conn.execute("INSERT INTO fts_pages (digest, page) VALUES (?, ?)", (digest, page))
+            conn.execute("INSERT INTO pages_fts (rowid, text) VALUES (?, ?)", (cur.lastrowid, text))
+            for chunk in split_text(text, CHUNK_TOKENS):
+                cur = conn.execute("INSERT INTO fts_chunks (digest, page) VALUES (?, ?)", (digest, page))
+                conn.execute("INSERT INTO chunks_fts (rowid, text) VALUES (?, ?)", (cur.lastrowid, chunk))
+        conn.execute(
+            "INSERT OR REPLACE INTO fts_docs (digest, version, indexed_at) VALUES (?, ?, ?)",
+            (digest, INDEX_VERSION, time.time()),
+        )
+
+
+@metrics.timed("search.index")
+def index_blob(digest, conn=None):
+    """Indeks satu file dari blob store; False jika sudah terindeks dengan versi sekarang"""
+    conn = conn or contract_store.get_connection()
+    if is_indexed(digest, conn):
+        return False
+    pages = extract_pages_from_pdf(upload_store.blob_path(digest), digest=digest)
+    index_document(digest, pages, conn)
+    metrics.incr("search.documents_indexed")
+    return True
+
+
+def pending(conn=None):
+    """Blob milik kontrak yang belum (atau versi lama) terindeks"""
+    conn = conn or contract_store.get_connection()
+    rows = conn.execute(
+        "SELECT DISTINCT c.BlobDigest FROM contracts c "
+        "LEFT JOIN fts_docs d ON d.digest = c.BlobDigest "
+        "WHERE c.BlobDigest IS NOT NULL AND (d.digest IS NULL OR d.version != ?)",
+        (INDEX_VERSION,),
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def prune(conn=None):
+    """Buang dari indeks dokumen yang blob-nya sudah dihapus upload_store.gc() atau tidak dipakai kontrak mana pun.
+
+    Dokumen tanpa kontrak (misalnya dari impor massal yang gagal menyimpan kontraknya) tidak pernah
+    tampil di hasil, tetapi tetap memakan jatah RANK_CANDIDATES di search() dan retrieval.
+    """
+    conn = conn or contract_store.get_connection()
+    stale = conn.execute(
+        "SELECT digest FROM fts_docs d WHERE digest NOT IN (SELECT digest FROM blobs) "
+        "OR NOT EXISTS (SELECT 1 FROM contracts c WHERE c.BlobDigest = d.digest)"
+    ).fetchall()
+    with contract_store.transaction(conn):
+        for row in stale:
+            remove(row["digest"], conn)
+    return len(stale)
+
+
+def reindex(conn=None, progress=None):
+    """Indeks hanya dokumen yang baru atau berubah; kembalikan (berhasil, gagal)"""
+    conn = conn or contract_store.get_connection()
+    prune(conn)
+    digests = pending(conn)
+    done = failed = 0
+    for i, digest in enumerate(digests, start=1):
+        try:
+            index_blob(digest, conn)
+            done += 1
+        except Exception:
+            logger.exception("Gagal mengindeks %s", digest)
+            failed += 1
+        if progress:
+            progress(i, len(digests))
+    return done, failed
+
+
+@metrics.timed("search.query")
+def search(query, limit=20, conn=None):
+    """Kontrak yang cocok dengan query, urut relevansi (BM25); kembalikan (hasil, jumlah_halaman_cocok).
+
+    Setiap hasil berisi kolom kontrak, halaman yang cocok, dan snippet halaman terbaik
+    dengan kata yang cocok diapit MARK_START/MARK_END.
+    """
+    conn = conn or contract_store.get_connection()
+    fts_query = to_fts_query(query)
+    if not fts_query:
+        return [], 0
+    # Menghitung kecocokan murah (hanya doclist); yang mahal adalah BM25 per halaman
+    matched = conn.execute(
+        "SELECT COUNT(*) FROM pages_fts WHERE pages_fts MATCH ?", (fts_query,)
+    ).fetchone()[0]
+    if not matched:
+        return [], 0
+    min_rowid = 0
+    if matched > RANK_CANDIDATES:
+        min_rowid = conn.execute(
+            "SELECT rowid FROM pages_fts WHERE pages_fts MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+            (fts_query, RANK_CANDIDATES - 1),
+        ).fetchone()[0]
+    # Ambil lebih banyak halaman daripada limit karena satu kontrak bisa cocok di banyak halaman
+    hits = conn.execute(
+        "SELECT p.digest, p.page, bm25(pages_fts) AS score, "
+        f"snippet(pages_fts, 0, ?, ?, ' … ', {SNIPPET_TOKENS}) AS snippet "
+        "FROM pages_fts JOIN fts_pages p ON p.id = pages_fts.rowid "
+        "WHERE pages_fts MATCH ? AND pages_fts.rowid >= ? ORDER BY rank LIMIT ?",
+        (MARK_START, MARK_END, fts_query, min_rowid, limit * 5),
+    ).fetchall()
+    docs = {}
+    for hit in hits:
+        doc = docs.get(hit["digest"])
+        if doc is None:
+            if len(docs) == limit:
+                continue
+            doc = docs[hit["digest"]] = {
+                "score": -hit["score"], "page": hit["page"], "snippet": hit["snippet"], "pages": [],
+            }
+        doc["pages"].append(hit["page"])
+    if not docs:
+        return [], matched
+    placeholders = ", ".join("?" * len(docs))
+    contracts = conn.execute(
+        f"SELECT {', '.join(contract_store.COLUMNS)}, BlobDigest FROM contracts "
+        f"WHERE BlobDigest IN ({placeholders}) ORDER BY id",
+        list(docs),
+    ).fetchall()
+    results = []
+    for row in contracts:
+        doc = docs[row["BlobDigest"]]
+        results.append({**{c: row[c] for c in contract_store.COLUMNS}, **doc, "pages": sorted(doc["pages"])})
+    results.sort(key=lambda r: r["score"], reverse=True)
+    return results, matched
+
+
+def highlight_html(snippet):
+    """Snippet aman untuk st.markdown(..., unsafe_allow_html=True) dengan kata yang cocok ditandai"""
+    return html.escape(snippet).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def stats(conn=None):
+    conn = conn or contract_store.get_connection()
+    return {
+        "documents": conn.execute("SELECT COUNT(*) FROM fts_docs").fetchone()[0],
+        "pages": conn.execute("SELECT COUNT(*) FROM fts_pages").fetchone()[0],
+        "chunks": conn.execute("SELECT COUNT(*) FROM fts_chunks").fetchone()[0],
+        "pending": len(pending(conn)),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Indeks dan pencarian klausul kontrak")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("reindex", help="Indeks kontrak yang belum terindeks")
+    p_search = sub.add_parser("search", help="Cari klausul")
+    p_search.add_argument("query")
+    p_search.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    if args.command == "reindex":
+        done, failed = reindex()
+        print(f"{done} dokumen diindeks, {failed} gagal")
+    elif args.command == "search":
+        results, matched = search(args.query, args.limit)
+        print(f"{matched} halaman cocok")
+        for r in results:
+            snippet = r["snippet"].replace(MARK_START, "[").replace(MARK_END, "]")
+            print(f"{r['ContractID']} ({r['FileName']}) hal. {r['pages']}: {snippet}")
@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import llm_cache
+import metrics
+import rate_limit
+from tokens import estimate_tokens, split_text
+
+# === Konfigurasi ===
+MODEL = "gpt-3.5-turbo"  # Anda bisa coba "gpt-4" jika memiliki akses
+TEMPERATURE = 0.7
+SYSTEM_PROMPT = (
+    "Anda adalah asisten yang ahli dalam menganalisis dokumen kontrak. "
+    "Berikan ringkasan, poin-poin penting, potensi risiko, dan klausul kunci."
+)
+# Anggaran token input per panggilan; dokumen yang lebih panjang dipecah (map) lalu digabung (reduce)
+CHUNK_TOKENS = 12000
+MAX_WORKERS = 4
+MAX_RESPONSE_TOKENS = 1000  # Batasi panjang respons dari model
+NOTE_RESPONSE_TOKENS = 600
+
+ANALYZE_PROMPT = (
+    "Harap analisis dokumen kontrak berikut dan berikan poin-poin penting, potensi risiko, "
+    "dan klausul kunci. Juga, ringkaslah inti kontrak. \n\nKontrak:\n{text}"
+)
+MAP_PROMPT = (
+    "Berikut bagian {index} dari {total} sebuah dokumen kontrak. Catat secara singkat poin-poin penting, "
+    "potensi risiko, dan klausul kunci yang ada di bagian ini saja.\n\nBagian kontrak:\n{text}"
+)
+COMBINE_PROMPT = (
+    "Berikut catatan analisis dari beberapa bagian sebuah dokumen kontrak. Gabungkan menjadi satu "
+    "catatan yang padat tanpa duplikasi.\n\nCatatan:\n{text}"
+)
+REDUCE_PROMPT = (
+    "Berikut catatan analisis dari setiap bagian sebuah dokumen kontrak. Susun menjadi satu laporan "
+    "berisi ringkasan inti kontrak, poin-poin penting, potensi risiko, dan klausul kunci. "
+    "Hilangkan duplikasi.\n\nCatatan:\n{text}"
+)
+
+
+@metrics.timed("openai.analysis_call")
+def complete(client, prompt, max_tokens=MAX_RESPONSE_TOKENS):
+    """Satu panggilan chat completion dengan system prompt analis kontrak.
+
+    Analisis (bisa puluhan panggilan per dokumen) antre di belakang chat interaktif.
+    """
+    with rate_limit.slot("openai", rate_limit.BULK):
+        response = client.chat.completions.create(
+            model=MODEL,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=TEMPERATURE,
+            max_tokens=max_tokens,
+        )
+    return response.choices[0].message.content
+
+
+def split_contract(contract_text, chunk_tokens=CHUNK_TOKENS):
+    return split_text(contract_text, chunk_tokens)
+
+
+def _reduce(client, notes, pool, chunk_tokens):
+    """Gabungkan catatan bertahap sampai muat dalam satu prompt, lalu susun laporan akhir"""
+    joined = "\n\n---\n\n".join(notes)
+    while estimate_tokens(joined) > chunk_tokens:
+        groups = split_text(joined, chunk_tokens)
+        notes = list(pool.map(
+            lambda group: complete(client, COMBINE_PROMPT.format(text=group), NOTE_RESPONSE_TOKENS),
+            groups,
+        ))
+        joined = "\n\n---\n\n".join(notes)
+    return complete(client, REDUCE_PROMPT.format(text=joined))
+
+
+@metrics.timed("openai.analyze_contract")
+def analyze_contract(contract_text, client, chunk_tokens=CHUNK_TOKENS, max_workers=MAX_WORKERS):
+    """Analisis kontrak utuh: potongan dianalisis paralel (map), lalu hasilnya digabung (reduce)"""
+    chunks = split_contract(contract_text, chunk_tokens)
+    if len(chunks) <= 1:
+        return complete(client, ANALYZE_PROMPT.format(text=contract_text))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        notes = list(pool.map(
+            lambda item: complete(
+                client,
+                MAP_PROMPT.format(index=item[0] + 1, total=len(chunks), text=item[1]),
+                NOTE_RESPONSE_TOKENS,
+            ),
+            enumerate(chunks),
+        ))
+        return _reduce(client, notes, pool, chunk_tokens)
+
+
+def analysis_cache_key(contract_text, chunk_tokens=CHUNK_TOKENS):
+    """Kunci cache: teks ternormalisasi + model + semua prompt + parameter sampling"""
+    return llm_cache.make_key(
+        text=llm_cache.normalize_text(contract_text),
+        model=MODEL,
+        system=SYSTEM_PROMPT,
+        prompts=[ANALYZE_PROMPT, MAP_PROMPT, COMBINE_PROMPT, REDUCE_PROMPT],
+        temperature=TEMPERATURE,
+        max_tokens=[MAX_RESPONSE_TOKENS, NOTE_RESPONSE_TOKENS],
+        chunk_tokens=chunk_tokens,
+    )
+
+
+def analyze_contract_cached(contract_text, client, bypass_cache=False, on_compute=None, **kwargs):
+    """analyze_contract dengan cache di disk; bypass_cache=True selalu memanggil OpenAI.
+
+    on_compute() dipanggil tepat sebelum analisis benar-benar dijalankan (tidak saat hasil dari cache).
+    """
+    key = analysis_cache_key(contract_text, kwargs.get("chunk_tokens", CHUNK_TOKENS))
+
+    def compute():
+        if on_compute:
+            on_compute()
+        return analyze_contract(contract_text, client, **kwargs)
+
+    return llm_cache.cached(key, compute, bypass=bypass_cache)
@@ -0,0 +1,283 @@
+"""Inti bersama review.py dan contract_review.py (Sistem Monitoring Kontrak).
+
+Streamlit menjalankan ulang script dari atas di setiap interaksi, jadi:
+- pekerjaan sekali-per-proses (folder upload, worker notifikasi dan review) ada di st.cache_resource;
+- hasil baca database ada di st.cache_data dengan contract_store.data_version() sebagai bagian
+  kunci cache, sehingga cache otomatis usang begitu ada kontrak yang ditulis;
+- modul berat (pandas, PyPDF2, requests, smtplib) baru di-import di halaman yang membutuhkannya.
+
+Review kontrak berjalan di proses worker (review_jobs.py); halaman upload hanya memasukkan job
+dan menampilkan statusnya.
+"""
+import os
+from datetime import date, datetime
+
+import streamlit as st
+
+import contract_store
+import metrics
+import review_jobs
+
+# === Konfigurasi ===
+MENU_ITEMS = ["Tambah Kontrak", "Daftar Kontrak", "Cek Kontrak Expired", "Cari Klausul", "Antrean Review"]
+# Interval refresh status job di halaman (hanya bagian status yang dijalankan ulang)
+JOB_REFRESH_SECONDS = 2
+JOB_STATUS_LABELS = {"queued": "⏳ Antre", "running": "⚙️ Diproses", "done": "✅ Selesai", "failed": "❌ Gagal"}
+
+
+@st.cache_resource
+def boot():
+    """Sekali per proses: folder upload, worker pengirim notifikasi, dan worker review"""
+    import notifications
+    import upload_store
+
+    os.makedirs(upload_store.BLOB_DIR, exist_ok=True)
+    notifications.start_worker()
+    return review_jobs.start_pool()
+
+
+# === Data (cache per versi data) ===
+@st.cache_data(max_entries=64, show_spinner=False)
+def count_contracts(filters, version):
+    return contract_store.count_contracts(filters)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def query_contracts(filters, sort_by, descending, limit, offset, version):
+    return contract_store.query_contracts(filters, sort_by, descending, limit, offset)
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def expiry_overview(horizon_days, today, version):
+    return contract_store.expiry_calendar(horizon_days, today), contract_store.expiring_contracts(horizon_days, today)
+
+
+def load_sheet():
+    """Ambil semua kontrak dari database"""
+    return contract_store.load_contracts()
+
+
+def save_sheet(row):
+    """Simpan satu baris kontrak baru (cache data ikut usang lewat data_version)"""
+    contract_store.add_contract(row)
+
+
+# === Halaman ===
+def _fields_caption(fields):
+    detected = []
+    if fields.get("start"):
+        detected.append(f"Mulai berlaku: {fields['start']['value']} ({fields['start']['confidence']:.0%})")
+    if fields.get("parties"):
+        parties = ", ".join(fields["parties"]["value"])
+        detected.append(f"Para pihak: {parties} ({fields['parties']['confidence']:.0%})")
+    if fields.get("value"):
+        amount = f"Rp {fields['value']['value']:,}".replace(",", ".")
+        detected.append(f"Nilai kontrak: {amount} ({fields['value']['confidence']:.0%})")
+    return " · ".join(detected)
+
+
+def render_job(job):
+    """Status dan hasil satu job review"""
+    import json
+
+    label = JOB_STATUS_LABELS.get(job["status"], job["status"])
+    stage = f" ({job['stage']})" if job["status"] == "running" and job["stage"] else ""
+    with st.expander(f"#{job['id']} · {job['file_name']} · {label}{stage}", expanded=job["status"] != "done"):
+        if job["status"] == "queued" and job["attempts"]:
+            st.caption(f"Percobaan ke-{job['attempts'] + 1}, error terakhir: {job['last_error']}")
+        elif job["status"] == "failed":
+            st.error(f"❌ {job['last_error']}")
+        elif job["status"] == "done":
+            result = json.loads(job["result"])
+            fields = result["fields"]
+            st.success(f"✅ Kontrak {job['file_name']} berhasil disimpan, Expiry: {fields['expiry']['value']}")
+            if fields["expiry"]["confidence"] < 0.5:
+                st.warning("⚠️ Tanggal expiry tidak berlabel di PDF (diambil dari tanggal terakhir), mohon dicek.")
+            caption = _fields_caption(fields)
+            if caption:
+                st.caption(caption)
+            st.subheader("📊 Hasil Review dari Streamline")
+            st.json(result["review"])
+            st.info("📬 Hasil review juga akan dikirim ke Telegram & Email (jika secrets sudah diisi).")
+
+
+def _render_jobs(jobs):
+    if jobs:
+        st.subheader("Status Review")
+    for job in jobs:
+        render_job(job)
+
+
+def _has_active_job(jobs):
+    return any(job["status"] in ("queued", "running") for job in jobs)
+
+
+@st.fragment(run_every=JOB_REFRESH_SECONDS)
+def _poll_session_jobs():
+    """Hanya fragment ini yang di-refresh selama masih ada job yang antre/berjalan"""
+    jobs = review_jobs.get_jobs(st.session_state.get("review_jobs", []))
+    _render_jobs(jobs)
+    if not _has_active_job(jobs):
+        # Semua job sudah selesai/gagal: sekali rerun halaman supaya polling berhenti
+        st.rerun()
+
+
+def render_session_jobs():
+    """Job yang dimasukkan sesi ini; dipantau berkala hanya selama ada yang belum selesai"""
+    jobs = review_jobs.get_jobs(st.session_state.get("review_jobs", []))
+    if _has_active_job(jobs):
+        _poll_session_jobs()
+    else:
+        _render_jobs(jobs)
+
+
+def render_upload(use_api_key=False, debug=False):
+    import upload_store
+
+    st.header("Upload Kontrak Baru")
+    contract_id = st.text_input("Contract ID")
+    uploaded_file = st.file_uploader("Upload PDF", type=["pdf"])
+
+    if uploaded_file and contract_id and st.button("Simpan & Review"):
+        with metrics.timer("upload.write_file"):
+            digest, _, _ = upload_store.store(uploaded_file)
+        # Cek duplikat sebelum memasukkan job supaya file yang sama tidak diproses ulang
+        duplicate = contract_store.find_by_blob(digest)
+        active = review_jobs.active_job_for_blob(digest)
+        if duplicate:
+            st.warning(f"⚠️ File ini sama dengan kontrak {duplicate['ContractID']} "
+                       f"({duplicate['FileName']}) yang sudah tersimpan, Expiry: {duplicate['ExpiryDate']}")
+        elif active:
+            st.warning(f"⚠️ File ini sedang direview (job #{active['id']}, {active['file_name']})")
+        else:
+            with metrics.timer("upload.enqueue_review"):
+                job_id = review_jobs.enqueue(contract_id, uploaded_file.name, digest,
+                                             {"use_api_key": use_api_key, "debug": debug})
+            st.session_state.setdefault("review_jobs", []).append(job_id)
+            st.success(f"✅ {uploaded_file.name} masuk antrean review (job #{job_id})")
+    render_session_jobs()
+
+
+def render_job_queue():
+    st.header("Antrean Review")
+    job_counts = review_jobs.counts()
+    for col, (status, label) in zip(st.columns(len(JOB_STATUS_LABELS)), JOB_STATUS_LABELS.items()):
+        col.metric(label, job_counts.get(status, 0))
+    jobs = review_jobs.recent_jobs()
+    if not jobs:
+        st.info("Belum ada job review.")
+        return
+    st.dataframe(
+        [{"Job": j["id"], "Status": JOB_STATUS_LABELS.get(j["status"], j["status"]), "Tahap": j["stage"],
+          "Contract ID": j["contract_id"], "File": j["file_name"], "Percobaan": j["attempts"],
+          "Dibuat": datetime.fromtimestamp(j["created_at"]).isoformat(timespec="seconds"),
+          "Error": j["last_error"]} for j in jobs],
+        width="stretch",
+    )
+
+
+def render_list():
+    st.header("Daftar Kontrak")
+    with st.expander("Filter & Urutan"):
+        col1, col2 = st.columns(2)
+        id_prefix = col1.text_input("Awalan Contract ID")
+        file_name = col2.text_input("Nama file mengandung")
+        expiry_range = col1.date_input("Rentang tanggal expiry", value=())
+        uploaded_range = col2.date_input("Rentang tanggal upload", value=())
+        sort_by = col1.selectbox("Urutkan berdasarkan", list(contract_store.SORT_COLUMNS), index=3)
+        descending = col2.checkbox("Urutan menurun", value=True)
+
+    # Rentang tanggal yang baru dipilih sebagian (satu tanggal) dipakai sebagai batas bawah saja
+    filters = {
+        "id_prefix": id_prefix.strip(),
+        "file_name": file_name.strip(),
+        "expiry_from": expiry_range[0] if len(expiry_range) > 0 else None,
+        "expiry_to": expiry_range[1] if len(expiry_range) > 1 else None,
+        "uploaded_from": uploaded_range[0] if len(uploaded_range) > 0 else None,
+        "uploaded_to": uploaded_range[1] if len(uploaded_range) > 1 else None,
+    }
+    version = contract_store.data_version()
+    total = count_contracts(filters, version)
+    if total == 0:
+        st.info("Belum ada kontrak." if not any(filters.values()) else "Tidak ada kontrak yang cocok dengan filter.")
+        return
+    col1, col2 = st.columns(2)
+    page_size = col1.selectbox("Baris per halaman", [25, 50, 100, 200], index=1)
+    page_count = (total + page_size - 1) // page_size
+    page = col2.number_input(f"Halaman (dari {page_count})", min_value=1, max_value=page_count, value=1)
+    offset = (page - 1) * page_size
+    df = query_contracts(filters, sort_by, descending, page_size, offset, version)
+    st.caption(f"Menampilkan {offset + 1}–{offset + len(df)} dari {total} kontrak")
+    st.dataframe(df, width="stretch")
+
+
+def render_expiring():
+    horizon = st.number_input("Horizon (hari)", min_value=1, value=90, step=30)
+    st.header(f"Kontrak yang Akan Expired (<{horizon} hari)")
+    version = contract_store.data_version()
+    if count_contracts(None, version) == 0:
+        st.info("Belum ada kontrak.")
+        return
+    calendar, expired_df = expiry_overview(horizon, date.today(), version)
+    for col, (label, count) in zip(st.columns(len(calendar)), calendar.items()):
+        col.metric(label, count)
+    if not expired_df.empty:
+        st.dataframe(expired_df)
+        st.caption(
+            f"Kontrak yang expired lebih dari {contract_store.EXPIRY_OVERDUE_DAYS} hari lalu "
+            "hanya dihitung, tidak ditampilkan."
+        )
+    else:
+        st.success(f"✅ Tidak ada kontrak yang akan expired dalam {horizon} hari.")
+
+
+def render_search():
+    import clause_index
+
+    st.header("Cari Klausul")
+    query = st.text_input("Kata atau frasa", placeholder='"force majeure" denda* penghentian')
+    st.caption('Gunakan "tanda kutip" untuk frasa dan akhiran * untuk awalan kata.')
+    pending = clause_index.pending()
+    if pending and st.button(f"Indeks {len(pending)} kontrak yang belum terindeks"):
+        bar = st.progress(0.0)
+        done, failed = clause_index.reindex(progress=lambda i, n: bar.progress(i / n))
+        st.success(f"✅ {done} kontrak diindeks" + (f", {failed} gagal" if failed else ""))
+    if not query:
+        return
+    results, matched = clause_index.search(query)
+    if not results:
+        st.info("Tidak ada kontrak yang cocok.")
+        return
+    st.caption(f"{matched} halaman cocok, menampilkan {len(results)} kontrak paling relevan")
+    for r in results:
+        pages = ", ".join(str(p) for p in r["pages"])
+        st.markdown(f"**{r['ContractID']}** · {r['FileName']} · Expiry {r['ExpiryDate']} · hal. {pages}")
+        st.markdown(clause_index.highlight_html(r["snippet"]), unsafe_allow_html=True)
+
+
+def run_app(use_api_key=False, debug=False):
+    """Seluruh UI; use_api_key/debug mengatur cara memanggil Streamline"""
+    boot()
+    st.title("📄 Sistem Monitoring Kontrak")
+
+    menu_items = list(MENU_ITEMS)
+    # Halaman admin tersembunyi, dibuka lewat URL ?admin=1
+    if st.query_params.get("admin") == "1":
+        menu_items.append("Performa")
+    menu = st.sidebar.selectbox("Menu", menu_items)
+
+    with metrics.timer(f"page.{menu}"):
+        if menu == "Tambah Kontrak":
+            render_upload(use_api_key, debug)
+        elif menu == "Daftar Kontrak":
+            render_list()
+        elif menu == "Cek Kontrak Expired":
+            render_expiring()
+        elif menu == "Cari Klausul":
+            render_search()
+        elif menu == "Antrean Review":
+            render_job_queue()
+        elif menu == "Performa":
+            import admin_panel
+
+            admin_panel.render_performance_panel()
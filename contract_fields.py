@@ -0,0 +1,180 @@
+"""Ekstraksi field kontrak (expiry, tanggal mulai, para pihak, nilai) dalam satu kali scan.
+
+Semua pola digabung jadi satu regex yang dikompilasi sekali. Setiap halaman hanya
+di-scan satu kali dengan finditer, dan setiap kecocokan diproses sesuai nama grupnya:
+label ("berlaku sampai", "nilai kontrak", ...) mengikat tanggal/nominal berikutnya
+ke field-nya. Menambah field berarti menambah grup, bukan menambah pass atas teks.
+"""
+import re
+from datetime import date
+
+FIELDS = ("expiry", "start", "parties", "value")
+
+# Label harus diikuti nilainya dalam jarak ini (karakter), selain itu dianggap lepas
+LABEL_WINDOW = 120
+# Scan berhenti lebih awal jika semua field yang diminta sudah punya nilai berlabel
+LABELLED_CONFIDENCE = 0.9
+
+MONTHS = {
+    "januari": 1, "january": 1, "jan": 1,
+    "februari": 2, "pebruari": 2, "february": 2, "feb": 2, "peb": 2,
+    "maret": 3, "march": 3, "mar": 3,
+    "april": 4, "apr": 4,
+    "mei": 5, "may": 5,
+    "juni": 6, "june": 6, "jun": 6,
+    "juli": 7, "july": 7, "jul": 7,
+    "agustus": 8, "august": 8, "agu": 8, "agt": 8, "ags": 8, "aug": 8,
+    "september": 9, "sept": 9, "sep": 9,
+    "oktober": 10, "october": 10, "okt": 10, "oct": 10,
+    "november": 11, "nopember": 11, "nov": 11, "nop": 11,
+    "desember": 12, "december": 12, "des": 12, "dec": 12,
+}
+_MONTH_NAMES = "|".join(sorted(MONTHS, key=len, reverse=True))
+
+# Setiap pola otomatis diawali batas kata (lihat SCANNER). Urutan penting: label lebih panjang
+# dan format tanggal yang lebih spesifik didahulukan
+PATTERNS = {
+    "label_expiry": (
+        r"(?i:berlaku\s+(?:sampai(?:\s+dengan)?|hingga)|masa\s+berlaku\s+(?:sampai|hingga)"
+        r"|berakhir\s+pada(?:\s+tanggal)?|tanggal\s+(?:berakhir|kedaluwarsa|kadaluarsa|jatuh\s+tempo)"
+        r"|jatuh\s+tempo|expir(?:y|ation|ed|es)(?:\s+(?:date|on))?|valid\s+until|s\.?/d\.?)"
+    ),
+    "label_start": (
+        r"(?i:berlaku\s+(?:sejak|mulai)(?:\s+tanggal)?|mulai\s+berlaku(?:\s+(?:pada|sejak))?(?:\s+tanggal)?"
+        r"|dimulai\s+(?:pada|sejak)(?:\s+tanggal)?|terhitung\s+(?:sejak|mulai)(?:\s+tanggal)?"
+        r"|tanggal\s+mulai|start\s+date|effective\s+(?:date|from|as\s+of)|commencement\s+date)"
+    ),
+    # Tanggal tanda tangan diikat supaya tidak dianggap expiry/mulai oleh fallback
+    "label_signed": r"(?i:ditandatangani\s+(?:pada|di\s+\w+\s+pada)(?:\s+tanggal)?|signed\s+on)",
+    "label_value": (
+        r"(?i:nilai\s+(?:kontrak|perjanjian|pekerjaan|total)|total\s+nilai|harga\s+(?:kontrak|borongan)"
+        r"|contract\s+(?:value|price)|total\s+(?:value|price))"
+    ),
+    "label_role": r"(?i:selanjutnya\s+disebut|disebut\s+sebagai|hereinafter\s+(?:referred\s+to\s+as|called))",
+    "date_iso": r"\d{4}-\d{2}-\d{2}\b",
+    "date_dmy": r"\d{1,2}[/.-]\d{1,2}[/.-]\d{4}\b",
+    "date_text": rf"\d{{1,2}}\s+(?i:{_MONTH_NAMES})\.?\s+\d{{4}}\b",
+    "money": r"(?i:rp\.?|idr)\s?\d{1,3}(?:[.,]\d{3})+(?:[.,]\d{1,2})?|(?i:rp\.?|idr)\s?\d+",
+    "party": (
+        r"(?:PT|CV|Perum|Koperasi|Yayasan)\.?\s+[A-Z0-9][\w&.'-]*"
+        r"(?:\s+(?:[A-Z0-9][\w&.'-]*|\(Persero\)))*"
+    ),
+}
+# Semua pola dimulai di batas kata dengan salah satu huruf/angka ini. Memeriksanya sekali di depan
+# (bukan di setiap cabang) membuat posisi yang tidak relevan langsung dilewati.
+_FIRST_CHARS = "0-9bcdehijmnrstvBCDEHIJMNRSTVKPY"
+SCANNER = re.compile(
+    rf"\b(?=[{_FIRST_CHARS}])(?:" + "|".join(f"(?P<{name}>{pattern})" for name, pattern in PATTERNS.items()) + ")"
+)
+
+_LABEL_FIELDS = {"label_expiry": "expiry", "label_start": "start", "label_signed": "signed", "label_value": "value"}
+
+
+def parse_date(kind, text):
+    """Teks tanggal hasil scan -> date, None jika tidak valid (misalnya 31/02/2026)"""
+    try:
+        if kind == "date_iso":
+            return date.fromisoformat(text)
+        if kind == "date_dmy":
+            day, month, year = re.split(r"[/.-]", text)
+            return date(int(year), int(month), int(day))
+        day, month, year = text.replace(".", " ").split()
+        return date(int(year), MONTHS[month.lower()], int(day))
+    except (ValueError, KeyError):
+        return None
+
+
+def parse_amount(text):
+    """"Rp 150.000.000,00" / "IDR 150,000,000.00" -> 150000000"""
+    digits = re.sub(r"^(?i:rp\.?|idr)\s?", "", text)
+    # Dua digit terakhir setelah pemisah adalah sen, bukan ribuan
+    digits = re.sub(r"[.,]\d{1,2}$", "", digits)
+    return int(re.sub(r"\D", "", digits))
+
+
+def _offer(best, field, value, confidence, page):
+    current = best.get(field)
+    if current is None or confidence > current["confidence"]:
+        best[field] = {"value": value, "confidence": confidence, "page": page}
+
+
+def extract_fields(pages, fields=FIELDS):
+    """Scan (indeks_halaman, teks) satu kali dan kembalikan {field: {"value", "confidence", "page"} | None}.
+
+    "page" adalah nomor halaman (mulai dari 1) tempat nilai ditemukan.
+
+    `pages` boleh berupa generator (misalnya pdf_extract.iter_pages); scan berhenti begitu
+    semua `fields` punya nilai berlabel, jadi halaman sisanya tidak perlu dibaca.
+    """
+    best = {}
+    loose_dates = []  # (date, page) tanpa label, untuk fallback
+    loose_amounts = []
+    parties = {}  # nama -> {"confidence", "page", "order"}
+    wanted = [f for f in fields if f != "parties"]
+
+    for index, text in pages:
+        page = index + 1  # nomor halaman untuk ditampilkan
+        label = None  # (field, posisi akhir label)
+        last_date = None  # (date, posisi akhir) untuk pola "<tanggal> s/d <tanggal>"
+        last_party = None
+        for m in SCANNER.finditer(text):
+            kind = m.lastgroup
+            if kind in _LABEL_FIELDS:
+                label = (_LABEL_FIELDS[kind], m.end())
+                if kind == "label_expiry" and last_date and m.start() - last_date[1] <= 3:
+                    # "1 Januari 2025 s/d 31 Desember 2026": tanggal sebelum "s/d" adalah tanggal mulai
+                    _offer(best, "start", last_date[0].isoformat(), 0.7, page)
+                continue
+            if kind == "label_role":
+                if last_party and m.start() - last_party[1] <= LABEL_WINDOW:
+                    parties[last_party[0]]["confidence"] = LABELLED_CONFIDENCE
+                continue
+            if kind == "party":
+                name = " ".join(m.group().split()).rstrip(".,")
+                if name not in parties:
+                    parties[name] = {"confidence": 0.6, "page": page, "order": len(parties)}
+                last_party = (name, m.end())
+                continue
+            bound = label is not None and m.start() - label[1] <= LABEL_WINDOW
+            if kind == "money":
+                amount = parse_amount(m.group())
+                if bound and label[0] == "value":
+                    _offer(best, "value", amount, LABELLED_CONFIDENCE, page)
+                    label = None
+                else:
+                    loose_amounts.append((amount, page))
+                continue
+            parsed = parse_date(kind, m.group())
+            if parsed is None:
+                continue
+            last_date = (parsed, m.end())
+            if bound and label[0] in ("expiry", "start", "signed"):
+                _offer(best, label[0], parsed.isoformat(), LABELLED_CONFIDENCE, page)
+                label = None
+            else:
+                loose_dates.append((parsed, page))
+        if all(best.get(f, {}).get("confidence", 0) >= LABELLED_CONFIDENCE for f in wanted) and (
+            "parties" not in fields or sum(p["confidence"] >= LABELLED_CONFIDENCE for p in parties.values()) >= 2
+        ):
+            break
+
+    # Fallback tanpa label: expiry = tanggal terakhir, mulai = tanggal paling awal, nilai = nominal terbesar
+    if loose_dates:
+        distinct = len({d for d, _ in loose_dates})
+        latest = max(loose_dates, key=lambda d: d[0])
+        earliest = min(loose_dates, key=lambda d: d[0])
+        _offer(best, "expiry", latest[0].isoformat(), 0.4 if distinct > 1 else 0.3, latest[1])
+        if distinct > 1:
+            _offer(best, "start", earliest[0].isoformat(), 0.3, earliest[1])
+    if loose_amounts:
+        largest = max(loose_amounts, key=lambda a: a[0])
+        _offer(best, "value", largest[0], 0.4, largest[1])
+    if parties:
+        ranked = sorted(parties.items(), key=lambda p: (-p[1]["confidence"], p[1]["order"]))[:2]
+        confidence = min(p["confidence"] for _, p in ranked) * (1 if len(ranked) == 2 else 0.5)
+        best["parties"] = {
+            "value": [name for name, _ in ranked],
+            "confidence": confidence,
+            "page": min(p["page"] for _, p in ranked),
+        }
+    return {field: best.get(field) for field in fields}
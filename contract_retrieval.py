@@ -0,0 +1,143 @@
+"""Retrieval of contract excerpts for the chatbot.
+
+Each question is matched (BM25) against the chunk index that clause_index keeps for every
+stored contract, and only the best chunks that fit in CONTEXT_TOKENS are sent to the model.
+The prompt therefore stays the same size however many contracts are stored. Contracts are
+indexed as they are saved, so new ones are searchable without rebuilding anything.
+"""
+import clause_index
+import contract_store
+import metrics
+from tokens import estimate_tokens
+
+TOP_K = 5
+# Token budget for the excerpts added to each turn (on top of chat_context.CONTEXT_TOKENS).
+CONTEXT_TOKENS = 1200
+MAX_QUERY_TERMS = 12
+# Rough overhead of the "[contract · file · page]" header in front of each excerpt.
+EXCERPT_OVERHEAD_TOKENS = 20
+
+# Words too common in questions and contracts to help ranking (Indonesian and English).
+STOPWORDS = frozenset("""
+    ada adalah agar akan apa apakah atau bagaimana bahwa bisa dalam dan dari dengan di ini itu jika
+    juga ke kapan kami kita mana oleh pada para saya sebagai siapa sudah tentang tersebut untuk yang
+    a an and are as at be by can do does for from how i in is it me my of on or our that the this to
+    was we what when where which who will with you your
+""".split())
+
+CONTEXT_PROMPT = (
+    "Excerpts from the stored contracts that may help with the user's question follow. "
+    "Use them when relevant and cite the contract ID and page; if they do not contain the "
+    "answer, say so instead of guessing.\n\n{excerpts}"
+)
+
+
+def query_terms(question):
+    terms = []
+    for word in clause_index.WORD_PATTERN.findall(question.lower()):
+        if len(word) > 1 and word not in STOPWORDS and word not in terms:
+            terms.append(word)
+    return terms[:MAX_QUERY_TERMS]
+
+
+def mentioned_contracts(question, conn):
+    """Blob digests of contracts whose Contract ID appears verbatim in the question."""
+    words = {w.strip(".,;:?!()\"'") for w in question.split()}
+    candidates = list({v for w in words if w for v in (w, w.upper())})
+    if not candidates:
+        return []
+    placeholders = ", ".join("?" * len(candidates))
+    rows = conn.execute(
+        f"SELECT DISTINCT BlobDigest FROM contracts WHERE ContractID IN ({placeholders}) AND BlobDigest IS NOT NULL",
+        candidates,
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def to_match_query(question):
+    """Any of the question's words may match (OR); BM25 ranks chunks matching more, rarer words first."""
+    return " OR ".join(f'"{term}"' for term in query_terms(question))
+
+
+@metrics.timed("chat.retrieve")
+def retrieve(question, k=TOP_K, budget=CONTEXT_TOKENS, conn=None):
+    """Best-matching chunks for `question`, at most `k` and `budget` tokens in total.
+
+    A question that names a Contract ID is answered from that contract's chunks when any match.
+    """
+    conn = conn or contract_store.get_connection()
+    match = to_match_query(question)
+    if not match:
+        return []
+    hits = []
+    for digest in mentioned_contracts(question, conn):
+        # A document's chunks are inserted in one go, so a rowid range selects them without scanning
+        lo, hi = conn.execute("SELECT MIN(id), MAX(id) FROM fts_chunks WHERE digest = ?", (digest,)).fetchone()
+        if lo is not None:
+            hits += conn.execute(
+                "SELECT c.digest, c.page, chunks_fts.text AS text, bm25(chunks_fts) AS score "
+                "FROM chunks_fts JOIN fts_chunks c ON c.id = chunks_fts.rowid "
+                "WHERE chunks_fts MATCH ? AND chunks_fts.rowid BETWEEN ? AND ? ORDER BY rank LIMIT ?",
+                (match, lo, hi, k * 2),
+            ).fetchall()
+    if hits:
+        return _select(conn, sorted(hits, key=lambda hit: hit["score"]), k, budget)
+    # Same bound as clause search: very common words only rank the newest candidates.
+    matched = conn.execute("SELECT COUNT(*) FROM chunks_fts WHERE chunks_fts MATCH ?", (match,)).fetchone()[0]
+    if not matched:
+        return []
+    min_rowid = 0
+    if matched > clause_index.RANK_CANDIDATES:
+        min_rowid = conn.execute(
+            "SELECT rowid FROM chunks_fts WHERE chunks_fts MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+            (match, clause_index.RANK_CANDIDATES - 1),
+        ).fetchone()[0]
+    hits = conn.execute(
+        "SELECT c.digest, c.page, chunks_fts.text AS text, bm25(chunks_fts) AS score "
+        "FROM chunks_fts JOIN fts_chunks c ON c.id = chunks_fts.rowid "
+        "WHERE chunks_fts MATCH ? AND chunks_fts.rowid >= ? ORDER BY rank LIMIT ?",
+        (match, min_rowid, k * 2),
+    ).fetchall()
+    return _select(conn, hits, k, budget)
+
+
+def _select(conn, hits, k, budget):
+    digests = list({hit["digest"] for hit in hits})
+    placeholders = ", ".join("?" * len(digests))
+    contracts = {}
+    for row in conn.execute(
+        f"SELECT ContractID, FileName, BlobDigest FROM contracts WHERE BlobDigest IN ({placeholders}) ORDER BY id",
+        digests,
+    ):
+        contracts.setdefault(row["BlobDigest"], row)
+
+    results = []
+    used = 0
+    for hit in hits:
+        contract = contracts.get(hit["digest"])
+        cost = estimate_tokens(hit["text"]) + EXCERPT_OVERHEAD_TOKENS
+        # Chunks of files no contract refers to any more are skipped, as are chunks that do not fit.
+        if contract is None or used + cost > budget:
+            continue
+        results.append({
+            "ContractID": contract["ContractID"], "FileName": contract["FileName"],
+            "page": hit["page"], "text": hit["text"], "score": -hit["score"],
+        })
+        used += cost
+        if len(results) == k:
+            break
+    metrics.incr("chat.retrieved_chunks", len(results))
+    metrics.incr("chat.context_tokens", used)
+    return results
+
+
+def context_message(chunks):
+    """System message carrying the retrieved excerpts, or None when nothing matched."""
+    if not chunks:
+        return None
+    excerpts = "\n\n".join(f"[{c['ContractID']} · {c['FileName']} · page {c['page']}]\n{c['text']}" for c in chunks)
+    return {"role": "system", "content": CONTEXT_PROMPT.format(excerpts=excerpts)}
+
+
+def sources_caption(chunks):
+    return "Sources: " + ", ".join(f"{c['ContractID']} p. {c['page']}" for c in chunks)
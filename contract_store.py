@@ -0,0 +1,459 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import metrics
+
+# pandas di-import di dalam fungsi yang mengembalikan DataFrame: import-nya sekitar setengah
+# detik, dan sebagian besar pemanggil (worker, CLI, halaman upload) tidak membutuhkannya.
+
+# === Konfigurasi ===
+DB_FILE = os.environ.get("CONTRACTS_DB", "contracts.db")
+LEGACY_CSV = "contracts.csv"
+COLUMNS = ["ContractID", "FileName", "ExpiryDate", "UploadedAt"]
+
+# Setiap entri dijalankan sekali, urut sesuai PRAGMA user_version
+MIGRATIONS = [
+    """
+    CREATE TABLE IF NOT EXISTS contracts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ContractID TEXT NOT NULL,
+        FileName TEXT,
+        ExpiryDate TEXT,
+        UploadedAt TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_contracts_contract_id ON contracts(ContractID);
+    CREATE INDEX IF NOT EXISTS idx_contracts_expiry ON contracts(ExpiryDate);
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    """,
+    # ExpiryDate di-parse sekali saat disimpan jadi nomor hari (sejak 1970-01-01)
+    """
+    ALTER TABLE contracts ADD COLUMN ExpiryDay INTEGER;
+    UPDATE contracts SET ExpiryDay = CAST(julianday(ExpiryDate) - 2440587.5 AS INTEGER);
+    CREATE INDEX IF NOT EXISTS idx_contracts_expiry_day ON contracts(ExpiryDay);
+    """,
+    # Antrean notifikasi keluar (lihat notifications.py)
+    """
+    CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        channel TEXT NOT NULL,
+        recipient TEXT NOT NULL,
+        subject TEXT,
+        body TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        created_at REAL NOT NULL,
+        next_attempt_at REAL NOT NULL,
+        claimed_at REAL,
+        sent_at REAL,
+        last_error TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at);
+    """,
+    # Pengingat expiry yang sudah dikirim (lihat expiry_alerts.py)
+    """
+    CREATE TABLE IF NOT EXISTS sent_alerts (
+        contract_row INTEGER NOT NULL,
+        threshold INTEGER NOT NULL,
+        sent_at TEXT NOT NULL,
+        PRIMARY KEY (contract_row, threshold)
+    );
+    """,
+    # Indeks untuk filter dan urutan di halaman Daftar Kontrak
+    """
+    CREATE INDEX IF NOT EXISTS idx_contracts_uploaded_at ON contracts(UploadedAt);
+    CREATE INDEX IF NOT EXISTS idx_contracts_file_name ON contracts(FileName);
+    """,
+    # File PDF disimpan per isi (lihat upload_store.py); refcount dijaga trigger
+    """
+    CREATE TABLE IF NOT EXISTS blobs (
+        digest TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        refcount INTEGER NOT NULL DEFAULT 0,
+        created_at REAL NOT NULL
+    );
+    ALTER TABLE contracts ADD COLUMN BlobDigest TEXT;
+    CREATE INDEX IF NOT EXISTS idx_contracts_blob ON contracts(BlobDigest);
+    CREATE TRIGGER IF NOT EXISTS contracts_blob_insert AFTER INSERT ON contracts
+    WHEN NEW.BlobDigest IS NOT NULL BEGIN
+        UPDATE blobs SET refcount = refcount + 1 WHERE digest = NEW.BlobDigest;
+    END;
+    CREATE TRIGGER IF NOT EXISTS contracts_blob_delete AFTER DELETE ON contracts
+    WHEN OLD.BlobDigest IS NOT NULL BEGIN
+        UPDATE blobs SET refcount = refcount - 1 WHERE digest = OLD.BlobDigest;
+    END;
+    CREATE TRIGGER IF NOT EXISTS contracts_blob_update AFTER UPDATE OF BlobDigest ON contracts
+    WHEN OLD.BlobDigest IS NOT NEW.BlobDigest BEGIN
+        UPDATE blobs SET refcount = refcount - 1 WHERE digest = OLD.BlobDigest;
+        UPDATE blobs SET refcount = refcount + 1 WHERE digest = NEW.BlobDigest;
+    END;
+    """,
+    # Indeks teks lengkap per halaman (lihat clause_index.py); rowid pages_fts = fts_pages.id
+    """
+    CREATE TABLE IF NOT EXISTS fts_docs (
+        digest TEXT PRIMARY KEY,
+        version TEXT NOT NULL,
+        indexed_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS fts_pages (
+        id INTEGER PRIMARY KEY,
+        digest TEXT NOT NULL,
+        page INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_fts_pages_digest ON fts_pages(digest);
+    CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts USING fts5(text, tokenize = 'unicode61 remove_diacritics 2');
+    """,
+    # Nomor versi data yang naik setiap kali tabel contracts ditulis (oleh proses mana pun),
+    # dipakai sebagai kunci cache di UI (lihat data_version)
+    """
+    INSERT OR IGNORE INTO meta (key, value) VALUES ('contracts_version', 0);
+    CREATE TRIGGER IF NOT EXISTS contracts_version_insert AFTER INSERT ON contracts BEGIN
+        UPDATE meta SET value = value + 1 WHERE key = 'contracts_version';
+    END;
+    CREATE TRIGGER IF NOT EXISTS contracts_version_update AFTER UPDATE ON contracts BEGIN
+        UPDATE meta SET value = value + 1 WHERE key = 'contracts_version';
+    END;
+    CREATE TRIGGER IF NOT EXISTS contracts_version_delete AFTER DELETE ON contracts BEGIN
+        UPDATE meta SET value = value + 1 WHERE key = 'contracts_version';
+    END;
+    """,
+    # Antrean job review (lihat review_jobs.py)
+    """
+    CREATE TABLE IF NOT EXISTS review_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        status TEXT NOT NULL DEFAULT 'queued',
+        stage TEXT,
+        contract_id TEXT NOT NULL,
+        file_name TEXT NOT NULL,
+        digest TEXT NOT NULL,
+        options TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        created_at REAL NOT NULL,
+        next_attempt_at REAL NOT NULL,
+        worker TEXT,
+        heartbeat_at REAL,
+        finished_at REAL,
+        contract_row INTEGER,
+        result TEXT,
+        last_error TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_review_jobs_due ON review_jobs(status, next_attempt_at);
+    CREATE INDEX IF NOT EXISTS idx_review_jobs_digest ON review_jobs(digest);
+    """,
+    # Potongan teks untuk retrieval chatbot (lihat contract_retrieval.py); rowid chunks_fts = fts_chunks.id
+    """
+    CREATE TABLE IF NOT EXISTS fts_chunks (
+        id INTEGER PRIMARY KEY,
+        digest TEXT NOT NULL,
+        page INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_fts_chunks_digest ON fts_chunks(digest);
+    CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(text, tokenize = 'unicode61 remove_diacritics 2');
+    """,
+    # Durasi per tahap dari percobaan terakhir job review (JSON {tahap: detik}); worker berjalan
+    # di proses lain, jadi halaman Performa membacanya dari sini
+    """
+    ALTER TABLE review_jobs ADD COLUMN timings TEXT;
+    """,
+]
+
+# Batas atas (hari tersisa, eksklusif) dan label tiap kelompok expiry
+EXPIRY_BUCKETS = [
+    (0, "Sudah expired"),
+    (30, "< 30 hari"),
+    (60, "< 60 hari"),
+    (90, "< 90 hari"),
+]
+EXPIRY_BUCKET_REST = ">= 90 hari"
+# Kontrak yang expired lebih lama dari ini tidak lagi didaftar (tetap dihitung di kalender)
+EXPIRY_OVERDUE_DAYS = int(os.environ.get("EXPIRY_OVERDUE_DAYS", "365"))
+
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = set()
+
+
+# === Koneksi ===
+def get_connection(db_file=None):
+    """Koneksi SQLite per thread (Streamlit menjalankan tiap sesi di thread sendiri)"""
+    db_file = db_file or DB_FILE
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(db_file)
+    if conn is None:
+        # isolation_level=None: transaksi diatur manual lewat transaction()
+        conn = sqlite3.connect(db_file, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        # WAL: pembaca tidak memblokir penulis, penulis antre lewat busy_timeout
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conns[db_file] = conn
+        init_db(conn, db_file)
+    return conn
+
+
+@contextmanager
+def transaction(conn):
+    """BEGIN IMMEDIATE supaya dua penulis tidak saling menimpa"""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    else:
+        conn.execute("COMMIT")
+
+
+def _statements(script):
+    # Titik koma di dalam body trigger bukan akhir statement, jadi gabungkan sampai statement lengkap
+    statement = ""
+    for part in script.split(";"):
+        statement += part + ";"
+        if sqlite3.complete_statement(statement):
+            if statement.strip(" \n;"):
+                yield statement
+            statement = ""
+
+
+def init_db(conn, db_file=None):
+    """Jalankan migrasi skema yang belum diterapkan, lalu impor CSV lama sekali saja"""
+    key = db_file or DB_FILE
+    with _init_lock:
+        if key in _initialized:
+            return
+        with transaction(conn):
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for i, script in enumerate(MIGRATIONS[version:], start=version + 1):
+                for statement in _statements(script):
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {i}")
+        if os.path.exists(LEGACY_CSV) and get_meta(conn, "legacy_csv_imported") is None:
+            import_csv(LEGACY_CSV, conn=conn)
+        _initialized.add(key)
+
+
+def get_meta(conn, key):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else None
+
+
+def set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def data_version(conn=None):
+    """Angka yang berubah setiap kali ada kontrak ditambah/diubah/dihapus; murah dibaca di setiap rerun"""
+    conn = conn or get_connection()
+    return int(get_meta(conn, "contracts_version") or 0)
+
+
+# === Operasi Data ===
+INSERT_SQL = (
+    "INSERT INTO contracts (ContractID, FileName, ExpiryDate, UploadedAt, ExpiryDay, BlobDigest) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+EPOCH = date(1970, 1, 1)
+
+
+def day_number(value):
+    """Tanggal (date atau string YYYY-MM-DD) -> jumlah hari sejak 1970-01-01, None jika tidak valid"""
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return (value - EPOCH).days
+    try:
+        return (date.fromisoformat(str(value)[:10]) - EPOCH).days
+    except ValueError:
+        return None
+
+
+def _insert_params(row):
+    return [row.get(c) for c in COLUMNS] + [day_number(row.get("ExpiryDate")), row.get("BlobDigest")]
+
+
+def insert_contract(conn, row):
+    """INSERT satu kontrak di dalam transaksi milik pemanggil; kembalikan id barisnya"""
+    return conn.execute(INSERT_SQL, _insert_params(row)).lastrowid
+
+
+@metrics.timed("store.add_contract")
+def add_contract(row, conn=None):
+    """Simpan satu kontrak baru (satu INSERT dalam satu transaksi)"""
+    conn = conn or get_connection()
+    with transaction(conn):
+        return insert_contract(conn, row)
+
+
+def add_contracts(rows, conn=None):
+    """Simpan banyak kontrak sekaligus dalam satu transaksi"""
+    conn = conn or get_connection()
+    with transaction(conn):
+        conn.executemany(INSERT_SQL, (_insert_params(row) for row in rows))
+
+
+def find_by_blob(digest, conn=None):
+    """Kontrak pertama yang memakai file dengan isi (hash) ini, atau None"""
+    conn = conn or get_connection()
+    row = conn.execute(
+        f"SELECT {', '.join(COLUMNS)} FROM contracts WHERE BlobDigest = ? ORDER BY id LIMIT 1", (digest,)
+    ).fetchone()
+    return dict(row) if row else None
+
+
+@metrics.timed("store.load_contracts")
+def load_contracts(conn=None):
+    """Ambil semua kontrak sebagai DataFrame dengan kolom yang sama seperti contracts.csv"""
+    import pandas as pd
+
+    conn = conn or get_connection()
+    return pd.read_sql_query(
+        f"SELECT {', '.join(COLUMNS)} FROM contracts ORDER BY id", conn
+    )
+
+
+# Kolom yang boleh dipakai untuk mengurutkan; ExpiryDate diurutkan lewat ExpiryDay yang terindeks
+SORT_COLUMNS = {
+    "ContractID": "ContractID",
+    "FileName": "FileName",
+    "ExpiryDate": "ExpiryDay",
+    "UploadedAt": "UploadedAt",
+}
+
+
+def _prefix_upper_bound(prefix):
+    # "ABC" -> "ABD": ContractID >= prefix AND < batas ini bisa memakai indeks (LIKE tidak)
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _where(filters):
+    """Klausa WHERE + parameter dari dict filter (id_prefix, file_name, expiry_from/to, uploaded_from/to)"""
+    filters = filters or {}
+    clauses = []
+    params = []
+    if filters.get("id_prefix"):
+        clauses.append("ContractID >= ? AND ContractID < ?")
+        params += [filters["id_prefix"], _prefix_upper_bound(filters["id_prefix"])]
+    if filters.get("file_name"):
+        clauses.append("FileName LIKE ? ESCAPE '\\'")
+        escaped = filters["file_name"].replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        params.append(f"%{escaped}%")
+    if filters.get("expiry_from"):
+        clauses.append("ExpiryDay >= ?")
+        params.append(day_number(filters["expiry_from"]))
+    if filters.get("expiry_to"):
+        clauses.append("ExpiryDay <= ?")
+        params.append(day_number(filters["expiry_to"]))
+    if filters.get("uploaded_from"):
+        clauses.append("UploadedAt >= ?")
+        params.append(str(filters["uploaded_from"]))
+    if filters.get("uploaded_to"):
+        # UploadedAt berisi jam, jadi batas atas dibuat eksklusif di hari berikutnya
+        clauses.append("UploadedAt < ?")
+        params.append(f"{filters['uploaded_to']}\uffff")
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def count_contracts(filters=None, conn=None):
+    """Jumlah kontrak (sesuai filter) lewat satu query agregat"""
+    conn = conn or get_connection()
+    where, params = _where(filters)
+    return conn.execute(f"SELECT COUNT(*) FROM contracts{where}", params).fetchone()[0]
+
+
+@metrics.timed("store.query_contracts")
+def query_contracts(filters=None, sort_by="UploadedAt", descending=True, limit=50, offset=0, conn=None):
+    """Satu halaman kontrak; hanya baris halaman ini yang dibaca dari database"""
+    import pandas as pd
+
+    conn = conn or get_connection()
+    where, params = _where(filters)
+    column = SORT_COLUMNS.get(sort_by, "UploadedAt")
+    direction = "DESC" if descending else "ASC"
+    return pd.read_sql_query(
+        f"SELECT {', '.join(COLUMNS)} FROM contracts{where} "
+        f"ORDER BY {column} {direction}, id {direction} LIMIT ? OFFSET ?",
+        conn,
+        params=params + [int(limit), int(offset)],
+    )
+
+
+def _bucket_case(days_left):
+    parts = [f"WHEN {days_left} < {limit} THEN '{label}'" for limit, label in EXPIRY_BUCKETS]
+    return f"CASE {' '.join(parts)} ELSE '{EXPIRY_BUCKET_REST}' END"
+
+
+@metrics.timed("store.expiring_contracts")
+def expiring_contracts(horizon_days=90, today=None, overdue_days=EXPIRY_OVERDUE_DAYS, conn=None):
+    """Kontrak yang expired dalam overdue_days hari terakhir atau akan expired dalam horizon_days hari,
+    lewat range query pada indeks ExpiryDay"""
+    import pandas as pd
+
+    conn = conn or get_connection()
+    today_day = day_number(today or date.today())
+    days_left = f"(ExpiryDay - {today_day})"
+    return pd.read_sql_query(
+        f"SELECT {', '.join(COLUMNS)}, {days_left} AS DaysLeft, {_bucket_case(days_left)} AS Bucket "
+        "FROM contracts WHERE ExpiryDay BETWEEN ? AND ? ORDER BY ExpiryDay",
+        conn,
+        params=(today_day - overdue_days, today_day + horizon_days),
+    )
+
+
+def expiry_calendar(horizon_days=90, today=None, conn=None):
+    """Jumlah kontrak per kelompok expiry, dihitung dengan satu query agregat"""
+    conn = conn or get_connection()
+    today_day = day_number(today or date.today())
+    days_left = f"(ExpiryDay - {today_day})"
+    rows = conn.execute(
+        f"SELECT {_bucket_case(days_left)} AS Bucket, COUNT(*) AS n "
+        "FROM contracts WHERE ExpiryDay <= ? GROUP BY Bucket",
+        (today_day + horizon_days,),
+    ).fetchall()
+    counts = {label: 0 for _, label in EXPIRY_BUCKETS}
+    counts.update({row["Bucket"]: row["n"] for row in rows})
+    return counts
+
+
+def import_csv(csv_path, conn=None):
+    """Impor satu kali isi contracts.csv lama ke database; 0 jika sudah pernah diimpor"""
+    import pandas as pd
+
+    conn = conn or get_connection()
+    df = pd.read_csv(csv_path, dtype=str).reindex(columns=COLUMNS)
+    rows = df.where(df.notna(), None).to_dict("records")
+    with transaction(conn):
+        # Aplikasi, worker review dan bulk_import bisa memanggil init_db bersamaan: penanda
+        # dibaca ulang di dalam BEGIN IMMEDIATE supaya hanya satu proses yang mengimpor
+        if get_meta(conn, "legacy_csv_imported") is not None:
+            return 0
+        conn.executemany(INSERT_SQL, (_insert_params(row) for row in rows))
+        set_meta(conn, "legacy_csv_imported", os.path.abspath(csv_path))
+    return len(rows)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Utilitas database kontrak")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_import = sub.add_parser("import-csv", help="Impor contracts.csv lama ke database")
+    p_import.add_argument("csv_path", nargs="?", default=LEGACY_CSV)
+    sub.add_parser("count", help="Tampilkan jumlah kontrak")
+    args = parser.parse_args()
+
+    if args.command == "import-csv":
+        conn = get_connection()
+        if get_meta(conn, "legacy_csv_imported"):
+            print(f"CSV sudah pernah diimpor: {get_meta(conn, 'legacy_csv_imported')}")
+        else:
+            print(f"{import_csv(args.csv_path, conn=conn)} kontrak diimpor ke {DB_FILE}")
+    elif args.command == "count":
+        print(count_contracts())
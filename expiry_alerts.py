@@ -0,0 +1,153 @@
+"""Layanan pengingat kontrak yang akan expired, berjalan tanpa Streamlit.
+
+Contoh:
+    python expiry_alerts.py                 # cek setiap jam
+    python expiry_alerts.py --once          # sekali jalan (untuk cron)
+"""
+import argparse
+import logging
+import time
+from datetime import date, datetime
+
+import contract_store
+import notifications
+from settings import get_secret
+
+# === Konfigurasi ===
+THRESHOLDS = [90, 30, 7]
+INTERVAL_SECONDS = 3600
+
+
+def _recipients(name, default):
+    value = get_secret(name, default)
+    return [r.strip() for r in str(value or "").split(",") if r.strip()]
+
+
+ALERT_EMAILS = _recipients("ALERT_EMAILS", notifications.EMAIL_TO)
+ALERT_TELEGRAM_CHATS = _recipients("ALERT_TELEGRAM_CHATS", notifications.TELEGRAM_CHAT_ID)
+
+logger = logging.getLogger(__name__)
+
+SELECT_COLUMNS = "c.id, c.ContractID, c.FileName, c.ExpiryDate, c.ExpiryDay"
+
+
+def _crossing(conn, threshold, lower, upper, today_day, last_id, max_id):
+    """Kontrak yang baru masuk jendela `threshold` hari sejak tick terakhir.
+
+    Cukup range query pada indeks ExpiryDay (batas bawah = batas atas tick sebelumnya)
+    ditambah kontrak yang baru disimpan sejak tick terakhir, jadi kerja per tick tidak
+    bergantung pada jumlah total kontrak.
+    """
+    not_sent = (
+        "NOT EXISTS (SELECT 1 FROM sent_alerts s WHERE s.contract_row = c.id AND s.threshold <= ?)"
+    )
+    rows = conn.execute(
+        f"SELECT {SELECT_COLUMNS} FROM contracts c "
+        f"WHERE c.ExpiryDay > ? AND c.ExpiryDay <= ? AND c.id <= ? AND {not_sent}",
+        (lower, upper, max_id, threshold),
+    ).fetchall()
+    rows += conn.execute(
+        f"SELECT {SELECT_COLUMNS} FROM contracts c "
+        f"WHERE c.id > ? AND c.id <= ? AND c.ExpiryDay >= ? AND c.ExpiryDay <= ? AND {not_sent}",
+        (last_id, max_id, today_day, upper, threshold),
+    ).fetchall()
+    return rows
+
+
+def format_digest(alerts, today):
+    """Satu pesan ringkasan berisi semua kontrak yang melewati batas pengingat"""
+    today_day = contract_store.day_number(today)
+    lines = [f"⏰ Pengingat Kontrak Expired ({today.isoformat()})"]
+    for threshold in sorted({t for _, t in alerts}):
+        lines.append(f"\n≤ {threshold} hari:")
+        for row, t in sorted(alerts, key=lambda a: a[0]["ExpiryDay"]):
+            if t == threshold:
+                days_left = row["ExpiryDay"] - today_day
+                lines.append(
+                    f"- {row['ContractID']} ({row['FileName']}) — expired {row['ExpiryDate']} "
+                    f"({days_left} hari lagi)"
+                )
+    return "\n".join(lines)
+
+
+def _deliverable_recipients():
+    """Penerima email dan chat Telegram yang kanalnya punya kredensial"""
+    emails, chats = ALERT_EMAILS, ALERT_TELEGRAM_CHATS
+    if emails and not notifications.email_configured():
+        logger.warning("ALERT_EMAILS diisi tetapi SMTP_USER/SMTP_PASS kosong; email pengingat dilewati")
+        emails = []
+    if chats and not notifications.telegram_configured():
+        logger.warning("ALERT_TELEGRAM_CHATS diisi tetapi TELEGRAM_BOT_TOKEN kosong; Telegram pengingat dilewati")
+        chats = []
+    return emails, chats
+
+
+def run_tick(today=None, thresholds=None, conn=None):
+    """Kirim satu digest per penerima untuk kontrak yang baru melewati ambang; kembalikan jumlah kontrak.
+
+    Tanpa penerima yang bisa dikirimi, tick dilewati tanpa mencatat apa pun, supaya pengingat
+    tidak dianggap terkirim sebelum konfigurasinya lengkap.
+    """
+    emails, chats = _deliverable_recipients()
+    if not emails and not chats:
+        logger.warning("Tidak ada penerima pengingat yang bisa dikirimi; tick dilewati")
+        return 0
+    conn = conn or contract_store.get_connection()
+    today = today or date.today()
+    today_day = contract_store.day_number(today)
+    thresholds = sorted(thresholds or THRESHOLDS)
+
+    with contract_store.transaction(conn):
+        last_id = int(contract_store.get_meta(conn, "alerts_last_id") or 0)
+        max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM contracts").fetchone()[0]
+        due = {}
+        # Ambang terkecil (paling mendesak) diproses dulu; kontrak yang sudah masuk tidak diulang
+        for threshold in thresholds:
+            upper = today_day + threshold
+            watermark = contract_store.get_meta(conn, f"alerts_watermark_{threshold}")
+            lower = today_day - 1 if watermark is None else max(int(watermark), today_day - 1)
+            for row in _crossing(conn, threshold, lower, upper, today_day, last_id, max_id):
+                due.setdefault(row["id"], (row, threshold))
+            contract_store.set_meta(conn, f"alerts_watermark_{threshold}", str(upper))
+        contract_store.set_meta(conn, "alerts_last_id", str(max_id))
+
+        alerts = list(due.values())
+        if alerts:
+            sent_at = datetime.now().isoformat()
+            # Ambang yang lebih longgar ikut ditandai supaya tidak menyusul terkirim belakangan
+            conn.executemany(
+                "INSERT OR IGNORE INTO sent_alerts (contract_row, threshold, sent_at) VALUES (?, ?, ?)",
+                [(row["id"], t, sent_at) for row, threshold in alerts for t in thresholds if t >= threshold],
+            )
+            digest = format_digest(alerts, today)
+            # Pesan masuk outbox dalam transaksi yang sama: restart tidak mengirim ulang atau kehilangan digest
+            for email in emails:
+                notifications.enqueue_email(
+                    f"⏰ {len(alerts)} kontrak akan expired", digest, to_email=email, conn=conn
+                )
+            for chat_id in chats:
+                notifications.enqueue_telegram(digest, chat_id=chat_id, conn=conn)
+    return len(alerts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pengingat kontrak expired via Telegram & Email")
+    parser.add_argument("--once", action="store_true", help="Jalankan satu kali lalu keluar")
+    parser.add_argument("--interval", type=int, default=INTERVAL_SECONDS, help="Jeda antar pengecekan (detik)")
+    parser.add_argument("--thresholds", default=",".join(map(str, THRESHOLDS)),
+                        help="Ambang hari sebelum expired, dipisah koma")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    thresholds = [int(t) for t in args.thresholds.split(",") if t.strip()]
+
+    if args.once:
+        print(f"{run_tick(thresholds=thresholds)} kontrak masuk digest")
+        notifications.flush()
+    else:
+        notifications.start_worker()
+        while True:
+            try:
+                print(f"[{datetime.now():%Y-%m-%d %H:%M}] {run_tick(thresholds=thresholds)} kontrak masuk digest")
+            except Exception as e:
+                print(f"Expiry alert error: {e}")
+            time.sleep(args.interval)
@@ -0,0 +1,139 @@
+import asyncio
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import metrics
+import rate_limit
+
+# === Konfigurasi ===
+DEFAULT_TIMEOUT = (5, 60)  # (connect, read) dalam detik
+MAX_RETRIES = 3
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8
+POOL_SIZE = 20
+# Method yang aman diulang walaupun request mungkin sudah diproses server
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Satu requests.Session per proses; koneksi keep-alive dipakai ulang di setiap rerun Streamlit"""
+    # requests di-import saat request pertama, bukan saat aplikasi dimulai
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=10, pool_maxsize=POOL_SIZE, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+    return _session
+
+
+def _backoff(attempt, retry_after=None):
+    if retry_after is not None:
+        return retry_after
+    # Full jitter supaya banyak klien tidak mencoba ulang bersamaan
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def _retry_after(response):
+    seconds = rate_limit.parse_retry_after(response.headers.get("Retry-After"))
+    return None if seconds is None else min(seconds, BACKOFF_MAX_SECONDS)
+
+
+def _rewind(files):
+    # File yang diunggah harus dibaca ulang dari awal di setiap percobaan
+    for value in (files or {}).values():
+        f = value[1] if isinstance(value, tuple) else value
+        if hasattr(f, "seek"):
+            f.seek(0)
+
+
+def _record(endpoint, elapsed, error=False):
+    # Satu tahap per endpoint ("http.openai", ...); ringkasannya ada di metrics.snapshot()
+    metrics.observe(f"http.{endpoint}", elapsed, error=error)
+
+
+def is_connect_error(error):
+    """True jika koneksi tidak pernah terbentuk, jadi request belum terkirim dan aman diulang"""
+    import requests
+    from urllib3.exceptions import NewConnectionError
+
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def request(method, url, endpoint=None, timeout=DEFAULT_TIMEOUT, retries=MAX_RETRIES,
+            priority=rate_limit.BULK, idempotent=None, **kwargs):
+    """HTTP request dengan timeout, dan retry (backoff + jitter) untuk 429, 5xx dan gagal koneksi.
+
+    Request yang tidak idempotent (default: semua selain GET/HEAD/OPTIONS/PUT/DELETE) hanya
+    diulang jika belum sampai ke server: gagal membuka koneksi, 429 atau 503. Koneksi putus,
+    5xx lain dan read timeout tidak diulang karena request (misalnya review) mungkin sudah
+    diproses; isi `idempotent=True` jika request aman diulang.
+    Setiap percobaan menunggu jatah rate_limit untuk `endpoint` (nama provider) dengan `priority`.
+    """
+    import requests
+
+    endpoint = endpoint or urlsplit(url).netloc
+    if idempotent is None:
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+    session = get_session()
+    for attempt in range(retries + 1):
+        _rewind(kwargs.get("files"))
+        with rate_limit.slot(endpoint, priority):
+            start = time.perf_counter()
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except requests.ConnectionError as e:
+                _record(endpoint, time.perf_counter() - start, error=True)
+                if attempt == retries or not (idempotent or is_connect_error(e)):
+                    raise
+                response = None
+            except requests.RequestException:
+                _record(endpoint, time.perf_counter() - start, error=True)
+                raise
+        if response is None:
+            time.sleep(_backoff(attempt))
+            continue
+        throttled = response.status_code == 429
+        failed = throttled or response.status_code >= 500
+        _record(endpoint, time.perf_counter() - start, error=failed)
+        if throttled or (response.status_code == 503 and "Retry-After" in response.headers):
+            # Semua pemanggil provider ini ikut menunggu, bukan hanya request ini
+            rate_limit.pause(endpoint, rate_limit.parse_retry_after(response.headers.get("Retry-After")))
+        retryable = throttled or response.status_code == 503 or (failed and idempotent)
+        if retryable and attempt < retries:
+            # Jeda setelah 429 sudah dijalankan limiter provider; tanpa limiter, tunggu di sini
+            if not (throttled and rate_limit.get(endpoint)):
+                time.sleep(_backoff(attempt, _retry_after(response)))
+            continue
+        return response
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+async def arequest(method, url, **kwargs):
+    """Varian async: request berjalan di thread pool, jadi beberapa panggilan bisa jalan bersamaan"""
+    return await asyncio.to_thread(request, method, url, **kwargs)
+
+
+async def apost(url, **kwargs):
+    return await arequest("POST", url, **kwargs)
+
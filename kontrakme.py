@@ -1,8 +1,12 @@
 import streamlit as st
 import openai
-from PyPDF2 import PdfReader
 import io
 
+import contract_analysis
+import llm_cache
+import metrics
+from pdf_extract import extract_text_from_pdf
+
 # --- Konfigurasi Halaman Streamlit ---
 st.set_page_config(page_title="Penganalisis Kontrak PDF dengan OpenAI", layout="wide")
 
@@ -14,6 +18,7 @@ with st.sidebar:
     st.header("Konfigurasi OpenAI")
     openai_api_key = st.text_input("Masukkan OpenAI API Key Anda", type="password")
     st.warning("API Key Anda tidak akan disimpan.")
+    bypass_cache = st.checkbox("Abaikan cache (selalu analisis ulang)", value=False)
 
     st.markdown("---")
     st.header("Petunjuk")
@@ -24,40 +29,24 @@ with st.sidebar:
     4. Tunggu hasilnya di bawah.
     """)
 
-# --- Fungsi untuk Mengekstrak Teks dari PDF ---
-def extract_text_from_pdf(uploaded_file):
-    pdf_reader = PdfReader(uploaded_file)
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text() or "" # Handle potential None for empty pages
-    return text
-
 # --- Fungsi untuk Menganalisis Teks dengan OpenAI ---
-def analyze_contract_with_openai(contract_text, api_key):
+def analyze_contract_with_openai(contract_text, api_key, bypass_cache=False):
     if not api_key:
         st.error("Harap masukkan OpenAI API Key Anda di sidebar.")
         return "API Key tidak tersedia."
 
-    openai.api_key = api_key
+    client = openai.OpenAI(api_key=api_key)
 
-    # Batasi ukuran input ke model jika terlalu panjang
-    # Model GPT-3.5 Turbo memiliki batasan token, jadi kita perlu berhati-hati
-    max_tokens_per_prompt = 15000 # Contoh batas token untuk input
-    if len(contract_text) > max_tokens_per_prompt * 4: # Estimasi kasar karakter per token
-        contract_text = contract_text[:max_tokens_per_prompt * 4]
-        st.warning(f"Dokumen terlalu panjang, hanya {max_tokens_per_prompt * 4} karakter pertama yang akan dianalisis.")
+    # Dokumen panjang tidak lagi dipotong: dibagi per pasal/halaman dan dianalisis paralel.
+    # Pemberitahuan hanya muncul jika analisis benar-benar dijalankan, bukan saat hasil dari cache
+    def announce_split():
+        chunk_count = len(contract_analysis.split_contract(contract_text))
+        if chunk_count > 1:
+            st.info(f"Dokumen panjang dibagi menjadi {chunk_count} bagian yang dianalisis secara paralel.")
 
     try:
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",  # Anda bisa coba "gpt-4" jika memiliki akses
-            messages=[
-                {"role": "system", "content": "Anda adalah asisten yang ahli dalam menganalisis dokumen kontrak. Berikan ringkasan, poin-poin penting, potensi risiko, dan klausul kunci."},
-                {"role": "user", "content": f"Harap analisis dokumen kontrak berikut dan berikan poin-poin penting, potensi risiko, dan klausul kunci. Juga, ringkaslah inti kontrak. \n\nKontrak:\n{contract_text}"}
-            ],
-            temperature=0.7,
-            max_tokens=1000 # Batasi panjang respons dari model
-        )
-        return response.choices[0].message.content
+        return contract_analysis.analyze_contract_cached(contract_text, client, bypass_cache=bypass_cache,
+                                                         on_compute=announce_split)
     except openai.AuthenticationError:
         st.error("OpenAI API Key tidak valid. Harap periksa kembali.")
         return "Kesalahan Autentikasi API."
@@ -80,17 +69,27 @@ if uploaded_file is not None:
     if st.button("Analisis Kontrak", type="primary"):
         if openai_api_key:
             with st.spinner("Mengekstrak teks dari PDF..."):
-                contract_text = extract_text_from_pdf(uploaded_file)
+                with metrics.timer("analysis.extract_text"):
+                    contract_text = extract_text_from_pdf(uploaded_file)
                 st.subheader("Teks yang Diekstrak (Pratinjau)")
                 st.expander("Klik untuk melihat teks yang diekstrak").text_area("Teks", contract_text[:1000] + "..." if len(contract_text) > 1000 else contract_text, height=200)
 
 
             if contract_text:
                 with st.spinner("Menganalisis kontrak dengan OpenAI... Ini mungkin membutuhkan waktu beberapa saat."):
-                    analysis_result = analyze_contract_with_openai(contract_text, openai_api_key)
+                    with metrics.timer("analysis.total"):
+                        analysis_result = analyze_contract_with_openai(contract_text, openai_api_key, bypass_cache)
                     st.subheader("Hasil Analisis Kontrak:")
                     st.markdown(analysis_result)
             else:
                 st.error("Tidak dapat mengekstrak teks dari PDF. Pastikan PDF tidak kosong atau terenkripsi.")
         else:
             st.error("Harap masukkan OpenAI API Key Anda di sidebar sebelum menganalisis.")
+
+# --- Statistik cache (ditulis terakhir supaya mencakup analisis di rerun ini) ---
+with st.sidebar:
+    st.markdown("---")
+    st.header("Cache Analisis")
+    cache_stats = llm_cache.stats()
+    st.metric("Hit rate", f"{cache_stats['hit_rate']:.0%}")
+    st.caption(f"{cache_stats['hits']} hit, {cache_stats['misses']} miss, {cache_stats['entries']} jawaban tersimpan")
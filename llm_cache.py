@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import metrics
+
+# === Konfigurasi ===
+DB_FILE = os.environ.get("LLM_CACHE_DB", os.path.join(".cache", "llm.db"))
+TTL_SECONDS = int(os.environ.get("LLM_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", 50 * 1024 * 1024))
+# LLM_CACHE_DISABLED=1 mematikan cache untuk seluruh proses
+DISABLED = os.environ.get("LLM_CACHE_DISABLED") == "1"
+
+_local = threading.local()
+
+
+def _connection():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        os.makedirs(os.path.dirname(DB_FILE) or ".", exist_ok=True)
+        conn = sqlite3.connect(DB_FILE, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        _local.conn = conn
+    return conn
+
+
+def normalize_text(text):
+    """Spasi berlebih tidak mengubah isi kontrak, jadi tidak boleh mengubah kunci cache"""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_key(**parts):
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _count(conn, name):
+    conn.execute(
+        "INSERT INTO counters (name, value) VALUES (?, 1) "
+        "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+        (name,),
+    )
+
+
+def get(key):
+    """Ambil jawaban yang masih berlaku (belum lewat TTL), atau None"""
+    conn = _connection()
+    now = time.time()
+    row = conn.execute(
+        "SELECT value FROM responses WHERE key = ? AND created_at >= ?", (key, now - TTL_SECONDS)
+    ).fetchone()
+    if row is None:
+        metrics.incr("llm_cache.misses")
+        _count(conn, "misses")
+        return None
+    conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+    metrics.incr("llm_cache.hits")
+    _count(conn, "hits")
+    return json.loads(row[0])
+
+
+def _add_bytes(conn, delta):
+    """Perbarui total ukuran entri yang disimpan di tabel counters; kembalikan total barunya"""
+    row = conn.execute("SELECT value FROM counters WHERE name = 'bytes'").fetchone()
+    if row is None:
+        # Pertama kali (atau database lama): hitung sekali dari isi tabel
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    else:
+        total = row[0] + delta
+    conn.execute("INSERT OR REPLACE INTO counters (name, value) VALUES ('bytes', ?)", (total,))
+    return total
+
+
+def put(key, value):
+    conn = _connection()
+    now = time.time()
+    data = json.dumps(value, ensure_ascii=False)
+    # Total ukuran diperbarui dalam transaksi yang sama, jadi tetap benar untuk banyak proses
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        old = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, data, len(data), now, now),
+        )
+        total = _add_bytes(conn, len(data) - (old[0] if old else 0))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    if total > MAX_BYTES:
+        evict(conn)
+
+
+def evict(conn=None):
+    """Hapus entri kedaluwarsa, lalu entri yang paling lama tidak diakses sampai di bawah MAX_BYTES"""
+    conn = conn or _connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - TTL_SECONDS,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if total <= MAX_BYTES:
+                break
+            victims.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+        conn.execute("INSERT OR REPLACE INTO counters (name, value) VALUES ('bytes', ?)", (total,))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def cached(key, compute, bypass=False):
+    """Kembalikan jawaban dari cache, atau panggil compute() lalu simpan hasilnya.
+
+    bypass=True melewati pencarian saja: hasil baru tetap disimpan untuk panggilan berikutnya.
+    """
+    if DISABLED:
+        return compute()
+    value = None if bypass else get(key)
+    if value is None:
+        value = compute()
+        put(key, value)
+    return value
+
+
+def stats():
+    conn = _connection()
+    counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+    hits = counters.get("hits", 0)
+    misses = counters.get("misses", 0)
+    entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "entries": entries,
+        "bytes": size,
+    }
@@ -0,0 +1,194 @@
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+# === Konfigurasi ===
+# METRICS_ENABLED=0 mematikan semua pengukuran (timer jadi no-op)
+ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+SAMPLES_PER_STAGE = 1000
+# Jika diisi, snapshot ditulis berkala ke file ini (.prom = format teks Prometheus, selain itu JSON).
+# Setiap proses (aplikasi, worker review) menulis filenya sendiri: metrics.prom -> metrics.<pid>.prom
+EXPORT_FILE = os.environ.get("METRICS_EXPORT_FILE")
+EXPORT_INTERVAL_SECONDS = 15
+
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=SAMPLES_PER_STAGE))
+_totals = defaultdict(lambda: [0, 0.0, 0])  # stage -> [count, total_seconds, errors]
+_counters = defaultdict(int)
+_exporter = None
+_local = threading.local()
+
+
+def observe(stage, seconds, error=False):
+    """Catat satu durasi (detik) untuk sebuah tahap"""
+    if not ENABLED:
+        return
+    with _lock:
+        _samples[stage].append(seconds)
+        totals = _totals[stage]
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] += error
+    captured = getattr(_local, "captured", None)
+    if captured is not None:
+        captured[stage] = captured.get(stage, 0) + seconds
+
+
+@contextlib.contextmanager
+def capture():
+    """Kumpulkan durasi yang dicatat thread ini selama blok berjalan: {tahap: total detik}"""
+    captured = {}
+    _local.captured = captured
+    try:
+        yield captured
+    finally:
+        _local.captured = None
+
+
+def incr(name, amount=1):
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] += amount
+
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.stage, time.perf_counter() - self.start, error=exc_type is not None)
+        return False
+
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+def timer(stage):
+    """Context manager: `with metrics.timer("upload.extract"): ...`"""
+    return _Timer(stage) if ENABLED else _NULL_TIMER
+
+
+def timed(stage):
+    """Decorator; jika metrics dimatikan fungsi dikembalikan apa adanya (tanpa overhead)"""
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Timer(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(seconds):
+    """p50/p95/p99/maks (ms) dari daftar durasi (detik) yang tidak kosong"""
+    ordered = sorted(seconds)
+    return {
+        "p50_ms": _percentile(ordered, 0.50) * 1000,
+        "p95_ms": _percentile(ordered, 0.95) * 1000,
+        "p99_ms": _percentile(ordered, 0.99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def snapshot():
+    """Ringkasan per tahap (ms) dari sampel terakhir, plus total dan counter sejak proses dimulai"""
+    with _lock:
+        samples = {stage: list(values) for stage, values in _samples.items()}
+        totals = {stage: list(values) for stage, values in _totals.items()}
+        counters = dict(_counters)
+    stages = {}
+    for stage, values in samples.items():
+        count, total, errors = totals[stage]
+        stages[stage] = {"count": count, "errors": errors, "total_ms": total * 1000, **summarize(values)}
+    return {"timestamp": time.time(), "pid": os.getpid(), "stages": stages, "counters": counters}
+
+
+def _metric_name(name):
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def to_prometheus(snap=None):
+    snap = snap or snapshot()
+    lines = [
+        "# TYPE kontrak_stage_seconds summary",
+        "# TYPE kontrak_stage_errors_total counter",
+    ]
+    # Label pid membedakan deret dari proses aplikasi dan setiap worker review
+    pid = f',pid="{snap["pid"]}"' if "pid" in snap else ""
+    for stage, s in sorted(snap["stages"].items()):
+        label = f'stage="{stage}"'
+        if stage.startswith("http."):
+            # Panggilan keluar (http_client) bisa dikelompokkan per provider
+            label += f',endpoint="{stage[len("http."):]}"'
+        label += pid
+        for q, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+            lines.append(f'kontrak_stage_seconds{{{label},quantile="{q}"}} {s[key] / 1000:.6f}')
+        lines.append(f"kontrak_stage_seconds_sum{{{label}}} {s['total_ms'] / 1000:.6f}")
+        lines.append(f"kontrak_stage_seconds_count{{{label}}} {s['count']}")
+        lines.append(f"kontrak_stage_errors_total{{{label}}} {s['errors']}")
+    for name, value in sorted(snap["counters"].items()):
+        lines.append(f"# TYPE kontrak_{_metric_name(name)}_total counter")
+        lines.append(f"kontrak_{_metric_name(name)}_total{{{pid.lstrip(',')}}} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def to_json(snap=None):
+    return json.dumps(snap or snapshot(), indent=2)
+
+
+def export_path(path=None):
+    """File ekspor milik proses ini, supaya proses aplikasi dan worker tidak saling menimpa"""
+    root, ext = os.path.splitext(path or EXPORT_FILE)
+    return f"{root}.{os.getpid()}{ext}"
+
+
+def export(path=None):
+    """Tulis snapshot ke file secara atomik (default: export_path())"""
+    path = path or export_path()
+    snap = snapshot()
+    data = to_prometheus(snap) if path.endswith(".prom") else to_json(snap)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _run_exporter():
+    while True:
+        time.sleep(EXPORT_INTERVAL_SECONDS)
+        try:
+            export()
+        except OSError as e:
+            print(f"Metrics export error: {e}")
+
+
+def start_exporter():
+    """Ekspor berkala ke METRICS_EXPORT_FILE (sekali per proses)"""
+    global _exporter
+    if not (ENABLED and EXPORT_FILE):
+        return
+    with _lock:
+        if _exporter is None:
+            _exporter = threading.Thread(target=_run_exporter, name="metrics-exporter", daemon=True)
+            _exporter.start()
+
+
+start_exporter()
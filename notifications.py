@@ -0,0 +1,314 @@
+import logging
+import random
+import threading
+import time
+from email.mime.text import MIMEText
+
+import contract_store
+import http_client
+import metrics
+import rate_limit
+from settings import get_secret
+
+# === Konfigurasi ===
+TELEGRAM_API_URL = get_secret("TELEGRAM_API_URL", "https://api.telegram.org")
+TELEGRAM_BOT_TOKEN = get_secret("TELEGRAM_BOT_TOKEN")
+TELEGRAM_CHAT_ID = get_secret("TELEGRAM_CHAT_ID")
+SMTP_SERVER = get_secret("SMTP_SERVER", "smtp.gmail.com")
+SMTP_PORT = int(get_secret("SMTP_PORT", 587))
+SMTP_STARTTLS = str(get_secret("SMTP_STARTTLS", "1")) == "1"
+SMTP_USER = get_secret("SMTP_USER")
+SMTP_PASS = get_secret("SMTP_PASS")  # App Password Gmail
+EMAIL_TO = get_secret("EMAIL_TO")
+
+# Pesan ke penerima yang sama dalam jendela ini digabung jadi satu
+COALESCE_SECONDS = float(get_secret("NOTIFY_COALESCE_SECONDS", 10))
+POLL_SECONDS = 5
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 15
+# Pesan 'sending' lebih lama dari ini dianggap milik worker yang mati
+STALE_CLAIM_SECONDS = 300
+TELEGRAM_MAX_CHARS = 4096
+HTTP_TIMEOUT = (5, 15)
+
+logger = logging.getLogger(__name__)
+
+_worker = None
+_worker_lock = threading.Lock()
+_wake = threading.Event()
+
+
+# === Pesan ===
+def format_review_message(file_name, review_result):
+    """Format hasil review jadi pesan rapi"""
+    if not isinstance(review_result, dict):
+        return f"📄 Review Kontrak: {file_name}\n\nHasil: {review_result}"
+
+    status = review_result.get("status", "Tidak diketahui")
+    summary = review_result.get("review", review_result.get("message", "Tidak ada ringkasan"))
+
+    if status == "error":
+        return (
+            f"📄 Review Kontrak: {file_name}\n"
+            f"❌ ERROR: {summary}"
+        )
+    else:
+        return (
+            f"📄 Review Kontrak: {file_name}\n"
+            f"✅ Status: {status}\n"
+            f"📝 Ringkasan: {summary}"
+        )
+
+
+# === Antrean ===
+def _insert(conn, channel, recipient, subject, body):
+    now = time.time()
+    conn.execute(
+        "INSERT INTO outbox (channel, recipient, subject, body, created_at, next_attempt_at) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (channel, recipient, subject, body, now, now),
+    )
+
+
+def _enqueue(channel, recipient, subject, body, conn=None):
+    # Dengan conn, pesan ikut transaksi milik pemanggil (tersimpan atau batal bersama datanya)
+    if conn is not None:
+        _insert(conn, channel, recipient, subject, body)
+    else:
+        conn = contract_store.get_connection()
+        with contract_store.transaction(conn):
+            _insert(conn, channel, recipient, subject, body)
+    _wake.set()
+
+
+def telegram_configured():
+    """True jika token bot Telegram tersedia (pesan Telegram bisa dikirim)"""
+    return bool(TELEGRAM_BOT_TOKEN)
+
+
+def email_configured():
+    """True jika kredensial SMTP tersedia (email bisa dikirim)"""
+    return bool(SMTP_USER and SMTP_PASS)
+
+
+def enqueue_telegram(message, chat_id=None, conn=None):
+    """Masukkan pesan Telegram ke antrean; dikirim oleh worker di background"""
+    chat_id = chat_id or TELEGRAM_CHAT_ID
+    if not telegram_configured() or not chat_id:
+        return
+    # Pesan panjang dipecah jadi beberapa baris outbox, supaya retry hanya mengirim potongan yang gagal
+    for chunk in _split_telegram(message):
+        _enqueue("telegram", str(chat_id), None, chunk, conn=conn)
+
+
+def enqueue_email(subject, body, to_email=None, conn=None):
+    """Masukkan email ke antrean; dikirim oleh worker di background"""
+    to_email = to_email or EMAIL_TO
+    if not email_configured() or not to_email:
+        return
+    _enqueue("email", to_email, subject, body, conn=conn)
+
+
+def _claim_due(conn, now, coalesce_seconds):
+    """Ambil semua pesan yang jatuh tempo, dikelompokkan per (channel, penerima)"""
+    with contract_store.transaction(conn):
+        # Kelompok baru dikirim setelah pesan tertuanya melewati jendela penggabungan
+        groups = conn.execute(
+            "SELECT channel, recipient FROM outbox WHERE status = 'queued' AND next_attempt_at <= ? "
+            "GROUP BY channel, recipient HAVING MIN(created_at) <= ?",
+            (now, now - coalesce_seconds),
+        ).fetchall()
+        batch = []
+        for g in groups:
+            rows = conn.execute(
+                "SELECT id, subject, body, attempts FROM outbox "
+                "WHERE status = 'queued' AND channel = ? AND recipient = ? AND next_attempt_at <= ? ORDER BY id",
+                (g["channel"], g["recipient"], now),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET status = 'sending', claimed_at = ? WHERE id = ?",
+                [(now, r["id"]) for r in rows],
+            )
+            batch.append((g["channel"], g["recipient"], rows))
+    return batch
+
+
+def _mark_sent(conn, rows):
+    with contract_store.transaction(conn):
+        conn.executemany(
+            "UPDATE outbox SET status = 'sent', sent_at = ?, last_error = NULL WHERE id = ?",
+            [(time.time(), r["id"]) for r in rows],
+        )
+
+
+def _mark_failed(conn, rows, error, retry_after=None, permanent=False):
+    """Jadwalkan ulang dengan exponential backoff + jitter, atau tandai gagal permanen"""
+    now = time.time()
+    updates = []
+    for r in rows:
+        attempts = r["attempts"] + 1
+        delay = retry_after or BACKOFF_BASE_SECONDS * 2 ** (attempts - 1)
+        status = "failed" if permanent or attempts >= MAX_ATTEMPTS else "queued"
+        updates.append((status, attempts, now + delay * random.uniform(1, 1.25), str(error), r["id"]))
+    with contract_store.transaction(conn):
+        conn.executemany(
+            "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, claimed_at = NULL "
+            "WHERE id = ?",
+            updates,
+        )
+
+
+def _merge_email(rows):
+    if len(rows) == 1:
+        return rows[0]["subject"], rows[0]["body"]
+    parts = [f"{r['subject']}\n\n{r['body']}" for r in rows]
+    return f"📬 {len(rows)} notifikasi kontrak", "\n\n---\n\n".join(parts)
+
+
+def _split_telegram(text):
+    return [text[i:i + TELEGRAM_MAX_CHARS] for i in range(0, len(text), TELEGRAM_MAX_CHARS)] or [""]
+
+
+def _pack_telegram(rows):
+    """Kelompokkan baris berurutan jadi pesan <= TELEGRAM_MAX_CHARS tanpa memotong baris mana pun"""
+    packs = []
+    size = 0
+    for r in rows:
+        # +2 untuk pemisah "\n\n" antar pesan
+        if packs and size + 2 + len(r["body"]) <= TELEGRAM_MAX_CHARS:
+            packs[-1].append(r)
+            size += 2 + len(r["body"])
+        else:
+            packs.append([r])
+            size = len(r["body"])
+    return packs
+
+
+# === Pengiriman ===
+def _send_email(conn, server, recipient, rows):
+    """Kirim satu email; penolakan server hanya menggagalkan email ini (5xx: gagal permanen)"""
+    import smtplib
+
+    subject, body = _merge_email(rows)
+    msg = MIMEText(body, "plain")
+    msg["Subject"] = subject
+    msg["From"] = SMTP_USER
+    msg["To"] = recipient
+    try:
+        with rate_limit.slot("smtp", rate_limit.BACKGROUND):
+            server.sendmail(SMTP_USER, [recipient], msg.as_string())
+    except smtplib.SMTPRecipientsRefused as e:
+        code = min(code for code, _ in e.recipients.values())
+        _mark_failed(conn, rows, e, permanent=code >= 500)
+        return
+    except smtplib.SMTPResponseException as e:
+        if e.smtp_code == 421:
+            # Server menutup koneksi: biarkan penanganan koneksi yang menjadwalkan ulang sisanya
+            raise
+        _mark_failed(conn, rows, e, permanent=e.smtp_code >= 500)
+        return
+    try:
+        _mark_sent(conn, rows)
+    except Exception:
+        # Email sudah terkirim: jangan dijadwalkan ulang, supaya tidak terkirim dua kali
+        logger.exception("Gagal menandai email ke %s sebagai terkirim", recipient)
+
+
+def _deliver_emails(conn, groups):
+    """Kirim semua email dalam batch lewat satu koneksi SMTP"""
+    import smtplib
+
+    pending = list(groups)
+    try:
+        with metrics.timer("notify.smtp_batch"), smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=30) as server:
+            if SMTP_STARTTLS:
+                server.starttls()
+            server.login(SMTP_USER, SMTP_PASS)
+            while pending:
+                _send_email(conn, server, *pending[0])
+                pending.pop(0)
+    except (smtplib.SMTPException, OSError) as e:
+        # Koneksi gagal atau putus di tengah batch: sisa kelompok dicoba lagi nanti
+        for _, rows in pending:
+            _mark_failed(conn, rows, e)
+
+
+def _deliver_telegram(conn, recipient, rows):
+    """Kirim pesan per paket; setiap paket yang terkirim langsung ditandai, yang gagal dicoba lagi"""
+    url = f"{TELEGRAM_API_URL}/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
+    packs = _pack_telegram(rows)
+    metrics.incr("notify.coalesced_messages", len(rows) - len(packs))
+    for i, pack in enumerate(packs):
+        pending = [r for p in packs[i:] for r in p]
+        text = "\n\n".join(r["body"] for r in pack)
+        try:
+            # Hanya baris lama (diantrekan sebelum pesan dipecah saat enqueue) yang bisa > batas
+            for chunk in _split_telegram(text):
+                # Retry ditangani antrean outbox, bukan di level HTTP
+                response = http_client.post(url, json={"chat_id": recipient, "text": chunk},
+                                            endpoint="telegram", timeout=HTTP_TIMEOUT, retries=0,
+                                            priority=rate_limit.BACKGROUND)
+                if response.status_code == 429:
+                    retry_after = response.json().get("parameters", {}).get("retry_after")
+                    # Telegram mengirim jedanya di body, bukan header: tahan juga pengiriman lain
+                    rate_limit.pause("telegram", retry_after)
+                    _mark_failed(conn, pending, "Telegram rate limit", retry_after=retry_after)
+                    return
+                response.raise_for_status()
+        except Exception as e:
+            _mark_failed(conn, pending, e)
+            return
+        _mark_sent(conn, pack)
+
+
+def drain_once(now=None, coalesce_seconds=None):
+    """Kirim semua pesan yang jatuh tempo; mengembalikan jumlah pesan yang diproses"""
+    conn = contract_store.get_connection()
+    if coalesce_seconds is None:
+        coalesce_seconds = COALESCE_SECONDS
+    batch = _claim_due(conn, now or time.time(), coalesce_seconds)
+    emails = [(recipient, rows) for channel, recipient, rows in batch if channel == "email"]
+    metrics.incr("notify.messages_claimed", sum(len(rows) for _, _, rows in batch))
+    if emails:
+        _deliver_emails(conn, emails)
+    for channel, recipient, rows in batch:
+        if channel == "telegram":
+            _deliver_telegram(conn, recipient, rows)
+    return sum(len(rows) for _, _, rows in batch)
+
+
+def flush():
+    """Kirim sekarang semua pesan yang sudah jatuh tempo tanpa menunggu jendela penggabungan"""
+    return drain_once(coalesce_seconds=0)
+
+
+def requeue_stale(now=None):
+    """Kembalikan pesan 'sending' milik worker yang mati ke antrean"""
+    conn = contract_store.get_connection()
+    with contract_store.transaction(conn):
+        conn.execute(
+            "UPDATE outbox SET status = 'queued', claimed_at = NULL WHERE status = 'sending' AND claimed_at < ?",
+            ((now or time.time()) - STALE_CLAIM_SECONDS,),
+        )
+
+
+def _run_worker():
+    while True:
+        try:
+            # Tiap putaran, supaya klaim worker yang mati di tengah jalan tidak tertahan sampai restart
+            requeue_stale()
+            drain_once()
+        except Exception:
+            logger.exception("Notification worker error")
+        _wake.wait(POLL_SECONDS)
+        _wake.clear()
+
+
+def start_worker():
+    """Jalankan worker pengirim sekali per proses (aman dipanggil di setiap rerun Streamlit)"""
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run_worker, name="notification-worker", daemon=True)
+            _worker.start()
+    return _worker
@@ -0,0 +1,126 @@
+import functools
+import hashlib
+import json
+import os
+import threading
+
+# === Konfigurasi ===
+CACHE_DIR = os.environ.get("PDF_CACHE_DIR", os.path.join(".cache", "pdf"))
+MAX_BYTES = int(os.environ.get("PDF_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+# Naikkan EXTRACT_VERSION setiap kali logika ekstraksi di pdf_extract.py berubah supaya entri lama tidak dipakai
+EXTRACT_VERSION = "2"
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+# Perkiraan ukuran cache agar put() tidak perlu memindai folder setiap kali
+_approx_bytes = None
+
+
+def file_digest(source):
+    """SHA-256 isi PDF dari path atau file-like object (posisi baca dikembalikan)"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return hashlib.file_digest(f, "sha256").hexdigest()
+    pos = source.tell()
+    source.seek(0)
+    try:
+        return hashlib.file_digest(source, "sha256").hexdigest()
+    finally:
+        source.seek(pos)
+
+
+@functools.cache
+def cache_version():
+    # PyPDF2 baru di-import saat cache benar-benar dipakai (saat ekstraksi), bukan saat startup
+    import PyPDF2
+
+    return f"{EXTRACT_VERSION}-pypdf2-{PyPDF2.__version__}"
+
+
+def _path(digest):
+    return os.path.join(CACHE_DIR, f"{digest}.json")
+
+
+def new_entry():
+    return {"version": cache_version(), "page_count": None, "pages": {}, "fields": {}}
+
+
+def get(digest):
+    """Ambil entri cache; entri kosong baru jika belum ada atau versinya sudah usang"""
+    try:
+        with open(_path(digest), encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        entry = None
+    with _lock:
+        if entry is None or entry.get("version") != cache_version():
+            _stats["misses"] += 1
+            return new_entry()
+        _stats["hits"] += 1
+    # mtime dipakai sebagai waktu akses terakhir untuk eviction LRU
+    try:
+        os.utime(_path(digest))
+    except OSError:
+        pass
+    return entry
+
+
+def put(digest, entry):
+    """Tulis entri secara atomik lalu buang entri terlama jika melebihi MAX_BYTES"""
+    global _approx_bytes
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{_path(digest)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    size = os.path.getsize(tmp_path)
+    try:
+        # Entri yang ditimpa tidak menambah ukuran cache sebesar file barunya
+        size -= os.path.getsize(_path(digest))
+    except OSError:
+        pass
+    os.replace(tmp_path, _path(digest))
+    with _lock:
+        if _approx_bytes is not None:
+            _approx_bytes += size
+        over = _approx_bytes is None or _approx_bytes > MAX_BYTES
+    if over:
+        evict()
+
+
+def evict(max_bytes=None):
+    """Hapus entri yang paling lama tidak diakses sampai total ukuran <= max_bytes"""
+    global _approx_bytes
+    max_bytes = MAX_BYTES if max_bytes is None else max_bytes
+    files = []
+    total = 0
+    with os.scandir(CACHE_DIR) as it:
+        for e in it:
+            if e.name.endswith(".json"):
+                st = e.stat()
+                files.append((st.st_mtime, st.st_size, e.path))
+                total += st.st_size
+    if total > max_bytes:
+        for _, size, path in sorted(files):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= max_bytes:
+                break
+    with _lock:
+        _approx_bytes = total
+
+
+def stats():
+    """Hit/miss sejak proses dimulai, plus jumlah dan ukuran entri di disk"""
+    entries = 0
+    size = 0
+    if os.path.isdir(CACHE_DIR):
+        with os.scandir(CACHE_DIR) as it:
+            for e in it:
+                if e.name.endswith(".json"):
+                    entries += 1
+                    size += e.stat().st_size
+    with _lock:
+        return {**_stats, "entries": entries, "bytes": size}
@@ -0,0 +1,127 @@
+import contextlib
+import mmap
+import os
+
+import metrics
+import pdf_cache
+from contract_fields import FIELDS, extract_fields
+
+# === Konfigurasi ===
+# Tanggal biasanya ada di halaman depan atau halaman tanda tangan
+HEAD_PAGES = 3
+TAIL_PAGES = 3
+
+
+@contextlib.contextmanager
+def open_pdf(source):
+    """Buka PDF dari path (lewat mmap, tanpa membaca seluruh file ke memori) atau file-like object"""
+    from PyPDF2 import PdfReader
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield PdfReader(buf)
+    else:
+        yield PdfReader(source)
+
+
+def scan_order(page_count, head=HEAD_PAGES, tail=TAIL_PAGES):
+    """Urutan indeks halaman: head halaman pertama, tail halaman terakhir, lalu sisanya"""
+    first = list(range(min(head, page_count)))
+    last = [i for i in range(max(page_count - tail, 0), page_count) if i >= len(first)]
+    seen = set(first) | set(last)
+    return first + last + [i for i in range(page_count) if i not in seen]
+
+
+def _indices(order, page_count):
+    if callable(order):
+        return order(page_count)
+    return order if order is not None else range(page_count)
+
+
+def iter_pages(source, order=None, cache_entry=None):
+    """Generator (indeks_halaman, teks) satu per satu; order=None berarti urutan dokumen.
+
+    Jika cache_entry diberikan, halaman yang sudah ada di cache tidak di-parse ulang
+    dan halaman baru yang diekstrak ikut disimpan ke entri tersebut.
+    """
+    cached = cache_entry["pages"] if cache_entry is not None else {}
+    page_count = cache_entry["page_count"] if cache_entry is not None else None
+    with contextlib.ExitStack() as stack:
+        reader = None
+        if page_count is None:
+            reader = stack.enter_context(open_pdf(source))
+            page_count = len(reader.pages)
+            if cache_entry is not None:
+                cache_entry["page_count"] = page_count
+        for i in _indices(order, page_count):
+            text = cached.get(str(i))
+            if text is None:
+                metrics.incr("pdf.pages_parsed")
+                # PDF baru dibuka saat ada halaman yang belum ter-cache
+                if reader is None:
+                    reader = stack.enter_context(open_pdf(source))
+                text = reader.pages[i].extract_text() or ""
+                if cache_entry is not None:
+                    cached[str(i)] = text
+            yield i, text
+
+
+def find_in_pdf(source, pattern, order=scan_order, cache_entry=None):
+    """Cari pola halaman demi halaman dan berhenti di kecocokan pertama"""
+    for _, text in iter_pages(source, order=order, cache_entry=cache_entry):
+        match = pattern.search(text)
+        if match:
+            return match
+    return None
+
+
+@metrics.timed("pdf.extract_expiry")
+def extract_expiry_from_pdf(file_path):
+    """Tanggal expiry (YYYY-MM-DD) dari PDF, pakai cache jika file yang sama pernah diproses.
+
+    Hanya field expiry yang dicari, jadi scan berhenti di halaman pertama yang memuat
+    tanggal berlabel ("berlaku sampai", "expired", ...).
+    """
+    try:
+        digest = pdf_cache.file_digest(file_path)
+        entry = pdf_cache.get(digest)
+        if "expiry" not in entry["fields"]:
+            pages = iter_pages(file_path, order=scan_order, cache_entry=entry)
+            entry["fields"]["expiry"] = extract_fields(pages, fields=("expiry",))["expiry"]
+            pdf_cache.put(digest, entry)
+        found = entry["fields"]["expiry"]
+        return found["value"] if found else None
+    except Exception:
+        return None
+
+
+@metrics.timed("pdf.extract_fields")
+def extract_fields_from_pdf(file_path):
+    """Semua field kontrak (lihat contract_fields.FIELDS) dengan confidence, atau None jika PDF gagal dibaca"""
+    try:
+        digest = pdf_cache.file_digest(file_path)
+        entry = pdf_cache.get(digest)
+        if "contract" not in entry["fields"]:
+            pages = iter_pages(file_path, order=scan_order, cache_entry=entry)
+            entry["fields"]["contract"] = extract_fields(pages, fields=FIELDS)
+            pdf_cache.put(digest, entry)
+        return entry["fields"]["contract"]
+    except Exception:
+        return None
+
+
+def extract_pages_from_pdf(source, digest=None):
+    """Teks setiap halaman sesuai urutan dokumen, pakai cache jika file yang sama pernah diproses"""
+    digest = digest or pdf_cache.file_digest(source)
+    entry = pdf_cache.get(digest)
+    known = len(entry["pages"])
+    pages = [t for _, t in iter_pages(source, cache_entry=entry)]
+    if len(entry["pages"]) != known:
+        pdf_cache.put(digest, entry)
+    return pages
+
+
+@metrics.timed("pdf.extract_text")
+def extract_text_from_pdf(uploaded_file):
+    """Gabungkan teks semua halaman sesuai urutan dokumen (dipisah baris kosong sebagai batas halaman)"""
+    return "\n\n".join(extract_pages_from_pdf(uploaded_file))
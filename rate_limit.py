@@ -0,0 +1,201 @@
+"""Pembatas laju panggilan keluar per provider (OpenAI, Streamline, Telegram, SMTP, Langflow).
+
+Setiap provider punya token bucket (permintaan per detik + burst) dan batas panggilan
+bersamaan. Pemanggil yang kehabisan jatah menunggu di antrean, bukan gagal; antrean
+diurutkan menurut prioritas (chat interaktif > review massal > notifikasi), lalu urutan
+datang. Retry-After dari provider (429/503) menahan semua pemanggil provider itu.
+
+Batas berlaku per proses: proses worker review (review_jobs.py) masing-masing punya bucket
+sendiri, jadi batas Streamline di sana dibagi lewat STREAMLINE_CONCURRENCY.
+
+Konfigurasi per provider: RATE_LIMIT_<PROVIDER>="per_detik,burst,bersamaan",
+misalnya RATE_LIMIT_OPENAI="5,10,8".
+"""
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+import metrics
+from settings import get_secret
+
+# === Konfigurasi ===
+INTERACTIVE = 0  # pengguna sedang menunggu (chat, riset)
+BULK = 1  # review dan analisis dokumen
+BACKGROUND = 2  # notifikasi
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk", BACKGROUND: "background"}
+
+# provider: (permintaan per detik, burst, maksimum bersamaan)
+DEFAULT_LIMITS = {
+    "openai": (5, 10, 8),
+    "streamline": (2, 4, 4),
+    "telegram": (25, 25, 8),  # Telegram membatasi ~30 pesan/detik per bot
+    "smtp": (5, 5, 1),
+    "langflow": (2, 4, 4),
+}
+# Pemanggil yang menunggu lebih lama dari ini mendapat RateLimitTimeout
+MAX_WAIT_SECONDS = 300
+# Retry-After yang tidak masuk akal (atau tanpa nilai) dibatasi/diisi dengan ini
+MAX_PAUSE_SECONDS = 60
+DEFAULT_PAUSE_SECONDS = 1
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class RateLimitTimeout(TimeoutError):
+    """Jatah provider tidak tersedia dalam MAX_WAIT_SECONDS"""
+
+
+def parse_retry_after(value):
+    """Header Retry-After (detik atau tanggal HTTP) -> detik, None jika kosong/tidak valid"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class Limiter:
+    """Token bucket + batas konkurensi + antrean prioritas untuk satu provider"""
+
+    def __init__(self, name, rate, burst, concurrency):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self._cond = threading.Condition()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._active = 0
+        self._waiting = []  # heap (prioritas, urutan)
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=BULK, timeout=MAX_WAIT_SECONDS):
+        """Tunggu giliran; kembalikan lama menunggu (detik)"""
+        start = time.monotonic()
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = None  # None = tunggu sampai ada slot yang dilepas
+                    if now < self._paused_until:
+                        wait = self._paused_until - now
+                    elif self._tokens < 1:
+                        wait = (1 - self._tokens) / self.rate
+                    elif self._waiting[0] == ticket and self._active < self.concurrency:
+                        heapq.heappop(self._waiting)
+                        self._tokens -= 1
+                        self._active += 1
+                        # Pemanggil berikutnya di antrean mungkin juga sudah boleh jalan
+                        self._cond.notify_all()
+                        return now - start
+                    if timeout is not None:
+                        remaining = start + timeout - now
+                        if remaining <= 0:
+                            raise RateLimitTimeout(f"Antrean {self.name} penuh lebih dari {timeout} detik")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            except BaseException:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                raise
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def pause(self, seconds=None):
+        """Tahan semua pemanggil selama `seconds` (dari Retry-After)"""
+        seconds = min(DEFAULT_PAUSE_SECONDS if seconds is None else seconds, MAX_PAUSE_SECONDS)
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+        metrics.incr(f"ratelimit.{self.name}.paused")
+
+    def stats(self):
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "rate": self.rate, "burst": self.burst, "concurrency": self.concurrency,
+                "tokens": round(self._tokens, 2), "active": self._active, "waiting": len(self._waiting),
+                "paused_for": round(max(self._paused_until - time.monotonic(), 0), 2),
+            }
+
+
+def _configured_limits(provider):
+    value = get_secret(f"RATE_LIMIT_{provider.upper()}")
+    if value:
+        rate, burst, concurrency = (float(v) for v in str(value).split(","))
+        return rate, burst, int(concurrency)
+    return DEFAULT_LIMITS.get(provider)
+
+
+def get(provider):
+    """Limiter untuk provider, None jika provider tidak dibatasi"""
+    with _limiters_lock:
+        if provider not in _limiters:
+            limits = _configured_limits(provider)
+            _limiters[provider] = Limiter(provider, *limits) if limits else None
+        return _limiters[provider]
+
+
+def configure(provider, rate, burst, concurrency):
+    """Ganti batas satu provider (misalnya untuk uji beban terhadap server tiruan)"""
+    with _limiters_lock:
+        _limiters[provider] = Limiter(provider, rate, burst, concurrency)
+    return _limiters[provider]
+
+
+def pause(provider, seconds=None):
+    limiter = get(provider)
+    if limiter is not None:
+        limiter.pause(seconds)
+
+
+@contextmanager
+def slot(provider, priority=BULK, timeout=MAX_WAIT_SECONDS):
+    """Jalankan satu panggilan ke provider di dalam jatahnya.
+
+    Error dari SDK yang membawa respons 429 (misalnya openai.RateLimitError) ikut
+    menahan provider sesuai Retry-After-nya sebelum diteruskan ke pemanggil.
+    """
+    limiter = get(provider)
+    if limiter is None:
+        yield
+        return
+    waited = limiter.acquire(priority, timeout)
+    metrics.observe(f"ratelimit.{provider}.{PRIORITY_NAMES.get(priority, priority)}", waited)
+    try:
+        yield
+    except Exception as e:
+        response = getattr(e, "response", None)
+        if getattr(response, "status_code", None) == 429:
+            limiter.pause(parse_retry_after(response.headers.get("Retry-After")))
+        raise
+    finally:
+        limiter.release()
+
+
+def stats():
+    with _limiters_lock:
+        limiters = {name: limiter for name, limiter in _limiters.items() if limiter is not None}
+    return {name: limiter.stats() for name, limiter in limiters.items()}
@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import metrics
+
+# === Konfigurasi ===
+TTL_SECONDS = 6 * 3600
+MAX_ENTRIES = 256
+
+# Modul ini dimuat sekali per proses Streamlit, jadi cache dipakai bersama semua sesi/browser
+_lock = threading.Lock()
+_entries = OrderedDict()  # key -> (expires_at, result)
+_inflight = {}  # key -> Future milik request yang sedang berjalan
+_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+# Hasil Future jika pemilik berhenti tanpa hasil; yang menunggu mencoba lagi
+_ABANDONED = object()
+
+
+def normalize_topic(topic):
+    return " ".join(topic.lower().split())
+
+
+def get_or_run(api_url, topic, run, refresh=False):
+    """Hasil riset dari cache, atau jalankan run() sekali saja walau diminta banyak sesi bersamaan.
+
+    Hasil None (gagal) tidak disimpan; exception dari run() diteruskan ke semua yang menunggu.
+    Jika pemilik berhenti karena kontrol alur (rerun/stop Streamlit, KeyboardInterrupt), yang
+    menunggu tidak ikut berhenti: salah satunya mengambil alih dan menjalankan run() sendiri.
+    """
+    key = (api_url, normalize_topic(topic))
+    while True:
+        now = time.monotonic()
+        with _lock:
+            hit = _entries.get(key)
+            if hit and hit[0] > now and not refresh:
+                _entries.move_to_end(key)
+                _stats["hits"] += 1
+                metrics.incr("research_cache.hits")
+                return hit[1]
+            future = _inflight.get(key)
+            owner = future is None
+            if owner:
+                future = _inflight[key] = Future()
+                _stats["misses"] += 1
+            else:
+                _stats["coalesced"] += 1
+        metrics.incr("research_cache.coalesced" if not owner else "research_cache.misses")
+        if owner:
+            break
+        result = future.result()
+        if result is not _ABANDONED:
+            return result
+
+    try:
+        with metrics.timer("langflow.research"):
+            result = run()
+    except Exception as e:
+        with _lock:
+            _inflight.pop(key, None)
+        future.set_exception(e)
+        raise
+    except BaseException:
+        # StopException/RerunException milik sesi pemilik bukan urusan sesi lain
+        with _lock:
+            _inflight.pop(key, None)
+        future.set_result(_ABANDONED)
+        raise
+    with _lock:
+        if result is not None:
+            _entries[key] = (time.monotonic() + TTL_SECONDS, result)
+            _entries.move_to_end(key)
+            while len(_entries) > MAX_ENTRIES:
+                _entries.popitem(last=False)
+        _inflight.pop(key, None)
+    future.set_result(result)
+    return result
+
+
+def stats():
+    with _lock:
+        return {**_stats, "entries": len(_entries), "inflight": len(_inflight)}
@@ -0,0 +1,377 @@
+"""Antrean job review kontrak yang tahan restart.
+
+Tombol "Simpan & Review" hanya menyimpan file dan memasukkan job ke tabel review_jobs;
+proses worker menjalankan ekstraksi field, penyimpanan kontrak, indeks klausul, review
+Streamline, dan notifikasi. Status job: queued -> running -> done / failed.
+
+Setiap langkah yang menulis data memeriksa hasil langkah sebelumnya (contract_row,
+indeks per blob), jadi job yang diulang setelah worker mati tidak menyimpan kontrak dua kali.
+
+Contoh (worker tanpa Streamlit, misalnya dengan REVIEW_WORKERS=0 di aplikasi):
+    python review_jobs.py --workers 4
+"""
+import json
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+
+import contract_store
+import metrics
+import notifications
+import rate_limit
+from settings import get_secret
+
+logger = logging.getLogger(__name__)
+
+# === Konfigurasi ===
+STREAMLINE_URL = get_secret("STREAMLINE_URL", "https://api.streamline.ai/v1/contracts/review")
+STREAMLINE_API_KEY = get_secret("STREAMLINE_API_KEY")
+# Jumlah proses worker yang dijalankan aplikasi Streamlit (0 = jalankan `python review_jobs.py` terpisah)
+WORKERS = int(get_secret("REVIEW_WORKERS", 2))
+# Batas panggilan Streamline yang berjalan bersamaan dari semua worker
+STREAMLINE_CONCURRENCY = int(get_secret("STREAMLINE_CONCURRENCY", 2))
+HTTP_TIMEOUT = (5, 120)
+POLL_SECONDS = 1
+MAX_ATTEMPTS = 4
+BACKOFF_BASE_SECONDS = 30
+HEARTBEAT_SECONDS = 10
+# Job 'running' tanpa heartbeat selama ini dianggap milik worker yang mati
+STALE_SECONDS = 60
+
+
+class PermanentError(Exception):
+    """Job tidak bisa berhasil walau diulang (misalnya tanggal expiry tidak ada di PDF)"""
+
+
+class RetryableError(Exception):
+    """Gangguan sementara di upstream; job dijadwalkan ulang"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# === Antrean ===
+def enqueue(contract_id, file_name, digest, options=None, conn=None):
+    """Masukkan job review; kembalikan id job"""
+    conn = conn or contract_store.get_connection()
+    now = time.time()
+    with contract_store.transaction(conn):
+        cur = conn.execute(
+            "INSERT INTO review_jobs (contract_id, file_name, digest, options, created_at, next_attempt_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (contract_id, file_name, digest, json.dumps(options or {}), now, now),
+        )
+    metrics.incr("jobs.enqueued")
+    return cur.lastrowid
+
+
+def active_job_for_blob(digest, conn=None):
+    """Job yang masih antre/berjalan untuk file yang sama, None jika tidak ada"""
+    conn = conn or contract_store.get_connection()
+    row = conn.execute(
+        "SELECT * FROM review_jobs WHERE digest = ? AND status IN ('queued', 'running') ORDER BY id LIMIT 1",
+        (digest,),
+    ).fetchone()
+    return dict(row) if row else None
+
+
+def get_jobs(ids, conn=None):
+    conn = conn or contract_store.get_connection()
+    if not ids:
+        return []
+    placeholders = ", ".join("?" * len(ids))
+    rows = conn.execute(f"SELECT * FROM review_jobs WHERE id IN ({placeholders}) ORDER BY id DESC", list(ids))
+    return [dict(r) for r in rows]
+
+
+def recent_jobs(limit=50, conn=None):
+    conn = conn or contract_store.get_connection()
+    rows = conn.execute("SELECT * FROM review_jobs ORDER BY id DESC LIMIT ?", (limit,))
+    return [dict(r) for r in rows]
+
+
+def counts(conn=None):
+    """Jumlah job per status"""
+    conn = conn or contract_store.get_connection()
+    rows = conn.execute("SELECT status, COUNT(*) AS n FROM review_jobs GROUP BY status").fetchall()
+    return {r["status"]: r["n"] for r in rows}
+
+
+def stage_stats(limit=500, conn=None):
+    """p50/p95/p99 per tahap dari `limit` job terakhir yang selesai/gagal (diukur di proses worker)"""
+    conn = conn or contract_store.get_connection()
+    rows = conn.execute(
+        "SELECT timings FROM review_jobs WHERE timings IS NOT NULL ORDER BY id DESC LIMIT ?", (limit,)
+    )
+    samples = {}
+    for row in rows:
+        for stage, seconds in json.loads(row["timings"]).items():
+            samples.setdefault(stage, []).append(seconds)
+    return {stage: {"count": len(values), **metrics.summarize(values)} for stage, values in sorted(samples.items())}
+
+
+def requeue_stale(conn, now=None):
+    """Kembalikan job 'running' milik worker yang mati ke antrean (dipanggil di dalam transaksi)"""
+    now = now or time.time()
+    conn.execute(
+        "UPDATE review_jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+        "last_error = 'Worker berhenti di tengah job', worker = NULL, stage = NULL, "
+        "finished_at = CASE WHEN attempts >= ? THEN ? END "
+        "WHERE status = 'running' AND heartbeat_at < ?",
+        (MAX_ATTEMPTS, MAX_ATTEMPTS, now, now - STALE_SECONDS),
+    )
+
+
+def claim(conn, worker):
+    """Ambil satu job yang jatuh tempo (paling lama antre dulu), None jika antrean kosong"""
+    now = time.time()
+    with contract_store.transaction(conn):
+        requeue_stale(conn, now)
+        row = conn.execute(
+            "SELECT * FROM review_jobs WHERE status = 'queued' AND next_attempt_at <= ? ORDER BY id LIMIT 1",
+            (now,),
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE review_jobs SET status = 'running', attempts = attempts + 1, worker = ?, heartbeat_at = ? "
+            "WHERE id = ?",
+            (worker, now, row["id"]),
+        )
+    return dict(row)
+
+
+def _set_stage(conn, job_id, stage):
+    with contract_store.transaction(conn):
+        conn.execute("UPDATE review_jobs SET stage = ?, heartbeat_at = ? WHERE id = ?", (stage, time.time(), job_id))
+
+
+def _heartbeat(job_id, worker, stop):
+    # Koneksi sendiri karena koneksi SQLite tidak dibagi antar thread
+    conn = contract_store.get_connection()
+    while not stop.wait(HEARTBEAT_SECONDS):
+        with contract_store.transaction(conn):
+            conn.execute(
+                "UPDATE review_jobs SET heartbeat_at = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time(), job_id, worker),
+            )
+
+
+def _acquire_upstream(conn, job_id):
+    """Tunggu sampai panggilan Streamline yang berjalan di semua worker < STREAMLINE_CONCURRENCY"""
+    while True:
+        now = time.time()
+        with contract_store.transaction(conn):
+            busy = conn.execute(
+                "SELECT COUNT(*) FROM review_jobs WHERE status = 'running' AND stage = 'review' AND heartbeat_at >= ?",
+                (now - STALE_SECONDS,),
+            ).fetchone()[0]
+            if busy < STREAMLINE_CONCURRENCY:
+                conn.execute(
+                    "UPDATE review_jobs SET stage = 'review', heartbeat_at = ? WHERE id = ?", (now, job_id)
+                )
+                return
+        metrics.incr("jobs.upstream_waits")
+        time.sleep(random.uniform(0.5, 1))
+
+
+def _finish(conn, job, result, timings=None):
+    """Tandai job selesai dan masukkan notifikasinya dalam satu transaksi"""
+    with contract_store.transaction(conn):
+        conn.execute(
+            "UPDATE review_jobs SET status = 'done', stage = NULL, finished_at = ?, result = ?, last_error = NULL, "
+            "timings = ? WHERE id = ?",
+            (time.time(), json.dumps(result), json.dumps(timings or {}), job["id"]),
+        )
+        review_msg = notifications.format_review_message(job["file_name"], result.get("review"))
+        notifications.enqueue_telegram(review_msg, conn=conn)
+        notifications.enqueue_email(f"📄 Hasil Review Kontrak - {job['file_name']}", review_msg, conn=conn)
+
+
+def _mark_failed(conn, job, error, retryable, retry_after=None, timings=None):
+    """Jadwalkan ulang dengan exponential backoff + jitter, atau tandai gagal permanen"""
+    now = time.time()
+    attempts = job["attempts"] + 1  # job berasal dari claim(), sebelum attempts dinaikkan
+    timings = json.dumps(timings or {})
+    if retryable and attempts < MAX_ATTEMPTS:
+        delay = retry_after or BACKOFF_BASE_SECONDS * 2 ** (attempts - 1)
+        with contract_store.transaction(conn):
+            conn.execute(
+                "UPDATE review_jobs SET status = 'queued', stage = NULL, worker = NULL, next_attempt_at = ?, "
+                "last_error = ?, timings = ? WHERE id = ?",
+                (now + delay * random.uniform(1, 1.25), str(error), timings, job["id"]),
+            )
+        metrics.incr("jobs.retried")
+        return
+    with contract_store.transaction(conn):
+        conn.execute(
+            "UPDATE review_jobs SET status = 'failed', stage = NULL, finished_at = ?, last_error = ?, timings = ? "
+            "WHERE id = ?",
+            (now, str(error), timings, job["id"]),
+        )
+        contract_row = conn.execute(
+            "SELECT contract_row FROM review_jobs WHERE id = ?", (job["id"],)
+        ).fetchone()[0]
+        # Kontrak sudah tersimpan tapi review gagal: kabari seperti hasil review error
+        if contract_row is not None:
+            review_msg = notifications.format_review_message(job["file_name"], {"status": "error", "message": str(error)})
+            notifications.enqueue_telegram(review_msg, conn=conn)
+            notifications.enqueue_email(f"📄 Hasil Review Kontrak - {job['file_name']}", review_msg, conn=conn)
+    metrics.incr("jobs.failed")
+
+
+# === Pipeline ===
+def streamline_review(file_path, file_name, use_api_key=False, debug=False):
+    """Kirim kontrak ke API Streamline; RetryableError untuk gangguan sementara (5xx, 429, gagal terhubung)"""
+    import requests
+
+    import http_client
+
+    headers = {"Accept": "application/json"}
+    if use_api_key:
+        headers["Authorization"] = f"Bearer {STREAMLINE_API_KEY}"
+    try:
+        with open(file_path, "rb") as f:
+            # Retry ditangani antrean job, bukan di level HTTP
+            response = http_client.post(STREAMLINE_URL, files={"file": (file_name, f)}, headers=headers,
+                                        endpoint="streamline", timeout=HTTP_TIMEOUT, retries=0,
+                                        priority=rate_limit.BULK)
+    except requests.ConnectionError as e:
+        if http_client.is_connect_error(e):
+            raise RetryableError(e)
+        # Koneksi putus setelah file terkirim: review mungkin sudah diproses server
+        return {"status": "error", "message": str(e)}
+    except requests.RequestException as e:
+        # Read timeout tidak diulang: review mungkin sudah diproses server
+        return {"status": "error", "message": str(e)}
+    if response.status_code == 429 or response.status_code >= 500:
+        raise RetryableError(f"Streamline HTTP {response.status_code}",
+                             rate_limit.parse_retry_after(response.headers.get("Retry-After")))
+    if response.status_code >= 400:
+        metrics.incr(f"jobs.streamline_http_{response.status_code}")
+    try:
+        result = response.json()
+    except ValueError:
+        result = {"status": "error", "message": response.text}
+    # Mode debug: status dan awal respons mentah ikut tersimpan di hasil job (tampil di halaman)
+    if debug and isinstance(result, dict):
+        result["debug"] = {"status_code": response.status_code, "raw_response": response.text[:300]}
+    return result
+
+
+def run_job(conn, job):
+    """Jalankan pipeline review untuk satu job; kembalikan hasil untuk kolom result"""
+    import clause_index
+    import upload_store
+    from pdf_extract import extract_fields_from_pdf
+
+    options = json.loads(job["options"] or "{}")
+    file_path = upload_store.blob_path(job["digest"])
+
+    _set_stage(conn, job["id"], "extract")
+    with metrics.timer("jobs.extract_fields"):
+        fields = extract_fields_from_pdf(file_path) or {}
+    if not fields.get("expiry"):
+        raise PermanentError("Tanggal expired tidak ditemukan di PDF")
+
+    # Kontrak disimpan sekali saja: contract_row menandai langkah ini sudah selesai di percobaan sebelumnya
+    with contract_store.transaction(conn):
+        saved = conn.execute("SELECT contract_row FROM review_jobs WHERE id = ?", (job["id"],)).fetchone()[0]
+        if saved is None:
+            duplicate = contract_store.find_by_blob(job["digest"], conn)
+            if duplicate:
+                raise PermanentError(f"File ini sama dengan kontrak {duplicate['ContractID']} "
+                                     f"({duplicate['FileName']}) yang sudah tersimpan")
+            row = {"ContractID": job["contract_id"], "FileName": job["file_name"],
+                   "ExpiryDate": fields["expiry"]["value"], "UploadedAt": datetime.now().isoformat(),
+                   "BlobDigest": job["digest"]}
+            saved = contract_store.insert_contract(conn, row)
+            conn.execute("UPDATE review_jobs SET contract_row = ?, stage = 'index' WHERE id = ?", (saved, job["id"]))
+    with metrics.timer("jobs.index_text"):
+        clause_index.index_blob(job["digest"], conn)
+
+    _acquire_upstream(conn, job["id"])
+    with metrics.timer("jobs.streamline_review"):
+        review = streamline_review(file_path, job["file_name"], options.get("use_api_key"), options.get("debug"))
+    return {"fields": fields, "review": review}
+
+
+def process(conn, job, worker):
+    """Jalankan satu job yang sudah diklaim, lengkap dengan heartbeat dan penanganan gagal"""
+    stop = threading.Event()
+    beat = threading.Thread(target=_heartbeat, args=(job["id"], worker, stop), daemon=True)
+    beat.start()
+    # Durasi tahap di proses worker disimpan di baris job (lihat stage_stats)
+    try:
+        with metrics.capture() as timings:
+            with metrics.timer("jobs.run"):
+                result = run_job(conn, job)
+        _finish(conn, job, result, timings)
+        metrics.incr("jobs.done")
+    except PermanentError as e:
+        _mark_failed(conn, job, e, retryable=False, timings=timings)
+    except RetryableError as e:
+        _mark_failed(conn, job, e, retryable=True, retry_after=e.retry_after, timings=timings)
+    except Exception as e:
+        # Error tak terduga (file hilang, database sibuk, ...) diulang sampai MAX_ATTEMPTS
+        logger.exception("Review job %s error", job["id"])
+        _mark_failed(conn, job, e, retryable=True, timings=timings)
+    finally:
+        stop.set()
+
+
+# === Worker ===
+def work_forever(parent_pid=None):
+    """Loop worker: ambil job, jalankan, ulangi. Berhenti sendiri jika proses induknya mati"""
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    conn = contract_store.get_connection()
+    while parent_pid is None or os.getppid() == parent_pid:
+        try:
+            job = claim(conn, worker)
+        except Exception:
+            logger.exception("Review worker error")
+            job = None
+        if job is None:
+            time.sleep(POLL_SECONDS)
+            continue
+        process(conn, job, worker)
+
+
+def start_pool(workers=WORKERS):
+    """Jalankan `workers` proses worker (spawn, supaya aman dari thread milik Streamlit)"""
+    ctx = multiprocessing.get_context("spawn")
+    pool = []
+    # Streamlit memasang skrip halaman sebagai __main__, dan spawn menjalankan ulang __main__ di
+    # proses anak (yang lalu memanggil boot() lagi). Selama start, __main__ diganti modul ini.
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = sys.modules[__name__]
+    try:
+        for i in range(workers):
+            p = ctx.Process(target=work_forever, args=(os.getpid(),), name=f"review-worker-{i}", daemon=True)
+            p.start()
+            pool.append(p)
+    finally:
+        sys.modules["__main__"] = main
+    return pool
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Worker antrean review kontrak")
+    parser.add_argument("--workers", type=int, default=max(WORKERS, 1), help="Jumlah proses worker")
+    args = parser.parse_args()
+
+    # Notifikasi yang dimasukkan worker dikirim dari proses ini
+    notifications.start_worker()
+    pool = start_pool(args.workers)
+    print(f"{len(pool)} worker review berjalan")
+    for p in pool:
+        p.join()
@@ -2,8 +2,12 @@ import streamlit as st
 import requests
 import os
 
+import http_client
+import rate_limit
+import research_cache
+
 # Fungsi untuk memanggil Langflow API yang disesuaikan dengan format 'Bearer' token
-def run_research_agent(api_url, bearer_token, research_topic):
+def call_langflow(api_url, bearer_token, research_topic):
     """
     Fungsi ini mengirimkan permintaan ke Langflow API untuk menjalankan agen riset.
     Menggunakan header otorisasi 'Bearer' token.
@@ -18,10 +22,23 @@ def run_research_agent(api_url, bearer_token, research_topic):
         "Authorization": f"Bearer {bearer_token}"  # Menggunakan format 'Bearer'
     }
 
+    # Flow Langflow bisa berjalan puluhan detik, jadi read timeout dibuat longgar
+    response = http_client.post(api_url, json=payload, headers=headers, endpoint="langflow", timeout=(5, 300),
+                                 priority=rate_limit.INTERACTIVE)
+    response.raise_for_status()  # Akan memunculkan kesalahan untuk status kode 4xx/5xx
+    return response.json()
+
+def run_research_agent(api_url, bearer_token, research_topic, refresh=False):
+    """
+    Hasil riset untuk topik yang sama diambil dari cache bersama (semua sesi),
+    dan permintaan identik yang bersamaan hanya memanggil Langflow sekali.
+    """
     try:
-        response = requests.post(api_url, json=payload, headers=headers)
-        response.raise_for_status()  # Akan memunculkan kesalahan untuk status kode 4xx/5xx
-        return response.json()
+        return research_cache.get_or_run(
+            api_url, research_topic,
+            lambda: call_langflow(api_url, bearer_token, research_topic),
+            refresh=refresh,
+        )
     except requests.exceptions.RequestException as e:
         st.error(f"Terjadi kesalahan saat menghubungi Langflow API: {e}")
         return None
@@ -44,6 +61,8 @@ with st.sidebar:
     application_token = st.text_input("Token Aplikasi Langflow (Bearer Token)", type="password", placeholder="Masukkan token Anda")
     openai_api_key = st.text_input("Kunci API OpenAI", type="password", placeholder="Masukkan Kunci API OpenAI Anda")
 
+    refresh_cache = st.checkbox("Abaikan hasil riset tersimpan", value=False)
+
     st.info("Masukkan Token Aplikasi dari Langflow dan Kunci API OpenAI Anda.")
 
 # Area utama untuk input dan output
@@ -70,7 +89,7 @@ if start_research:
         os.environ["OPENAI_API_KEY"] = openai_api_key
 
         with st.spinner("Agen sedang melakukan riset..."):
-            result = run_research_agent(langflow_api_url, application_token, research_topic)
+            result = run_research_agent(langflow_api_url, application_token, research_topic, refresh_cache)
 
             if result:
                 st.session_state.research_result = result
@@ -0,0 +1,29 @@
+import os
+import tomllib
+
+# Urutan pencarian: environment variable (Streamlit Cloud juga mengekspor secrets ke sini),
+# lalu file secrets lokal
+SECRETS_FILES = [os.path.join(".streamlit", "secrets.toml"), "secrets.toml"]
+
+_secrets = None
+
+
+def _load_secrets():
+    global _secrets
+    if _secrets is None:
+        _secrets = {}
+        for path in reversed(SECRETS_FILES):
+            try:
+                with open(path, "rb") as f:
+                    _secrets.update(tomllib.load(f))
+            except (OSError, tomllib.TOMLDecodeError):
+                continue
+    return _secrets
+
+
+def get_secret(name, default=None):
+    """Ambil konfigurasi tanpa bergantung pada st.secrets, supaya bisa dipakai di luar Streamlit"""
+    value = os.environ.get(name)
+    if value is not None:
+        return value
+    return _load_secrets().get(name, default)
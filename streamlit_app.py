@@ -1,6 +1,11 @@
 import streamlit as st
 from openai import OpenAI
 
+import chat_context
+import contract_retrieval
+import metrics
+import rate_limit
+
 # Show title and description.
 st.title("💬 Chatbot")
 st.write(
@@ -24,6 +29,10 @@ else:
     # messages persist across reruns.
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    # Older turns are folded into a rolling summary so each request stays within a
+    # fixed token budget, however long the conversation gets.
+    if "chat_context" not in st.session_state:
+        st.session_state.chat_context = chat_context.new_state()
 
     # Display the existing chat messages via `st.chat_message`.
     for message in st.session_state.messages:
@@ -40,17 +49,29 @@ else:
             st.markdown(prompt)
 
         # Generate a response using the OpenAI API.
-        stream = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": m["role"], "content": m["content"]}
-                for m in st.session_state.messages
-            ],
-            stream=True,
+        messages = chat_context.build_context(
+            st.session_state.messages,
+            st.session_state.chat_context,
+            chat_context.openai_summarizer(client, "gpt-3.5-turbo"),
         )
+        # Add only the stored-contract excerpts most relevant to this question, within a
+        # fixed token budget, instead of whole contracts.
+        sources = contract_retrieval.retrieve(prompt)
+        if sources:
+            messages.insert(0, contract_retrieval.context_message(sources))
+        # Chat has the highest priority in the shared OpenAI limiter; the slot is held
+        # until the streamed reply has finished.
+        with metrics.timer("chat.openai_stream"), rate_limit.slot("openai", rate_limit.INTERACTIVE):
+            stream = client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=messages,
+                stream=True,
+            )
 
-        # Stream the response to the chat using `st.write_stream`, then store it in 
-        # session state.
-        with st.chat_message("assistant"):
-            response = st.write_stream(stream)
+            # Stream the response to the chat using `st.write_stream`, then store it in
+            # session state.
+            with st.chat_message("assistant"):
+                response = st.write_stream(stream)
+                if sources:
+                    st.caption(contract_retrieval.sources_caption(sources))
         st.session_state.messages.append({"role": "assistant", "content": response})
@@ -0,0 +1,134 @@
+"""Fixture bersama: database kontrak sementara dan server tiruan lokal (SMTP, HTTP).
+
+Server tiruan di sini sengaja kecil dan deterministik: setiap respons diatur oleh test,
+dan semua yang diterima dicatat supaya bisa diperiksa (lihat benchmarks/fakes.py untuk
+versi acak yang dipakai uji beban).
+"""
+import json
+import os
+import socketserver
+import sys
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import contract_store  # noqa: E402
+import rate_limit  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Koneksi ke contracts.db baru di folder sementara"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(contract_store, "DB_FILE", str(tmp_path / "contracts.db"))
+    return contract_store.get_connection()
+
+
+@pytest.fixture
+def limiters(monkeypatch):
+    """Rate limiter baru per test, supaya jeda dari 429 tidak terbawa ke test lain"""
+    monkeypatch.setattr(rate_limit, "_limiters", {})
+
+
+def _serve(server):
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    return server
+
+
+# === SMTP ===
+class SMTPStub:
+    """Server SMTP tanpa TLS/AUTH-check yang mencatat koneksi dan pesan"""
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = []  # (penerima, isi)
+        self.data_replies = deque()  # balasan DATA berikutnya; kosong = "250 OK"
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(f"{line}\r\n".encode())
+
+            def handle(self):
+                stub.connections += 1
+                self.reply("220 stub ESMTP")
+                recipients = []
+                while line := self.rfile.readline().decode().rstrip("\r\n"):
+                    command = line.split(" ", 1)[0].upper()
+                    if command in ("EHLO", "HELO"):
+                        self.wfile.write(b"250-stub\r\n250 AUTH PLAIN LOGIN\r\n")
+                    elif command == "AUTH":
+                        self.reply("235 Authentication successful")
+                    elif command == "RCPT":
+                        recipients.append(line.split(":", 1)[1].strip(" <>"))
+                        self.reply("250 OK")
+                    elif command == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        lines = []
+                        while (data := self.rfile.readline().decode().rstrip("\r\n")) != ".":
+                            lines.append(data)
+                        reply = stub.data_replies.popleft() if stub.data_replies else "250 OK"
+                        if reply.startswith("250"):
+                            stub.messages += [(r, "\n".join(lines)) for r in recipients]
+                        recipients = []
+                        self.reply(reply)
+                    elif command == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply("250 OK")
+
+        class Server(socketserver.ThreadingTCPServer):
+            daemon_threads = True
+            allow_reuse_address = True
+
+        self.server = _serve(Server(("127.0.0.1", 0), Handler))
+        self.port = self.server.server_address[1]
+
+
+@pytest.fixture
+def smtp_stub():
+    stub = SMTPStub()
+    yield stub
+    stub.server.shutdown()
+
+
+# === HTTP ===
+class HTTPStub:
+    """Server HTTP yang mencatat body JSON setiap POST dan membalas dari antrean `replies`"""
+
+    def __init__(self):
+        self.requests = []  # (path, body JSON)
+        self.replies = deque()  # (status, payload[, headers]); kosong = 200 {"ok": true}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                stub.requests.append((self.path, json.loads(body or b"{}")))
+                status, payload, *headers = stub.replies.popleft() if stub.replies else (200, {"ok": True})
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers[0] if headers else {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = _serve(ThreadingHTTPServer(("127.0.0.1", 0), Handler))
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+
+@pytest.fixture
+def http_stub():
+    stub = HTTPStub()
+    yield stub
+    stub.server.shutdown()
@@ -0,0 +1,74 @@
+import chat_context
+
+
+class Summarizer:
+    """Callback `summarize` yang mencatat setiap panggilan"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, summary, messages):
+        self.calls.append([m["content"] for m in messages])
+        return f"{summary}+{len(messages)}"
+
+
+def _message(i, chars=400):
+    return {"role": "user" if i % 2 == 0 else "assistant", "content": f"{i:03d}" + "x" * (chars - 3)}
+
+
+def test_short_history_is_sent_verbatim():
+    messages = [_message(i) for i in range(3)]
+    state = chat_context.new_state()
+    summarize = Summarizer()
+
+    context = chat_context.build_context(messages, state, summarize)
+
+    assert [m["content"] for m in context] == [m["content"] for m in messages]
+    assert summarize.calls == []
+
+
+def test_overflow_rolls_old_turns_into_summary_once():
+    state = chat_context.new_state()
+    summarize = Summarizer()
+    messages = []
+    for i in range(40):
+        messages.append(_message(i))
+        context = chat_context.build_context(messages, state, summarize)
+        sent = sum(chat_context.message_tokens(m) for m in context)
+        assert sent <= chat_context.CONTEXT_TOKENS
+
+    # Setiap pesan diringkas tepat sekali, berurutan, dan jendela tetap berisi pesan terbaru
+    folded = [content for call in summarize.calls for content in call]
+    assert folded == [m["content"] for m in messages[:state["start"]]]
+    assert len(summarize.calls) < len(folded)
+    assert context[0]["content"].startswith("Summary of the earlier conversation:")
+    assert context[-1]["content"] == messages[-1]["content"]
+
+
+def test_oversized_message_is_truncated_without_summarizing():
+    messages = [{"role": "user", "content": "x" * 40000}]
+    state = chat_context.new_state()
+    summarize = Summarizer()
+
+    context = chat_context.build_context(messages, state, summarize)
+
+    assert summarize.calls == []
+    assert state == chat_context.new_state()
+    assert len(context) == 1
+    window_budget = chat_context.CONTEXT_TOKENS - chat_context.SUMMARY_TOKENS
+    assert chat_context.message_tokens(context[0]) <= window_budget
+    # Riwayat aslinya tidak ikut terpotong
+    assert len(messages[0]["content"]) == 40000
+
+
+def test_oversized_message_after_history_folds_only_older_turns():
+    messages = [_message(i) for i in range(4)] + [{"role": "user", "content": "y" * 40000}]
+    state = chat_context.new_state()
+    summarize = Summarizer()
+
+    context = chat_context.build_context(messages, state, summarize)
+
+    assert summarize.calls == [[m["content"] for m in messages[:4]]]
+    assert state["start"] == 4
+    assert [m["role"] for m in context] == ["system", "user"]
+    assert context[-1]["content"].startswith("yyy")
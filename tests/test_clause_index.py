@@ -0,0 +1,23 @@
+import time
+
+import clause_index
+import contract_store
+
+
+def _add_blob(conn, digest):
+    conn.execute("INSERT INTO blobs (digest, size, created_at) VALUES (?, 1, ?)", (digest, time.time()))
+
+
+def test_prune_drops_documents_without_contract(db):
+    for digest in ("dipakai", "yatim"):
+        _add_blob(db, digest)
+        clause_index.index_document(digest, ["force majeure berlaku"], db)
+    contract_store.add_contract({"ContractID": "K-1", "FileName": "k1.pdf", "ExpiryDate": "2027-01-01",
+                                 "UploadedAt": "2026-01-01 00:00:00", "BlobDigest": "dipakai"}, conn=db)
+
+    assert clause_index.prune(db) == 1
+
+    assert [r[0] for r in db.execute("SELECT digest FROM fts_docs")] == ["dipakai"]
+    results, matched = clause_index.search("majeure", conn=db)
+    assert matched == 1
+    assert [r["ContractID"] for r in results] == ["K-1"]
@@ -0,0 +1,20 @@
+from datetime import date, timedelta
+
+import contract_store
+
+
+def test_expiring_contracts_skips_long_expired_history(db):
+    today = date(2026, 1, 1)
+    offsets = {"lama": -400, "baru-expired": -10, "segera": 20, "nanti": 200}
+    contract_store.add_contracts(
+        [{"ContractID": cid, "FileName": f"{cid}.pdf", "ExpiryDate": str(today + timedelta(days=days)),
+          "UploadedAt": "2025-01-01 00:00:00"} for cid, days in offsets.items()],
+        conn=db,
+    )
+
+    df = contract_store.expiring_contracts(90, today, overdue_days=365, conn=db)
+
+    assert list(df["ContractID"]) == ["baru-expired", "segera"]
+    assert list(df["DaysLeft"]) == [-10, 20]
+    # Kalender tetap menghitung semua kontrak yang sudah expired
+    assert contract_store.expiry_calendar(90, today, conn=db)["Sudah expired"] == 2
@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+
+import pytest
+
+import contract_store
+import expiry_alerts
+import notifications
+
+TODAY = date(2026, 1, 1)
+
+
+@pytest.fixture
+def contracts(db):
+    contract_store.add_contract(
+        {"ContractID": "K-1", "FileName": "k1.pdf", "ExpiryDate": str(TODAY + timedelta(days=5)),
+         "UploadedAt": "2025-01-01 00:00:00"},
+        conn=db,
+    )
+    return db
+
+
+def _state(conn):
+    sent = conn.execute("SELECT COUNT(*) FROM sent_alerts").fetchone()[0]
+    queued = conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+    return sent, queued, contract_store.get_meta(conn, "alerts_last_id")
+
+
+def test_tick_without_credentials_records_nothing(contracts, monkeypatch):
+    monkeypatch.setattr(expiry_alerts, "ALERT_EMAILS", ["legal@example.com"])
+    monkeypatch.setattr(expiry_alerts, "ALERT_TELEGRAM_CHATS", [])
+    monkeypatch.setattr(notifications, "SMTP_USER", None)
+
+    assert expiry_alerts.run_tick(TODAY, conn=contracts) == 0
+    assert _state(contracts) == (0, 0, None)
+
+
+def test_tick_queues_digest_and_records_alert(contracts, monkeypatch):
+    monkeypatch.setattr(expiry_alerts, "ALERT_EMAILS", [])
+    monkeypatch.setattr(expiry_alerts, "ALERT_TELEGRAM_CHATS", ["1000"])
+    monkeypatch.setattr(notifications, "TELEGRAM_BOT_TOKEN", "123:test")
+
+    assert expiry_alerts.run_tick(TODAY, conn=contracts) == 1
+    # Satu baris per ambang (7/30/90) dan satu digest di outbox
+    assert _state(contracts) == (3, 1, "1")
+    # Tick berikutnya tidak mengirim ulang
+    assert expiry_alerts.run_tick(TODAY, conn=contracts) == 0
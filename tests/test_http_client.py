@@ -0,0 +1,85 @@
+import contextlib
+import socket
+import threading
+from collections import defaultdict, deque
+
+import pytest
+import requests
+
+import http_client
+import metrics
+import rate_limit
+
+
+@pytest.fixture
+def fresh_metrics(monkeypatch):
+    """Metrics kosong per test, supaya hitungan tidak terbawa dari test lain"""
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    monkeypatch.setattr(metrics, "_samples", defaultdict(lambda: deque(maxlen=metrics.SAMPLES_PER_STAGE)))
+    monkeypatch.setattr(metrics, "_totals", defaultdict(lambda: [0, 0.0, 0]))
+
+
+def test_calls_are_recorded_per_endpoint(limiters, fresh_metrics, http_stub):
+    http_stub.replies.append((500, {"ok": False}))
+
+    http_client.post(http_stub.url, json={}, endpoint="stub", retries=0)
+    http_client.post(http_stub.url, json={}, endpoint="stub", retries=0)
+
+    stage = metrics.snapshot()["stages"]["http.stub"]
+    assert (stage["count"], stage["errors"]) == (2, 1)
+    assert 'stage="http.stub",endpoint="stub"' in metrics.to_prometheus()
+
+
+def _closed_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def dropping_server():
+    """Server yang membaca request lalu menutup koneksi tanpa membalas"""
+    received = []
+    server = socket.create_server(("127.0.0.1", 0))
+
+    def serve():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            with conn:
+                received.append(conn.recv(65536))
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield f"http://127.0.0.1:{server.getsockname()[1]}", received
+    server.close()
+
+
+def test_post_is_retried_when_connection_is_refused(limiters, monkeypatch):
+    monkeypatch.setattr(http_client, "BACKOFF_MAX_SECONDS", 0)
+    attempts = []
+    monkeypatch.setattr(rate_limit, "slot", lambda *a, **k: attempts.append(1) or contextlib.nullcontext())
+
+    with pytest.raises(requests.ConnectionError):
+        http_client.post(f"http://127.0.0.1:{_closed_port()}", json={}, endpoint="stub", retries=2)
+    assert len(attempts) == 3
+
+
+def test_post_is_not_retried_after_it_was_sent(limiters, dropping_server):
+    url, received = dropping_server
+
+    with pytest.raises(requests.ConnectionError):
+        http_client.post(url, json={}, endpoint="stub", retries=2)
+    assert len(received) == 1
+
+
+def test_post_5xx_is_retried_only_when_idempotent(limiters, http_stub, monkeypatch):
+    monkeypatch.setattr(http_client, "BACKOFF_MAX_SECONDS", 0)
+    http_stub.replies.extend([(500, {"ok": False})] * 2)
+
+    assert http_client.post(http_stub.url, json={}, endpoint="stub", retries=2).status_code == 500
+    assert len(http_stub.requests) == 1
+
+    assert http_client.post(http_stub.url, json={}, endpoint="stub", retries=2, idempotent=True).status_code == 200
+    assert len(http_stub.requests) == 3
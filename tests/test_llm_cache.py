@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+import llm_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    """Cache LLM baru di folder sementara (koneksi per thread ikut dibuat ulang)"""
+    monkeypatch.setattr(llm_cache, "DB_FILE", str(tmp_path / "llm.db"))
+    monkeypatch.setattr(llm_cache, "_local", threading.local())
+    monkeypatch.setattr(llm_cache, "DISABLED", False)
+
+
+def _total(conn):
+    return conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+
+def test_bypass_skips_lookup_but_stores_result(cache):
+    llm_cache.put("k", "lama")
+
+    assert llm_cache.cached("k", lambda: "baru", bypass=True) == "baru"
+    assert llm_cache.cached("k", lambda: pytest.fail("seharusnya dari cache")) == "baru"
+
+
+def test_running_total_tracks_overwrites(cache):
+    llm_cache.put("a", "x" * 100)
+    llm_cache.put("b", "y" * 50)
+    llm_cache.put("a", "z" * 10)
+
+    conn = llm_cache._connection()
+    counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+    assert counters["bytes"] == _total(conn)
+
+
+def test_least_recently_used_entries_are_evicted(cache, monkeypatch):
+    monkeypatch.setattr(llm_cache, "MAX_BYTES", 350)
+    for key in "abc":
+        llm_cache.put(key, key * 100)
+    llm_cache.get("a")
+    llm_cache.put("d", "d" * 100)
+
+    conn = llm_cache._connection()
+    keys = {k for (k,) in conn.execute("SELECT key FROM responses")}
+    assert keys == {"a", "c", "d"}
+    assert dict(conn.execute("SELECT name, value FROM counters").fetchall())["bytes"] == _total(conn) <= 350
+
+
+def test_on_compute_runs_only_when_analysis_is_not_cached(cache, monkeypatch):
+    import contract_analysis
+
+    monkeypatch.setattr(contract_analysis, "analyze_contract", lambda text, client, **kwargs: f"analisis {text}")
+    computed = []
+
+    for _ in range(2):
+        result = contract_analysis.analyze_contract_cached("kontrak", None, on_compute=lambda: computed.append(1))
+        assert result == "analisis kontrak"
+    assert computed == [1]
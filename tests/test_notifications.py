@@ -0,0 +1,174 @@
+import time
+
+import pytest
+
+import notifications
+import rate_limit
+
+
+@pytest.fixture
+def outbox(db, limiters, smtp_stub, http_stub, monkeypatch):
+    """Outbox di database sementara, diarahkan ke SMTP dan Telegram tiruan"""
+    monkeypatch.setattr(notifications, "SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setattr(notifications, "SMTP_PORT", smtp_stub.port)
+    monkeypatch.setattr(notifications, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(notifications, "SMTP_USER", "bot@example.com")
+    monkeypatch.setattr(notifications, "SMTP_PASS", "secret")
+    monkeypatch.setattr(notifications, "EMAIL_TO", "legal@example.com")
+    monkeypatch.setattr(notifications, "TELEGRAM_API_URL", http_stub.url)
+    monkeypatch.setattr(notifications, "TELEGRAM_BOT_TOKEN", "123:test")
+    monkeypatch.setattr(notifications, "TELEGRAM_CHAT_ID", "1000")
+    return db
+
+
+def _rows(conn):
+    return [dict(r) for r in conn.execute("SELECT * FROM outbox ORDER BY id")]
+
+
+def _sent_texts(http_stub):
+    return [body["text"] for _, body in http_stub.requests]
+
+
+def test_messages_within_window_are_coalesced(outbox, http_stub):
+    for i in range(3):
+        notifications.enqueue_telegram(f"pesan {i}")
+
+    # Pesan tertua belum melewati jendela penggabungan
+    assert notifications.drain_once(now=time.time()) == 0
+    assert http_stub.requests == []
+
+    assert notifications.drain_once(now=time.time() + notifications.COALESCE_SECONDS + 1) == 3
+    assert _sent_texts(http_stub) == ["pesan 0\n\npesan 1\n\npesan 2"]
+    assert {r["status"] for r in _rows(outbox)} == {"sent"}
+
+
+def test_email_batch_uses_one_smtp_connection(outbox, smtp_stub):
+    for i in range(3):
+        notifications.enqueue_email(f"Subjek {i}", f"Isi {i}", to_email=f"user{i}@example.com")
+
+    assert notifications.flush() == 3
+    assert smtp_stub.connections == 1
+    assert sorted(r for r, _ in smtp_stub.messages) == [f"user{i}@example.com" for i in range(3)]
+    assert {r["status"] for r in _rows(outbox)} == {"sent"}
+
+
+def test_failed_delivery_backs_off_exponentially(outbox, http_stub):
+    notifications.enqueue_telegram("pesan")
+    base = notifications.BACKOFF_BASE_SECONDS
+
+    http_stub.replies.append((500, {"ok": False}))
+    before = time.time()
+    notifications.flush()
+    row = _rows(outbox)[0]
+    assert (row["status"], row["attempts"]) == ("queued", 1)
+    assert before + base <= row["next_attempt_at"] <= time.time() + base * 1.25
+
+    http_stub.replies.append((500, {"ok": False}))
+    before = time.time()
+    notifications.drain_once(now=row["next_attempt_at"], coalesce_seconds=0)
+    row = _rows(outbox)[0]
+    assert (row["status"], row["attempts"]) == ("queued", 2)
+    assert before + base * 2 <= row["next_attempt_at"] <= time.time() + base * 2 * 1.25
+
+
+def test_message_fails_after_max_attempts(outbox, http_stub):
+    notifications.enqueue_telegram("pesan")
+    http_stub.replies.extend([(500, {"ok": False})] * notifications.MAX_ATTEMPTS)
+
+    for _ in range(notifications.MAX_ATTEMPTS):
+        notifications.drain_once(now=time.time() + 10 ** 6, coalesce_seconds=0)
+
+    row = _rows(outbox)[0]
+    assert (row["status"], row["attempts"]) == ("failed", notifications.MAX_ATTEMPTS)
+    assert len(http_stub.requests) == notifications.MAX_ATTEMPTS
+    # Pesan yang gagal permanen tidak diambil lagi
+    assert notifications.drain_once(now=time.time() + 10 ** 7, coalesce_seconds=0) == 0
+
+
+def test_telegram_retry_after_from_body(outbox, http_stub):
+    notifications.enqueue_telegram("pesan")
+    http_stub.replies.append((429, {"ok": False, "error_code": 429, "parameters": {"retry_after": 7}}))
+
+    before = time.time()
+    notifications.flush()
+
+    row = _rows(outbox)[0]
+    assert row["status"] == "queued"
+    assert before + 7 <= row["next_attempt_at"] <= time.time() + 7 * 1.25
+    # Jeda dari body juga menahan pengiriman Telegram lain di proses ini
+    assert rate_limit.get("telegram").stats()["paused_for"] > 6
+
+
+def test_retry_resends_only_undelivered_chunks(outbox, http_stub):
+    first, second = "a" * 3000, "b" * 3000
+    notifications.enqueue_telegram(first)
+    notifications.enqueue_telegram(second)
+    http_stub.replies.extend([(200, {"ok": True}), (500, {"ok": False})])
+
+    notifications.flush()
+    assert [r["status"] for r in _rows(outbox)] == ["sent", "queued"]
+
+    notifications.drain_once(now=time.time() + 10 ** 6, coalesce_seconds=0)
+    assert _sent_texts(http_stub) == [first, second, second]
+    assert [r["status"] for r in _rows(outbox)] == ["sent", "sent"]
+
+
+def test_long_message_is_queued_in_chunks(outbox, http_stub):
+    notifications.enqueue_telegram("x" * (notifications.TELEGRAM_MAX_CHARS + 10))
+
+    assert [len(r["body"]) for r in _rows(outbox)] == [notifications.TELEGRAM_MAX_CHARS, 10]
+    notifications.flush()
+    assert [len(text) for text in _sent_texts(http_stub)] == [notifications.TELEGRAM_MAX_CHARS, 10]
+
+
+def test_requeue_stale_returns_abandoned_claims(outbox):
+    notifications.enqueue_telegram("lama")
+    notifications.enqueue_telegram("baru")
+    now = time.time()
+    outbox.execute("UPDATE outbox SET status = 'sending', claimed_at = ? WHERE body = 'lama'",
+                   (now - notifications.STALE_CLAIM_SECONDS - 1,))
+    outbox.execute("UPDATE outbox SET status = 'sending', claimed_at = ? WHERE body = 'baru'", (now,))
+
+    notifications.requeue_stale(now)
+
+    rows = {r["body"]: r for r in _rows(outbox)}
+    assert (rows["lama"]["status"], rows["lama"]["claimed_at"]) == ("queued", None)
+    assert rows["baru"]["status"] == "sending"
+
+
+def test_refused_email_fails_alone_and_permanently(outbox, smtp_stub):
+    for i in range(3):
+        notifications.enqueue_email(f"Subjek {i}", f"Isi {i}", to_email=f"user{i}@example.com")
+    smtp_stub.data_replies.extend(["250 OK", "550 Mailbox unavailable", "250 OK"])
+
+    notifications.flush()
+
+    rows = _rows(outbox)
+    assert [(r["status"], r["attempts"]) for r in rows] == [("sent", 0), ("failed", 1), ("sent", 0)]
+    assert "550" in rows[1]["last_error"]
+    assert smtp_stub.connections == 1
+
+
+def test_temporary_email_error_is_retried(outbox, smtp_stub):
+    notifications.enqueue_email("Subjek", "Isi", to_email="a@example.com")
+    notifications.enqueue_email("Subjek", "Isi", to_email="b@example.com")
+    smtp_stub.data_replies.append("451 Try again later")
+
+    notifications.flush()
+
+    rows = {r["recipient"]: (r["status"], r["attempts"]) for r in _rows(outbox)}
+    assert rows == {"a@example.com": ("queued", 1), "b@example.com": ("sent", 0)}
+
+
+def test_email_marked_sent_failure_is_not_resent(outbox, smtp_stub, monkeypatch):
+    notifications.enqueue_email("Subjek", "Isi", to_email="user@example.com")
+
+    def broken_mark_sent(conn, rows):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(notifications, "_mark_sent", broken_mark_sent)
+    notifications.flush()
+
+    assert len(smtp_stub.messages) == 1
+    # Tidak dijadwalkan ulang sebagai gagal
+    assert [(r["status"], r["attempts"]) for r in _rows(outbox)] == [("sending", 0)]
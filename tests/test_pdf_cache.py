@@ -0,0 +1,18 @@
+import pytest
+
+import pdf_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_cache, "CACHE_DIR", str(tmp_path / "pdf"))
+    monkeypatch.setattr(pdf_cache, "cache_version", lambda: "test")
+    monkeypatch.setattr(pdf_cache, "_approx_bytes", None)
+
+
+def test_overwritten_entry_is_counted_once(cache_dir):
+    entry = {"version": "test", "page_count": 1, "pages": {"0": "x" * 1000}, "fields": {}}
+    for _ in range(5):
+        pdf_cache.put("abc", entry)
+
+    assert pdf_cache._approx_bytes == pdf_cache.stats()["bytes"]
@@ -0,0 +1,151 @@
+import threading
+import time
+
+import pytest
+
+import http_client
+import rate_limit
+
+
+def _wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "kondisi tidak tercapai"
+        time.sleep(0.005)
+
+
+def test_waiting_callers_run_in_priority_order():
+    limiter = rate_limit.Limiter("test", rate=1000, burst=1000, concurrency=1)
+    limiter.acquire(rate_limit.INTERACTIVE)
+    order = []
+
+    def call(priority):
+        limiter.acquire(priority)
+        order.append(priority)
+        limiter.release()
+
+    # Datang dari prioritas terendah supaya urutan datang tidak menentukan hasil
+    threads = []
+    for priority in (rate_limit.BACKGROUND, rate_limit.BULK, rate_limit.INTERACTIVE):
+        threads.append(threading.Thread(target=call, args=(priority,)))
+        threads[-1].start()
+        _wait_for(lambda n=len(threads): limiter.stats()["waiting"] == n)
+    limiter.release()
+    for t in threads:
+        t.join()
+
+    assert order == [rate_limit.INTERACTIVE, rate_limit.BULK, rate_limit.BACKGROUND]
+
+
+def test_same_priority_is_first_come_first_served():
+    limiter = rate_limit.Limiter("test", rate=1000, burst=1000, concurrency=1)
+    limiter.acquire()
+    order = []
+
+    def call(n):
+        limiter.acquire(rate_limit.BULK)
+        order.append(n)
+        limiter.release()
+
+    threads = []
+    for n in range(3):
+        threads.append(threading.Thread(target=call, args=(n,)))
+        threads[-1].start()
+        _wait_for(lambda k=n + 1: limiter.stats()["waiting"] == k)
+    limiter.release()
+    for t in threads:
+        t.join()
+
+    assert order == [0, 1, 2]
+
+
+def test_burst_then_refill_at_rate():
+    limiter = rate_limit.Limiter("test", rate=20, burst=3, concurrency=10)
+
+    waits = [limiter.acquire() for _ in range(3)]
+    assert max(waits) < 0.01
+    # Token habis: permintaan keempat menunggu satu token terisi (1/20 detik)
+    assert 0.03 < limiter.acquire() < 0.2
+
+    for _ in range(4):
+        limiter.release()
+    time.sleep(0.5)
+    # Pengisian ulang tidak melebihi burst
+    assert limiter.stats()["tokens"] == 3
+
+
+def test_concurrency_cap():
+    limiter = rate_limit.Limiter("test", rate=1000, burst=1000, concurrency=2)
+    lock = threading.Lock()
+    active = [0, 0]  # sekarang, maksimum
+
+    def call():
+        limiter.acquire()
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        limiter.release()
+
+    threads = [threading.Thread(target=call) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert active[1] == 2
+
+
+def test_retry_after_from_429_pauses_every_caller(limiters, http_stub):
+    rate_limit.configure("stub", 1000, 1000, 10)
+    http_stub.replies.append((429, {"error": "slow down"}, {"Retry-After": "1"}))
+
+    response = http_client.post(http_stub.url, json={}, endpoint="stub", retries=0)
+    assert response.status_code == 429
+    assert rate_limit.get("stub").stats()["paused_for"] > 0.5
+
+    # Pemanggil lain (prioritas apa pun) ikut menunggu sampai jeda habis
+    start = time.monotonic()
+    response = http_client.post(http_stub.url, json={}, endpoint="stub", retries=0,
+                                priority=rate_limit.INTERACTIVE)
+    assert response.status_code == 200
+    assert time.monotonic() - start > 0.5
+
+
+def test_slot_pauses_on_sdk_429(limiters):
+    class Response:
+        status_code = 429
+        headers = {"Retry-After": "2"}
+
+    class RateLimitError(Exception):
+        response = Response()
+
+    rate_limit.configure("sdk", 1000, 1000, 10)
+    with pytest.raises(RateLimitError):
+        with rate_limit.slot("sdk"):
+            raise RateLimitError()
+
+    stats = rate_limit.get("sdk").stats()
+    assert stats["paused_for"] > 1.5
+    assert stats["active"] == 0
+
+
+def test_wait_longer_than_timeout_raises():
+    limiter = rate_limit.Limiter("test", rate=1000, burst=1000, concurrency=1)
+    limiter.acquire()
+
+    start = time.monotonic()
+    with pytest.raises(rate_limit.RateLimitTimeout):
+        limiter.acquire(timeout=0.1)
+    assert 0.1 <= time.monotonic() - start < 0.5
+    # Pemanggil yang menyerah tidak tertinggal di antrean
+    assert limiter.stats()["waiting"] == 0
+
+
+def test_parse_retry_after():
+    assert rate_limit.parse_retry_after("3") == 3.0
+    assert rate_limit.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert rate_limit.parse_retry_after("soon") is None
+    assert rate_limit.parse_retry_after(None) is None
@@ -0,0 +1,50 @@
+import re
+
+# Estimasi kasar yang sama dengan yang dipakai sebelumnya: ~4 karakter per token
+CHARS_PER_TOKEN = 4
+
+# Batas potong yang aman: paragraf kosong/halaman baru, atau awal pasal/bab/klausul
+BOUNDARY_PATTERN = re.compile(
+    r"\n\s*\n|\f|\n(?=\s*(?:Pasal|PASAL|Bab|BAB|Klausul|KLAUSUL|Article|ARTICLE|Section|SECTION)\s+\w+)"
+)
+
+
+def estimate_tokens(text):
+    """Perkiraan jumlah token tanpa tokenizer eksternal"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _hard_split(text, max_chars):
+    # Potongan yang tetap terlalu besar dipotong di baris atau kalimat terakhir yang muat
+    parts = []
+    while len(text) > max_chars:
+        cut = max(text.rfind("\n", 0, max_chars), text.rfind(". ", 0, max_chars) + 1)
+        if cut <= 0:
+            cut = max_chars
+        parts.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text:
+        parts.append(text)
+    return parts
+
+
+def split_text(text, max_tokens):
+    """Bagi teks menjadi potongan <= max_tokens, memotong di batas paragraf/halaman/pasal"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = []
+    current_len = 0
+    for piece in BOUNDARY_PATTERN.split(text):
+        piece = piece.strip()
+        if not piece:
+            continue
+        for part in _hard_split(piece, max_chars):
+            if current and current_len + len(part) + 2 > max_chars:
+                chunks.append("\n\n".join(current))
+                current = []
+                current_len = 0
+            current.append(part)
+            current_len += len(part) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
@@ -0,0 +1,155 @@
+"""Penyimpanan file kontrak berdasarkan isi (content-addressed).
+
+Setiap PDF disimpan sekali di uploads/blobs/<2 huruf awal hash>/<sha256>.pdf. Kolom
+contracts.BlobDigest memetakan nama file/kontrak ke blob, dan trigger di database
+menjaga blobs.refcount. gc() menghapus blob yang tidak dipakai kontrak mana pun.
+
+Contoh:
+    python upload_store.py gc
+    python upload_store.py adopt-legacy
+"""
+import hashlib
+import os
+import threading
+import time
+
+import contract_store
+import metrics
+
+# === Konfigurasi ===
+UPLOAD_DIR = "uploads"
+BLOB_DIR = os.path.join(UPLOAD_DIR, "blobs")
+CHUNK_SIZE = 1024 * 1024
+# Blob tanpa referensi yang lebih muda dari ini tidak dihapus: kontraknya mungkin sedang disimpan
+GC_GRACE_SECONDS = 3600
+
+
+def blob_path(digest):
+    return os.path.join(BLOB_DIR, digest[:2], f"{digest}.pdf")
+
+
+def _register(digest, size, conn):
+    # created_at diperbarui setiap kali blob diunggah ulang supaya gc() tidak menghapusnya
+    conn.execute(
+        "INSERT INTO blobs (digest, size, refcount, created_at) VALUES (?, ?, 0, ?) "
+        "ON CONFLICT(digest) DO UPDATE SET created_at = excluded.created_at",
+        (digest, size, time.time()),
+    )
+
+
+@metrics.timed("upload.store_blob")
+def store(source, conn=None):
+    """Tulis PDF per chunk sambil di-hash; kembalikan (digest, size, baru).
+
+    `source` berupa path atau file-like object (misalnya UploadedFile Streamlit).
+    Jika isi yang sama sudah tersimpan, file sementara dibuang dan blob lama dipakai.
+    """
+    conn = conn or contract_store.get_connection()
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    tmp_path = os.path.join(BLOB_DIR, f".{os.getpid()}.{threading.get_ident()}.tmp")
+    h = hashlib.sha256()
+    size = 0
+    src = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+    try:
+        if src.seekable():
+            src.seek(0)
+        with open(tmp_path, "wb") as out:
+            while chunk := src.read(CHUNK_SIZE):
+                h.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    finally:
+        if src is not source:
+            src.close()
+    digest = h.hexdigest()
+    path = blob_path(digest)
+    # Registrasi dan pemindahan file berada di bawah kunci tulis yang sama dengan gc()
+    with contract_store.transaction(conn):
+        _register(digest, size, conn)
+        is_new = not os.path.exists(path)
+        if is_new:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+    if not is_new:
+        os.remove(tmp_path)
+    metrics.incr("upload.blobs_new" if is_new else "upload.blobs_reused")
+    return digest, size, is_new
+
+
+def gc(grace_seconds=GC_GRACE_SECONDS, conn=None):
+    """Hapus blob dengan refcount 0 yang lebih tua dari grace_seconds; kembalikan (jumlah, byte)"""
+    conn = conn or contract_store.get_connection()
+    cutoff = time.time() - grace_seconds
+    removed = freed = 0
+    with contract_store.transaction(conn):
+        victims = conn.execute(
+            "SELECT digest, size FROM blobs WHERE refcount <= 0 AND created_at < ? "
+            # File milik job review yang belum selesai belum punya kontrak, tapi masih dibutuhkan
+            "AND digest NOT IN (SELECT digest FROM review_jobs WHERE status IN ('queued', 'running'))",
+            (cutoff,),
+        ).fetchall()
+        conn.executemany("DELETE FROM blobs WHERE digest = ?", [(row["digest"],) for row in victims])
+    # File baru dihapus setelah COMMIT: jika transaksi di atas gagal, baris blobs dan filenya tetap ada.
+    # Penghapusan tetap di bawah kunci tulis dan melewati blob yang sempat didaftarkan ulang oleh store().
+    with contract_store.transaction(conn):
+        for row in victims:
+            if conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (row["digest"],)).fetchone():
+                continue
+            try:
+                os.remove(blob_path(row["digest"]))
+            except FileNotFoundError:
+                pass
+            removed += 1
+            freed += row["size"]
+    return removed, freed
+
+
+def adopt_legacy(conn=None):
+    """Pindahkan file lama uploads/<nama> ke blob store untuk kontrak yang belum punya BlobDigest"""
+    conn = conn or contract_store.get_connection()
+    rows = conn.execute(
+        "SELECT id, FileName FROM contracts WHERE BlobDigest IS NULL AND FileName IS NOT NULL"
+    ).fetchall()
+    adopted = set()
+    count = 0
+    for row in rows:
+        legacy_path = os.path.join(UPLOAD_DIR, os.path.basename(row["FileName"]))
+        if not os.path.isfile(legacy_path):
+            continue
+        digest, _, _ = store(legacy_path, conn=conn)
+        with contract_store.transaction(conn):
+            conn.execute("UPDATE contracts SET BlobDigest = ? WHERE id = ?", (digest, row["id"]))
+        adopted.add(legacy_path)
+        count += 1
+    for legacy_path in adopted:
+        os.remove(legacy_path)
+    return count
+
+
+def stats(conn=None):
+    conn = conn or contract_store.get_connection()
+    row = conn.execute(
+        "SELECT COUNT(*) AS blobs, COALESCE(SUM(size), 0) AS bytes, "
+        "COALESCE(SUM(refcount <= 0), 0) AS unreferenced FROM blobs"
+    ).fetchone()
+    return dict(row)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Utilitas penyimpanan file kontrak")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_gc = sub.add_parser("gc", help="Hapus blob yang tidak dipakai kontrak mana pun")
+    p_gc.add_argument("--grace", type=int, default=GC_GRACE_SECONDS, help="Umur minimum blob (detik)")
+    sub.add_parser("adopt-legacy", help="Pindahkan file lama di uploads/ ke blob store")
+    sub.add_parser("stats", help="Tampilkan jumlah dan ukuran blob")
+    args = parser.parse_args()
+
+    if args.command == "gc":
+        removed, freed = gc(args.grace)
+        print(f"{removed} blob dihapus ({freed / 1024 / 1024:.1f} MB)")
+    elif args.command == "adopt-legacy":
+        print(f"{adopt_legacy()} kontrak dipindahkan ke blob store")
+    elif args.command == "stats":
+        print(stats())